@@ -0,0 +1,163 @@
+"""
+Import-time and per-call client overhead of the LLM backends.
+
+Import time is measured in fresh interpreters (importing src.main, then building
+the backend). Per-call overhead runs each backend against an in-process
+httpx.MockTransport that answers instantly, so the numbers are pure client cost:
+request building, serialization, response parsing and message-object wrapping.
+
+    python -m benchmarks.backend_overhead --calls 2000 --output results/backends.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = ["http", "langchain"]
+
+_COMPLETION = {
+    "id": "chatcmpl-overhead", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": json.dumps({
+        "status": "Success",
+        "result": [{"intent": "SlowBrowing", "is_matched": True, "intentId": "SlowBrowingWK_V1", "entity": []}]
+    })}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1200, "completion_tokens": 40, "total_tokens": 1240,
+              "prompt_tokens_details": {"cached_tokens": 1024}},
+}
+
+_IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import src.main
+imported = time.perf_counter()
+from src.services.llm_backends import create_backend
+create_backend({backend!r})
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def _stream_body() -> bytes:
+    content = _COMPLETION["choices"][0]["message"]["content"]
+    lines = []
+    for index in range(0, len(content), 16):
+        delta = {"content": content[index:index + 16]}
+        if index == 0:
+            delta["role"] = "assistant"
+        lines.append({"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                      "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+    lines.append({"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                  "choices": [], "usage": _COMPLETION["usage"]})
+    return ("".join(f"data: {json.dumps(line)}\n\n" for line in lines) + "data: [DONE]\n\n").encode()
+
+
+def _mock_client() -> httpx.AsyncClient:
+    completion = json.dumps(_COMPLETION).encode()
+    stream = _stream_body()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if b'"stream": true' in request.content or b'"stream":true' in request.content:
+            return httpx.Response(200, content=stream, headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, content=completion, headers={"content-type": "application/json"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def measure_import(backend: str, repeats: int) -> Dict[str, Any]:
+    env = {**os.environ, "OPENAI_API_KEY": "overhead", "LLM_BACKEND": backend, "LOG_LEVEL": "WARNING"}
+    app_import, backend_build = [], []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET.format(backend=backend)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout.split()
+        app_import.append(float(output[0]))
+        backend_build.append(float(output[1]))
+    return {
+        "app_import_ms": round(1000 * statistics.median(app_import), 1),
+        "backend_first_use_ms": round(1000 * statistics.median(backend_build), 1),
+        "total_ms": round(1000 * statistics.median(a + b for a, b in zip(app_import, backend_build)), 1),
+    }
+
+
+async def measure_calls(backend_name: str, calls: int) -> Dict[str, Any]:
+    os.environ.setdefault("OPENAI_API_KEY", "overhead")
+    sys.path.insert(0, REPO_ROOT)
+    from src.services.llm_backends import create_backend
+
+    backend = create_backend(backend_name, _mock_client())
+    system_message = "You are a helpful assistant that responds only in valid JSON format."
+    prompt = "x" * 4000
+
+    for _ in range(20):
+        await backend.complete(system_message, prompt)
+
+    complete_times: List[float] = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await backend.complete(system_message, prompt)
+        complete_times.append(time.perf_counter() - started)
+
+    stream_times: List[float] = []
+    for _ in range(max(1, calls // 4)):
+        started = time.perf_counter()
+        async for _chunk in backend.stream(system_message, prompt):
+            pass
+        stream_times.append(time.perf_counter() - started)
+
+    def summary(samples: List[float]) -> Dict[str, float]:
+        ordered = sorted(samples)
+        return {
+            "mean_us": round(1e6 * statistics.fmean(ordered), 1),
+            "p50_us": round(1e6 * ordered[len(ordered) // 2], 1),
+            "p99_us": round(1e6 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 1),
+        }
+
+    return {"complete": summary(complete_times), "stream": summary(stream_times)}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Import-time and per-call overhead of the LLM backends")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--calls", type=int, default=1000, help="Measured completions per backend")
+    parser.add_argument("--import-repeats", type=int, default=3, help="Fresh interpreters per backend")
+    parser.add_argument("--output", default=None, help="Results file (default benchmarks/results/backends-<timestamp>.json)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    report: Dict[str, Any] = {"timestamp": datetime.now().isoformat(timespec="seconds"), "calls": args.calls, "backends": {}}
+
+    for backend in args.backends:
+        print(f"Measuring {backend} backend", flush=True)
+        report["backends"][backend] = {
+            "import": measure_import(backend, args.import_repeats),
+            "per_call": asyncio.run(measure_calls(backend, args.calls)),
+        }
+
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", "results", f"backends-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    for backend, result in report["backends"].items():
+        imports, per_call = result["import"], result["per_call"]
+        print(f"{backend:>10}: import src.main {imports['app_import_ms']:7.1f} ms  "
+              f"first use {imports['backend_first_use_ms']:7.1f} ms  "
+              f"complete {per_call['complete']['mean_us']:8.1f} us/call  stream {per_call['stream']['mean_us']:8.1f} us/call")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Offline load test for the chatbot service.
+
+Starts the OpenAI stub (benchmarks/stub_openai.py) and the service (uvicorn
+src.main:app) pointed at it via OPENAI_BASE_URL, drives the intent detection and
+feedback analysis endpoints at a fixed concurrency, and writes throughput,
+latency percentiles, service CPU time per request and memory to a JSON file.
+No network access is needed.
+
+    python -m benchmarks.load_test --concurrency 32 --requests 500 --latency-ms 400
+    python -m benchmarks.load_test --env LLM_MAX_CONCURRENCY=8 --rate-limit-rate 0.05 --label small-gate
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "benchmark-api-key"
+
+INTENT_MESSAGES = [
+    "my internet is very slow since morning",
+    "I cannot browse at all, no internet",
+    "please turn off the data manager",
+    "4G is not showing on my phone",
+    "I want to check my bill",
+    "why was I charged twice this month",
+    "my calls keep dropping",
+    "I need to recharge my account",
+]
+
+FEEDBACK_MESSAGES = [
+    "The agent was very helpful and solved my problem quickly",
+    "Waited 40 minutes on hold, terrible service",
+    "El servicio fue excelente, gracias",
+    "Internet still slow after three complaints",
+    "ok",
+    "Le technicien était très poli mais le problème persiste",
+]
+
+ENDPOINTS = {
+    "intent": "/v1/chatbot-ai/intent-entity-detection",
+    "feedback": "/v1/chatbot-ai/feedback-analysis",
+}
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid and all its descendants (uvicorn workers), from /proc"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                fields = file.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def _cpu_seconds(pids: List[int]) -> float:
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as file:
+                fields = file.read().rsplit(")", 1)[1].split()
+            # utime and stime (fields 14 and 15 of /proc/<pid>/stat)
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / _CLOCK_TICKS
+
+
+def _memory_mb(pids: List[int]) -> Tuple[float, float]:
+    """(current RSS, peak RSS) summed over the processes, in MiB"""
+    rss = peak = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("VmHWM:"):
+                        peak += int(line.split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return rss / 1024, peak / 1024
+
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+    if not ordered:
+        return 0.0
+    # Nearest-rank percentile
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))]
+
+
+def _payload(endpoint: str, index: int, unique: bool) -> Dict[str, Any]:
+    # A per-request suffix defeats the response caches so every request reaches the LLM
+    suffix = f" (ref {index})" if unique else ""
+    if endpoint == "intent":
+        return {"message": INTENT_MESSAGES[index % len(INTENT_MESSAGES)] + suffix}
+    return {"feedback_message": FEEDBACK_MESSAGES[index % len(FEEDBACK_MESSAGES)] + suffix,
+            "target_language_code": "en"}
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+            try:
+                if (await client.get(url, timeout=1.0)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+async def _run_endpoint(
+        client: httpx.AsyncClient,
+        endpoint: str,
+        args: argparse.Namespace,
+        service_pid: int
+) -> Dict[str, Any]:
+    """Drive one endpoint at the configured concurrency and summarize the run"""
+    path = ENDPOINTS[endpoint]
+    headers = {"Authorization": API_KEY}
+    for index in range(args.warmup):
+        await client.post(path, json=_payload(endpoint, -1 - index, args.unique_messages), headers=headers)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(args.requests))
+
+    async def worker() -> None:
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=_payload(endpoint, index, args.unique_messages), headers=headers)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    pids = _process_tree(service_pid)
+    cpu_before = _cpu_seconds(pids)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    cpu_used = _cpu_seconds(_process_tree(service_pid)) - cpu_before
+    rss, peak_rss = _memory_mb(_process_tree(service_pid))
+
+    ordered = sorted(latencies)
+    succeeded = statuses.get("200", 0)
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "succeeded": succeeded,
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "success_rps": round(succeeded / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            "p50": round(1000 * _percentile(ordered, 50), 2),
+            "p95": round(1000 * _percentile(ordered, 95), 2),
+            "p99": round(1000 * _percentile(ordered, 99), 2),
+            "max": round(1000 * ordered[-1], 2) if ordered else 0.0,
+        },
+        "service_cpu_seconds": round(cpu_used, 3),
+        "service_cpu_ms_per_request": round(1000 * cpu_used / len(latencies), 3) if latencies else 0.0,
+        "service_rss_mb": round(rss, 1),
+        "service_peak_rss_mb": round(peak_rss, 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _stub_command(args: argparse.Namespace, port: int) -> List[str]:
+    return [
+        sys.executable, "-m", "benchmarks.stub_openai", "--port", str(port),
+        "--latency-ms", str(args.latency_ms), "--latency-sigma", str(args.latency_sigma),
+        "--ms-per-token", str(args.ms_per_token), "--cached-fraction", str(args.cached_fraction),
+        "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+        "--retry-after-seconds", str(args.retry_after_seconds), "--seed", str(args.seed),
+    ]
+
+
+def _service_env(args: argparse.Namespace, stub_port: int, workdir: str) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "API_KEY": API_KEY,
+        "LOG_LEVEL": "WARNING",
+        "FEEDBACK_CACHE_PATH": os.path.join(workdir, "feedback.sqlite3"),
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.sqlite3"),
+    }
+    if args.workers > 1:
+        metrics_dir = os.path.join(workdir, "prometheus")
+        os.makedirs(metrics_dir, exist_ok=True)
+        env["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub_port = args.stub_port or _free_port()
+    service_port = args.service_port or _free_port()
+    base_url = f"http://127.0.0.1:{service_port}"
+
+    with tempfile.TemporaryDirectory(prefix="chatbot-bench-") as workdir:
+        stub = subprocess.Popen(_stub_command(args, stub_port), cwd=REPO_ROOT)
+        service = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(service_port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=REPO_ROOT, env=_service_env(args, stub_port, workdir)
+        )
+        try:
+            await _wait_ready(f"http://127.0.0.1:{stub_port}/stub/stats", stub)
+            await _wait_ready(f"{base_url}/health", service)
+
+            results: Dict[str, Any] = {}
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+                for endpoint in args.endpoints:
+                    print(f"Running {endpoint}: {args.requests} requests at concurrency {args.concurrency}", flush=True)
+                    results[endpoint] = await _run_endpoint(client, endpoint, args, service.pid)
+
+                service_stats = (await client.get("/v1/chatbot-ai/stats", headers={"Authorization": API_KEY})).json()
+                stub_stats = (await client.get(f"http://127.0.0.1:{stub_port}/stub/stats")).json()
+        finally:
+            for process in (service, stub):
+                process.terminate()
+            for process in (service, stub):
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    return {
+        "meta": {
+            "label": args.label,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "endpoints": results,
+        "service_stats": service_stats,
+        "stub_stats": stub_stats,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline load test against a local OpenAI stub")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=["intent", "feedback"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per endpoint")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request (seconds)")
+    parser.add_argument("--repeat-messages", dest="unique_messages", action="store_false",
+                        help="Reuse a small message set, so the response caches get hits")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra service setting")
+    parser.add_argument("--service-port", type=int, default=0)
+    parser.add_argument("--stub-port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--ms-per-token", type=float, default=0.0)
+    parser.add_argument("--cached-fraction", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-seconds", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="", help="Free-form name stored with the results")
+    parser.add_argument("--output", default=None, help="Results file (default benchmarks/results/<timestamp>.json)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", "results", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    for endpoint, result in report["endpoints"].items():
+        latency = result["latency_ms"]
+        print(f"{endpoint:>9}: {result['throughput_rps']:8.1f} req/s  p50 {latency['p50']:8.1f} ms  "
+              f"p95 {latency['p95']:8.1f} ms  p99 {latency['p99']:8.1f} ms  "
+              f"cpu {result['service_cpu_ms_per_request']:6.2f} ms/req  rss {result['service_peak_rss_mb']:.0f} MiB  "
+              f"statuses {result['statuses']}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
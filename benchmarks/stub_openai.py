@@ -0,0 +1,218 @@
+"""
+Local OpenAI-compatible stub for benchmarks.
+
+Serves POST /v1/chat/completions (plain and streamed) with a configurable latency
+distribution, per-token generation time, cached-token share and error/429
+injection. Response bodies are shaped after the prompt so the service parses them
+like real completions: intent results are built from the intent catalog (full or
+compact, following the prompt), feedback prompts get sentiment results.
+
+    python -m benchmarks.stub_openai --port 9100 --latency-ms 400 --rate-limit-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+_INTENT_ID_RE = re.compile(r'"intentId":\s*"([^"]+)"')
+# Part of the response format shown in compact-output intent prompts
+_COMPACT_FORMAT_MARKER = '"entities":{"<entity id>"'
+
+
+class StubConfig:
+    def __init__(self, args: argparse.Namespace):
+        self.latency_ms = args.latency_ms
+        self.latency_sigma = args.latency_sigma
+        self.ms_per_token = args.ms_per_token
+        self.cached_fraction = args.cached_fraction
+        self.error_rate = args.error_rate
+        self.rate_limit_rate = args.rate_limit_rate
+        self.retry_after_seconds = args.retry_after_seconds
+        self.intents_path = args.intents_path
+
+
+def _load_intents(path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return {intent["intentId"]: intent for intent in json.load(file).get("intents", [])}
+    except Exception as e:
+        logger.warning(f"Could not load intents from {path}: {e}")
+        return {}
+
+
+def _intent_body(prompt: str, intents: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """An intent result for one of the intents offered in the prompt"""
+    offered = [intent_id for intent_id in _INTENT_ID_RE.findall(prompt) if intent_id in intents]
+    if not offered:
+        return {"status": "Success", "result": [{"intent": "", "is_matched": False, "intentId": "", "entity": []}]}
+
+    intent = intents[random.choice(offered)]
+    entities = []
+    for entity in intent.get("entity", []):
+        options = entity.get("options") or []
+        entities.append({**entity, "user_input": options[0] if options else ""})
+    return {"status": "Success", "result": [{
+        "intent": intent.get("intent"), "is_matched": True, "intentId": intent["intentId"], "entity": entities
+    }]}
+
+
+def _compact_intent_body(prompt: str, intents: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """The same choice as _intent_body, in the compact intentId + entity values shape"""
+    result = _intent_body(prompt, intents)["result"][0]
+    return {"intentId": result["intentId"] or None,
+            "entities": {entity["id"]: entity["user_input"] for entity in result["entity"] if entity["user_input"]}}
+
+
+def _feedback_entry(text: str) -> Dict[str, Any]:
+    words = [word.lower() for word in re.findall(r"[A-Za-z]{4,}", text)]
+    return {"sentiment": random.choice(["positive", "negative", "neutral"]), "translation": text, "keywords": words[:5]}
+
+
+def _completion_body(prompt: str, intents: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Pick the response shape the service expects for this prompt"""
+    if "Feedback Items (JSON array" in prompt:
+        try:
+            items = json.loads(prompt[prompt.index("[", prompt.index("Feedback Items (JSON array") + 30):])
+        except (ValueError, json.JSONDecodeError):
+            items = []
+        return {"results": [{"id": item.get("id"), **_feedback_entry(item.get("text", ""))} for item in items]}
+    if "Customer Feedback Message:" in prompt:
+        return _feedback_entry(prompt.rsplit("Customer Feedback Message:", 1)[1].strip())
+    if "Entities to fill" in prompt:
+        return {"intent_switch": False, "entities": {}}
+    if _COMPACT_FORMAT_MARKER in prompt:
+        return _compact_intent_body(prompt, intents)
+    return _intent_body(prompt, intents)
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    intents = _load_intents(config.intents_path)
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0, "streamed": 0}
+
+    def latency_seconds(completion_tokens: int) -> float:
+        # Log-normal around the median, as real completion latencies are right-skewed
+        base = config.latency_ms * math.exp(random.gauss(0, config.latency_sigma)) if config.latency_sigma else config.latency_ms
+        return (base + completion_tokens * config.ms_per_token) / 1000
+
+    @app.get("/stub/stats")
+    async def stub_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(config.retry_after_seconds)},
+                content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=500, content={"error": {"message": "Injected upstream error (stub)", "type": "server_error"}}
+            )
+
+        messages: List[Dict[str, Any]] = body.get("messages", [])
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        content = json.dumps(_completion_body(prompt, intents), ensure_ascii=False)
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(content) // 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": int(prompt_tokens * config.cached_fraction)},
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "stub")
+        delay = latency_seconds(completion_tokens)
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        stats["streamed"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+
+        async def events():
+            # Time to first token is the base latency, the rest is spread over the chunks
+            first_token = delay - completion_tokens * config.ms_per_token / 1000
+            await asyncio.sleep(max(first_token, 0.0))
+            for index, piece in enumerate(pieces):
+                if index:
+                    await asyncio.sleep(config.ms_per_token * 4 / 1000)
+                delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            if include_usage:
+                usage_chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [], "usage": usage,
+                }
+                yield f"data: {json.dumps(usage_chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median base latency per completion")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal sigma of the base latency (0 = fixed)")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="Extra generation time per completion token")
+    parser.add_argument("--cached-fraction", type=float, default=0.0, help="Share of prompt tokens reported as cached")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument("--retry-after-seconds", type=float, default=1.0, help="Retry-After sent with injected 429s")
+    parser.add_argument("--intents-path", default="src/data/intents.json")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    args = build_parser().parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(StubConfig(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,56 @@ class Settings:
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", "0"))
     OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", "10000"))
+    # OpenAI-compatible endpoint override, e.g. the benchmark stub (empty uses the OpenAI API)
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+    # LLM client: "langchain" (ChatOpenAI) or "http" (direct async HTTP calls, faster start-up)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "langchain").lower()
+
+    # Share one upstream call between concurrent identical completion requests
+    LLM_COALESCE_ENABLED: bool = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+
+    # Per-request deadline budget; clients may send their own in the deadline header (0 disables)
+    REQUEST_DEADLINE_MS: int = int(os.getenv("REQUEST_DEADLINE_MS", "30000"))
+    REQUEST_DEADLINE_HEADER: str = os.getenv("REQUEST_DEADLINE_HEADER", "X-Request-Deadline-Ms")
+
+    # Hedged LLM calls: a second call is raced against one slower than the latency percentile,
+    # for at most LLM_HEDGE_MAX_RATE of recent upstream calls
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_HEDGE_WINDOW: int = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_MAX_RATE: float = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+
+    # Model cascade: calls of the kinds listed in LLM_CASCADE_POLICIES ("kind=signal+signal,...") go to
+    # the fast model first and are escalated to the strong model (OPENAI_MODEL when empty) on one of the
+    # kind's signals: invalid_json, unknown_intent, missing_entities, catalog_mismatch.
+    # Per-tier completion token limits are "kind=fast/strong,..." (unlisted: OPENAI_MAX_TOKENS)
+    LLM_CASCADE_ENABLED: bool = os.getenv("LLM_CASCADE_ENABLED", "false").lower() == "true"
+    LLM_CASCADE_FAST_MODEL: str = os.getenv("LLM_CASCADE_FAST_MODEL", "gpt-4.1-nano")
+    LLM_CASCADE_STRONG_MODEL: str = os.getenv("LLM_CASCADE_STRONG_MODEL", "")
+    LLM_CASCADE_POLICIES: str = os.getenv(
+        "LLM_CASCADE_POLICIES",
+        "intent=invalid_json+unknown_intent+missing_entities+catalog_mismatch,"
+        "slot_filling=invalid_json+catalog_mismatch,feedback=invalid_json+catalog_mismatch"
+    )
+    LLM_CASCADE_MAX_TOKENS: str = os.getenv(
+        "LLM_CASCADE_MAX_TOKENS", "intent=1024/4096,slot_filling=512/2048,feedback=1024/4096"
+    )
+
+    # LLM HTTP connection pool
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+
+    # LLM admission control: concurrent upstream calls, waiting calls, and how long a call may wait
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_MAX_QUEUE: int = int(os.getenv("LLM_MAX_QUEUE", "256"))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "2"))
+
+    # Retry of 429/5xx/connection errors with jittered exponential backoff (Retry-After honored)
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BASE_SECONDS: float = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+    LLM_RETRY_MAX_SECONDS: float = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
 
     # API Authentication
     API_KEY: str = os.getenv("API_KEY", "v0CKzrXZZzQ7IEIdHoYYHh2WmjZOlASB")
@@ -17,7 +67,101 @@ class Settings:
     INTENTS_DATA_PATH: str = os.getenv("INTENTS_DATA_PATH", "src/data/intents.json")
     SAMPLE_RESPONSE_PATH: str = os.getenv("SAMPLE_RESPONSE_PATH", "src/data/sample_response_format.json")
 
+    # Per-tenant catalogs: CATALOGS_DIR/<catalog id>.json, selected by the catalog header,
+    # conversation_metadata.catalog_id or conversation_metadata.channel (empty dir: default catalog only).
+    # Loaded on first use and kept in an LRU bounded by count and estimated size; the default is never evicted
+    CATALOGS_DIR: str = os.getenv("CATALOGS_DIR", "")
+    CATALOG_HEADER: str = os.getenv("CATALOG_HEADER", "X-Catalog-ID")
+    CATALOG_CACHE_MAX_ENTRIES: int = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "32"))
+    CATALOG_CACHE_MAX_MB: float = float(os.getenv("CATALOG_CACHE_MAX_MB", "256"))
+
+    # Poll the catalog files and hot-reload on change (0 disables)
+    CATALOG_WATCH_INTERVAL_SECONDS: float = float(os.getenv("CATALOG_WATCH_INTERVAL_SECONDS", "5"))
+
+    # Directory shared by all workers (e.g. a volume): compiled catalogs are published there once and
+    # picked up by every worker on its next watch poll; workers also leave heartbeats there (empty disables)
+    CATALOG_SHARED_DIR: str = os.getenv("CATALOG_SHARED_DIR", "")
+
+    # Intent pre-filter (only the top-k candidate intents are sent to the LLM)
+    INTENT_PREFILTER_ENABLED: bool = os.getenv("INTENT_PREFILTER_ENABLED", "true").lower() == "true"
+    INTENT_PREFILTER_TOP_K: int = int(os.getenv("INTENT_PREFILTER_TOP_K", "5"))
+    INTENT_PREFILTER_MIN_SCORE: float = float(os.getenv("INTENT_PREFILTER_MIN_SCORE", "0.2"))
+
+    # Intent detection response cache
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_SIZE: int = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "2048"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+    # Near-duplicate cache: a paraphrase of an answered message (MinHash/LSH estimate, Jaccard of
+    # token and character shingles >= threshold) reuses its intent and only runs entity extraction.
+    # A fraction of reuses is re-classified in the background to measure false reuse.
+    SIMILARITY_CACHE_ENABLED: bool = os.getenv("SIMILARITY_CACHE_ENABLED", "false").lower() == "true"
+    SIMILARITY_CACHE_THRESHOLD: float = float(os.getenv("SIMILARITY_CACHE_THRESHOLD", "0.6"))
+    SIMILARITY_CACHE_MAX_ENTRIES: int = int(os.getenv("SIMILARITY_CACHE_MAX_ENTRIES", "5000"))
+    SIMILARITY_CACHE_TTL_SECONDS: float = float(os.getenv("SIMILARITY_CACHE_TTL_SECONDS", "86400"))
+    SIMILARITY_CACHE_NUM_PERM: int = int(os.getenv("SIMILARITY_CACHE_NUM_PERM", "64"))
+    SIMILARITY_CACHE_BANDS: int = int(os.getenv("SIMILARITY_CACHE_BANDS", "32"))
+    SIMILARITY_CACHE_AUDIT_RATE: float = float(os.getenv("SIMILARITY_CACHE_AUDIT_RATE", "0.05"))
+
+    # Feedback analysis result store (SQLite, shared by all workers)
+    FEEDBACK_CACHE_ENABLED: bool = os.getenv("FEEDBACK_CACHE_ENABLED", "true").lower() == "true"
+    FEEDBACK_CACHE_PATH: str = os.getenv("FEEDBACK_CACHE_PATH", "cache/feedback_results.sqlite3")
+    FEEDBACK_CACHE_MAX_ENTRIES: int = int(os.getenv("FEEDBACK_CACHE_MAX_ENTRIES", "200000"))
+    FEEDBACK_CACHE_WARM_START_SIZE: int = int(os.getenv("FEEDBACK_CACHE_WARM_START_SIZE", "5000"))
+
+    # Batch feedback analysis (several feedback items packed per LLM call)
+    FEEDBACK_BATCH_MAX_REQUEST_ITEMS: int = int(os.getenv("FEEDBACK_BATCH_MAX_REQUEST_ITEMS", "500"))
+    FEEDBACK_BATCH_MAX_ITEMS_PER_CALL: int = int(os.getenv("FEEDBACK_BATCH_MAX_ITEMS_PER_CALL", "20"))
+    FEEDBACK_BATCH_TOKEN_BUDGET: int = int(os.getenv("FEEDBACK_BATCH_TOKEN_BUDGET", "3000"))
+    FEEDBACK_BATCH_CONCURRENCY: int = int(os.getenv("FEEDBACK_BATCH_CONCURRENCY", "4"))
+
+    # In-process language identification of feedback: text detected in the target language with at least
+    # this confidence gets a sentiment+keywords-only prompt and the original text as its translation
+    FEEDBACK_LANGID_ENABLED: bool = os.getenv("FEEDBACK_LANGID_ENABLED", "true").lower() == "true"
+    FEEDBACK_LANGID_MIN_CONFIDENCE: float = float(os.getenv("FEEDBACK_LANGID_MIN_CONFIDENCE", "0.8"))
+    # Shorter feedback is never trusted to be in the target language, whatever the confidence
+    FEEDBACK_LANGID_MIN_TOKENS: int = int(os.getenv("FEEDBACK_LANGID_MIN_TOKENS", "4"))
+
+    # Deterministic OPTION fast path: "off", "shadow" (run alongside the LLM and compare) or "on"
+    OPTION_FAST_PATH_MODE: str = os.getenv("OPTION_FAST_PATH_MODE", "shadow").lower()
+    OPTION_FAST_PATH_MIN_CONFIDENCE: float = float(os.getenv("OPTION_FAST_PATH_MIN_CONFIDENCE", "0.85"))
+    OPTION_SYNONYMS_PATH: str = os.getenv("OPTION_SYNONYMS_PATH", "src/data/option_synonyms.json")
+
+    # Intent detection output from the LLM: "compact" (intentId + entity id -> value, expanded from
+    # the catalog) or "full" (the whole response shape of SAMPLE_RESPONSE_PATH)
+    LLM_OUTPUT_FORMAT: str = os.getenv("LLM_OUTPUT_FORMAT", "compact").lower()
+
+    # LLM output validation: invalid option values are corrected to the closest option above
+    # this similarity (else nulled); unusable outputs are re-asked once when enabled
+    OUTPUT_OPTION_FUZZY_CUTOFF: float = float(os.getenv("OUTPUT_OPTION_FUZZY_CUTOFF", "0.8"))
+    OUTPUT_REASK_ENABLED: bool = os.getenv("OUTPUT_REASK_ENABLED", "true").lower() == "true"
+
+    # Conversation sessions (active intent and filled entities per session_id)
+    SESSION_STORE_ENABLED: bool = os.getenv("SESSION_STORE_ENABLED", "true").lower() == "true"
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_DB_PATH: str = os.getenv("SESSION_DB_PATH", "cache/sessions.sqlite3")
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    SESSION_TTL_SECONDS: float = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+
+    # Per-stage request timings returned in the Server-Timing response header
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+    # On-demand request profiling: a request whose PROFILE_HEADER equals PROFILE_TOKEN (empty disables) is
+    # sampled every PROFILE_INTERVAL_MS; the last PROFILE_KEEP profiles are kept in memory (and in PROFILE_DIR)
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_HEADER: str = os.getenv("PROFILE_HEADER", "X-Debug-Profile")
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+    PROFILE_KEEP: int = int(os.getenv("PROFILE_KEEP", "20"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "")
+
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower()
+    # Per-event sampling of INFO/DEBUG events, "event=rate,..." (unlisted events are always logged)
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "intent.request=0.1,feedback.request=0.1,llm.response=0.01")
+    LOG_MAX_FIELD_CHARS: int = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+    LOG_MAX_MESSAGE_CHARS: int = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "1000"))
+    LOG_REDACT_PII: bool = os.getenv("LOG_REDACT_PII", "true").lower() == "true"
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
 settings = Settings()
\ No newline at end of file
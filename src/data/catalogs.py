@@ -0,0 +1,241 @@
+import asyncio
+import os
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from src.config.settings import settings
+from src.data.loader import DataLoader, CatalogSnapshot, data_loader
+from src.data.shared_catalog import shared_catalog_store, WORKER_ID
+from src.utils.metrics import CATALOG_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_ID = "default"
+
+# Catalog ids become file names, so no path separators
+_CATALOG_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.\-]{0,63}$")
+
+
+class UnknownCatalogError(Exception):
+    """An explicitly requested catalog has no intents file"""
+
+
+class CatalogRegistry:
+    """
+    Per-tenant intent catalogs. Each catalog is compiled into its own snapshot on first
+    use (one load per catalog, however many requests ask at once) and kept in an LRU
+    bounded by CATALOG_CACHE_MAX_ENTRIES and the snapshots' estimated size. The default
+    catalog (INTENTS_DATA_PATH) is always resident.
+    """
+
+    def __init__(self, default_loader: DataLoader):
+        self.default_loader = default_loader
+        self._loaders: "OrderedDict[str, DataLoader]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Ids without a file, remembered for a while so every request does not stat the disk
+        self._missing: Dict[str, float] = {}
+        self._catalog_stats: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0, "fallbacks": 0, "unknown": 0}
+
+    def _path(self, catalog_id: str) -> Optional[str]:
+        """Intents file of a tenant catalog, or None when it does not exist"""
+        if not settings.CATALOGS_DIR or not _CATALOG_ID_RE.match(catalog_id):
+            return None
+        if self._missing.get(catalog_id, 0.0) > time.monotonic():
+            return None
+        path = os.path.join(settings.CATALOGS_DIR, f"{catalog_id}.json")
+        if not os.path.isfile(path):
+            self._missing[catalog_id] = time.monotonic() + max(settings.CATALOG_WATCH_INTERVAL_SECONDS, 1.0)
+            return None
+        self._missing.pop(catalog_id, None)
+        return path
+
+    def _catalog(self, catalog_id: str) -> Dict[str, Any]:
+        stats = self._catalog_stats.get(catalog_id)
+        if stats is None:
+            stats = self._catalog_stats[catalog_id] = {"hits": 0, "loads": 0, "evictions": 0, "load_ms": 0.0}
+        return stats
+
+    async def get_snapshot(self, catalog_id: Optional[str] = None, fallback_to_default: bool = False) -> CatalogSnapshot:
+        """
+        Snapshot of the requested catalog (the default one when catalog_id is empty).
+        A catalog without a file falls back to the default when fallback_to_default is
+        set, else raises UnknownCatalogError.
+        """
+        if not catalog_id or catalog_id == DEFAULT_CATALOG_ID:
+            return self.default_loader.get_snapshot()
+
+        loader = self._loaders.get(catalog_id)
+        if loader is not None:
+            self._loaders.move_to_end(catalog_id)
+            self.stats["hits"] += 1
+            self._catalog(catalog_id)["hits"] += 1
+            CATALOG_LOOKUPS.labels("hit").inc()
+            return loader.get_snapshot()
+
+        path = self._path(catalog_id)
+        if path is None:
+            if fallback_to_default:
+                self.stats["fallbacks"] += 1
+                CATALOG_LOOKUPS.labels("fallback").inc()
+                return self.default_loader.get_snapshot()
+            self.stats["unknown"] += 1
+            CATALOG_LOOKUPS.labels("unknown").inc()
+            raise UnknownCatalogError(f"Unknown catalog '{catalog_id}'")
+
+        return (await self._load(catalog_id, path)).get_snapshot()
+
+    async def _load(self, catalog_id: str, path: str, recompile: bool = False) -> DataLoader:
+        """
+        Compile a catalog off the event loop; concurrent requests for it share the load.
+        With `recompile` the file is compiled even when another worker published a version.
+        """
+        pending = self._loading.get(catalog_id)
+        if pending is not None:
+            loader = await asyncio.shield(pending)
+            if recompile:
+                await asyncio.to_thread(loader.reload)
+            return loader
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[catalog_id] = future
+        try:
+            started = time.perf_counter()
+            loader = DataLoader(path, catalog_id)
+            # Adopts the version another worker already compiled, if any
+            await asyncio.to_thread(loader.reload if recompile else loader.sync)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            stats = self._catalog(catalog_id)
+            stats["loads"] += 1
+            stats["load_ms"] = round(elapsed_ms, 2)
+            self.stats["loads"] += 1
+            CATALOG_LOOKUPS.labels("load").inc()
+            logger.info(f"Loaded catalog '{catalog_id}' in {elapsed_ms:.1f} ms "
+                        f"({loader.get_snapshot().size_bytes // 1024} KiB estimated)")
+
+            self._loaders[catalog_id] = loader
+            self._evict()
+            future.set_result(loader)
+            return loader
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved; the waiters (if any) get it from the shielded await
+            future.exception()
+            raise
+        finally:
+            del self._loading[catalog_id]
+
+    def _resident_bytes(self) -> int:
+        return sum(loader.get_snapshot().size_bytes for loader in self._loaders.values())
+
+    def _evict(self) -> None:
+        """Drop least recently used catalogs until within the count and size bounds, keeping the newest"""
+        max_bytes = settings.CATALOG_CACHE_MAX_MB * 1024 * 1024
+        while len(self._loaders) > 1 and (
+                len(self._loaders) > settings.CATALOG_CACHE_MAX_ENTRIES or self._resident_bytes() > max_bytes):
+            catalog_id, _ = self._loaders.popitem(last=False)
+            self.stats["evictions"] += 1
+            self._catalog(catalog_id)["evictions"] += 1
+            CATALOG_LOOKUPS.labels("eviction").inc()
+            logger.info(f"Evicted catalog '{catalog_id}'")
+
+    async def reload(self, catalog_id: Optional[str] = None) -> CatalogSnapshot:
+        """
+        Recompile a catalog from disk now, loading a tenant catalog that is not resident.
+        Only the file reads and compiling run in a thread; the LRU is changed on the event loop.
+        """
+        if not catalog_id or catalog_id == DEFAULT_CATALOG_ID:
+            return await asyncio.to_thread(self.default_loader.reload)
+        loader = self._loaders.get(catalog_id)
+        if loader is not None:
+            return await asyncio.to_thread(loader.reload)
+
+        path = self._path(catalog_id)
+        if path is None:
+            raise UnknownCatalogError(f"Unknown catalog '{catalog_id}'")
+        return (await self._load(catalog_id, path, recompile=True)).get_snapshot()
+
+    async def watch(self, interval: float) -> None:
+        """
+        Poll the files of the default and all resident catalogs (and, with CATALOG_SHARED_DIR,
+        the versions other workers published), reload the changed ones and refresh this
+        worker's heartbeat
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for loader in [self.default_loader, *self._loaders.values()]:
+                try:
+                    await asyncio.to_thread(loader.sync)
+                except Exception as e:
+                    logger.error(f"Error watching catalog '{loader.name}': {e}")
+            await self.heartbeat()
+
+    def versions(self) -> Dict[str, str]:
+        """Catalog versions this worker serves"""
+        versions = {DEFAULT_CATALOG_ID: self.default_loader.get_snapshot().version}
+        for catalog_id, loader in self._loaders.items():
+            versions[catalog_id] = loader.get_snapshot().version
+        return versions
+
+    async def heartbeat(self) -> None:
+        """Record the served versions in the shared directory for the workers endpoint"""
+        if not shared_catalog_store.enabled:
+            return
+        try:
+            await asyncio.to_thread(shared_catalog_store.write_heartbeat, self.versions())
+        except Exception as e:
+            logger.error(f"Error writing catalog heartbeat: {e}")
+
+    async def get_workers(self) -> Dict[str, Any]:
+        """
+        Catalog versions served by every worker (from their heartbeats) against the published
+        ones; without CATALOG_SHARED_DIR only this worker is known
+        """
+        if not shared_catalog_store.enabled:
+            return {"shared": False, "published": {},
+                    "workers": [{"worker": WORKER_ID, "catalogs": self.versions(), "stale": False, "in_sync": True}]}
+        # Only the shared directory is read in the thread; the registry stays on the event loop
+        return await asyncio.to_thread(self._shared_workers)
+
+    def _shared_workers(self) -> Dict[str, Any]:
+        """Heartbeats of every worker in the shared catalog directory, checked against the published versions"""
+        published = shared_catalog_store.published_versions()
+        stale_after = 3 * max(settings.CATALOG_WATCH_INTERVAL_SECONDS, 1.0)
+        now = time.time()
+        workers = []
+        for heartbeat in sorted(shared_catalog_store.read_heartbeats(), key=lambda item: item.get("worker", "")):
+            catalogs = heartbeat.get("catalogs") or {}
+            workers.append({
+                **heartbeat,
+                "stale": now - heartbeat.get("updated_at", 0) > stale_after,
+                "in_sync": all(published.get(name, version) == version for name, version in catalogs.items()),
+            })
+        return {"shared": True, "published": published, "workers": workers}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return registry counters plus per-catalog hits, loads and resident size"""
+        catalogs = {}
+        for catalog_id, stats in self._catalog_stats.items():
+            loader = self._loaders.get(catalog_id)
+            snapshot = loader.get_snapshot() if loader is not None else None
+            catalogs[catalog_id] = {
+                **stats,
+                "resident": snapshot is not None,
+                "version": snapshot.version if snapshot else None,
+                "size_bytes": snapshot.size_bytes if snapshot else 0,
+            }
+        default = self.default_loader.get_snapshot()
+        return {
+            **self.stats,
+            "resident": len(self._loaders),
+            "resident_bytes": self._resident_bytes(),
+            "default": {"version": default.version, "size_bytes": default.size_bytes},
+            "catalogs": catalogs,
+        }
+
+
+# Global instance
+catalog_registry = CatalogRegistry(data_loader)
@@ -1,91 +1,316 @@
+import asyncio
+import hashlib
 import json
 import os
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple
 from src.config.settings import settings
+from src.utils.prompts import CHATBOT_PROMPT, CHATBOT_COMPACT_PROMPT
+from src.utils.prompt_builder import PromptLayout
+from src.data.shared_catalog import shared_catalog_store
+from src.utils.timing import span
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_RESPONSE_FORMAT = {
+    "intent": "intent_name_or_Unknown",
+    "is_matched": True,
+    "intentId": "intent_id_or_null",
+    "entity": [
+        {
+            "id": "entity_id",
+            "label": "Entity Label",
+            "type": "TEXT_INPUT",
+            "options": [],
+            "user_input": "extracted_value_or_null",
+            "response": "matched_option_or_null"
+        }
+    ]
+}
+
+# What the model returns with LLM_OUTPUT_FORMAT=compact
+COMPACT_RESPONSE_FORMAT = {"intentId": "intent_id_or_null", "entities": {"<entity id>": "value_or_null"}}
+
+# Parsed JSON held as Python dicts/lists/strs is several times larger than its serialized form
+_PARSED_SIZE_FACTOR = 6
+
+
+def _compact(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Immutable, prompt-ready view of the intents catalog and response format.
+    Built once per (re)load; requests read it without any I/O or serialization.
+    """
+    intents_data: Dict[str, Any]
+    intents_formatted: str
+    response_format: str
+    version: str
+    mtimes: Tuple[Optional[float], Optional[float]]
+    loaded_at: float
+    intent_blocks: Dict[str, str]
+    intents_by_id: Dict[str, Dict[str, Any]]
+    intent_ids_by_name: Dict[str, str]
+    entities_by_key: Dict[Tuple[str, str], Dict[str, Any]]
+    option_sets: Dict[Tuple[str, str], frozenset]
+    prompt_layout: PromptLayout
+    full_prompt_layout: PromptLayout
+    size_bytes: int
+    name: str
+
+    def get_intent(self, intent_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Catalog intent by intentId"""
+        return self.intents_by_id.get(intent_id) if intent_id else None
+
+    def get_entity(self, intent_id: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Catalog entity by (intentId, entity id)"""
+        return self.entities_by_key.get((intent_id, entity_id))
+
+    def get_options(self, intent_id: str, entity_id: str) -> frozenset:
+        """Allowed option values of an OPTION entity (empty for other types)"""
+        return self.option_sets.get((intent_id, entity_id), frozenset())
+
+    def format_intents(self, intents: List[Dict[str, Any]]) -> str:
+        """Compact serialized subset of intents, reusing the pre-serialized blocks"""
+        blocks = [self.intent_blocks.get(intent.get("intentId")) or _compact(intent) for intent in intents]
+        return '{"intents":[' + ",".join(blocks) + "]}"
+
+    def render_chatbot_prompt(self, user_message: str, intents: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Render CHATBOT_PROMPT for a message, over the whole catalog or a subset of intents"""
+        if intents is None:
+            return self.full_prompt_layout.render(user_message)
+        return self.prompt_layout.render(user_message, intents_data=self.format_intents(intents))
+
 
 class DataLoader:
-    def __init__(self):
-        self._intents_cache = None
+    def __init__(self, intents_path: Optional[str] = None, name: str = "default"):
+        self.name = name
+        self._intents_path = intents_path
+        self._snapshot: Optional[CatalogSnapshot] = None
 
-    def load_intents_data(self) -> Dict[str, Any]:
-        """Load intents configuration from JSON file"""
-        if self._intents_cache is not None:
-            return self._intents_cache
+    @property
+    def intents_path(self) -> str:
+        return self._intents_path or settings.INTENTS_DATA_PATH
 
+    def _file_mtime(self, path: str) -> Optional[float]:
         try:
-            if not os.path.exists(settings.INTENTS_DATA_PATH):
-                logger.warning(f"Intents file not found at {settings.INTENTS_DATA_PATH}")
-                return {}
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _read_intents_data(self) -> Dict[str, Any]:
+        """Read intents configuration from JSON file"""
+        if not os.path.exists(self.intents_path):
+            logger.warning(f"Intents file not found at {self.intents_path}")
+            return {}
+
+        with open(self.intents_path, 'r', encoding='utf-8') as file:
+            intents_data = json.load(file)
+            logger.info(f"Loaded intents data from {self.intents_path}")
+            return intents_data
+
+    def _read_response_format(self) -> Any:
+        """Read sample response format from JSON file"""
+        response_format_path = settings.SAMPLE_RESPONSE_PATH
+        if not os.path.exists(response_format_path):
+            logger.warning(f"Response format file not found at {response_format_path}")
+            return DEFAULT_RESPONSE_FORMAT
+
+        with open(response_format_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _current_mtimes(self) -> Tuple[Optional[float], Optional[float]]:
+        return self._file_mtime(self.intents_path), self._file_mtime(settings.SAMPLE_RESPONSE_PATH)
+
+    def _compile(self) -> CatalogSnapshot:
+        """Build a new snapshot from the files on disk"""
+        with span("catalog_compile"):
+            mtimes = self._current_mtimes()
+            return self._build_snapshot(self._read_intents_data(), self._read_response_format(), mtimes)
+
+    def _build_snapshot(self, intents_data: Dict[str, Any], response_format_data: Any,
+                        mtimes: Tuple[Optional[float], Optional[float]]) -> CatalogSnapshot:
+        """Serialize and pre-render everything requests need from the catalog"""
+        response_format = _compact(response_format_data)
+        intents_formatted = _compact(intents_data)
+
+        intent_blocks = {}
+        intents_by_id = {}
+        intent_ids_by_name = {}
+        entities_by_key = {}
+        option_sets = {}
+        for intent in intents_data.get("intents", []) if isinstance(intents_data, dict) else []:
+            if isinstance(intent, dict) and intent.get("intentId"):
+                intent_id = intent["intentId"]
+                intent_blocks[intent_id] = _compact(intent)
+                intents_by_id[intent_id] = intent
+                if intent.get("intent"):
+                    intent_ids_by_name.setdefault(intent["intent"], intent_id)
+                for entity in intent.get("entity", []):
+                    if isinstance(entity, dict) and entity.get("id"):
+                        entities_by_key[(intent_id, entity["id"])] = entity
+                        if entity.get("type") == "OPTION":
+                            option_sets[(intent_id, entity["id"])] = frozenset(entity.get("options", []))
 
-            with open(settings.INTENTS_DATA_PATH, 'r', encoding='utf-8') as file:
-                self._intents_cache = json.load(file)
-                logger.info(f"Loaded intents data from {settings.INTENTS_DATA_PATH}")
-                return self._intents_cache
+        # The public response format is always the full one; the model may be asked for the compact one
+        if settings.LLM_OUTPUT_FORMAT == "compact":
+            template, prompt_format = CHATBOT_COMPACT_PROMPT, _compact(COMPACT_RESPONSE_FORMAT)
+        else:
+            template, prompt_format = CHATBOT_PROMPT, response_format
 
+        prompt_layout = PromptLayout("intent", template, "user_message", response_format=prompt_format)
+        full_prompt_layout = PromptLayout(
+            "intent", template, "user_message", response_format=prompt_format, intents_data=intents_formatted
+        )
+        # Rough resident size: the serialized text kept for prompts plus the parsed catalog,
+        # which as Python objects takes several times its JSON size
+        size_bytes = (
+            len(intents_formatted) * (1 + _PARSED_SIZE_FACTOR) + sum(len(block) for block in intent_blocks.values())
+            + len(prompt_layout.static_prefix) + len(full_prompt_layout.static_prefix)
+        )
+
+        version = hashlib.sha256(
+            (json.dumps(intents_data, sort_keys=True) + "\x00" + response_format).encode("utf-8")
+        ).hexdigest()[:16]
+
+        return CatalogSnapshot(
+            intents_data=intents_data,
+            intents_formatted=intents_formatted,
+            response_format=response_format,
+            version=version,
+            mtimes=mtimes,
+            loaded_at=time.time(),
+            intent_blocks=intent_blocks,
+            intents_by_id=intents_by_id,
+            intent_ids_by_name=intent_ids_by_name,
+            entities_by_key=entities_by_key,
+            option_sets=option_sets,
+            prompt_layout=prompt_layout,
+            full_prompt_layout=full_prompt_layout,
+            size_bytes=size_bytes,
+            name=self.name
+        )
+
+    def get_snapshot(self) -> CatalogSnapshot:
+        """Get the current compiled catalog, loading it on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.sync()
+            snapshot = self._snapshot
+        return snapshot
+
+    def _swap(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        previous = self._snapshot
+        self._snapshot = snapshot
+        if previous is None or previous.version != snapshot.version:
+            logger.info(f"Catalog snapshot {snapshot.version} active for catalog '{self.name}'")
+        return snapshot
+
+    def reload(self) -> CatalogSnapshot:
+        """
+        Recompile the catalog from disk and swap it in atomically (publishing it to the
+        other workers when CATALOG_SHARED_DIR is set).
+        In-flight requests keep the snapshot they started with; on error the old snapshot stays.
+        """
+        try:
+            snapshot = self._compile()
         except Exception as e:
             logger.error(f"Error loading intents data: {e}")
-            return {}
+            if self._snapshot is not None:
+                return self._snapshot
+            # Minimal format on error
+            return self._swap(self._build_snapshot(
+                {}, {"intent": "Unknown", "is_matched": False, "intentId": None, "entity": []}, (None, None)
+            ))
 
-    def get_intent_config(self, intent_id: str) -> Optional[Dict[str, Any]]:
-        """Get configuration for specific intent"""
-        intents_data = self.load_intents_data()
+        if shared_catalog_store.enabled:
+            try:
+                shared_catalog_store.publish(self.name, snapshot.version, snapshot.intents_data,
+                                             json.loads(snapshot.response_format), snapshot.mtimes)
+            except Exception as e:
+                logger.error(f"Error publishing catalog '{self.name}': {e}")
+        return self._swap(snapshot)
+
+    def _adopt(self, version: str) -> bool:
+        """Swap in a catalog version another worker compiled and published"""
+        with span("catalog_adopt"):
+            artifact = shared_catalog_store.load(self.name, version)
+            if artifact is None:
+                return False
+            mtimes = tuple(artifact.get("mtimes") or (None, None))
+            self._swap(self._build_snapshot(artifact["intents"], artifact["response_format"], mtimes))
+        return True
+
+    def has_changed(self) -> bool:
+        """Whether the catalog files on disk differ from the loaded snapshot"""
+        snapshot = self._snapshot
+        return snapshot is not None and self._current_mtimes() != snapshot.mtimes
 
-        # Search through intents structure - adjust based on your JSON structure
-        if 'intents' in intents_data:
-            for intent in intents_data['intents']:
-                if intent.get('id') == intent_id:
-                    return intent
+    def sync(self) -> bool:
+        """
+        Bring the snapshot up to date: adopt the version published by another worker, or
+        recompile (and publish) when the catalog files changed. Returns True if it changed.
+        """
+        current = self._snapshot
+        if not shared_catalog_store.enabled:
+            if current is not None and not self.has_changed():
+                return False
+            self.reload()
+            return True
 
-        # Alternative structure - direct intent mapping
-        return intents_data.get(intent_id)
+        published = shared_catalog_store.current_version(self.name)
+        if published and (current is None or published != current.version) and self._adopt(published):
+            if not self.has_changed():
+                return True
+        elif current is not None and not self.has_changed():
+            return False
+
+        with shared_catalog_store.lock(self.name):
+            # Another worker may have published the change while we waited for the lock
+            latest = shared_catalog_store.current_version(self.name)
+            if latest and latest != published and self._adopt(latest) and not self.has_changed():
+                return True
+            logger.info(f"Compiling catalog '{self.name}' from {self.intents_path}")
+            self.reload()
+        return True
+
+    async def watch(self, interval: float) -> None:
+        """Poll the catalog files (and the shared catalog pointer) and reload on change"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as e:
+                logger.error(f"Error watching catalog files: {e}")
+
+    def load_intents_data(self) -> Dict[str, Any]:
+        """Load intents configuration"""
+        return self.get_snapshot().intents_data
+
+    def get_intent_config(self, intent_id: str) -> Optional[Dict[str, Any]]:
+        """Get configuration for specific intent"""
+        return self.get_snapshot().get_intent(intent_id)
 
     def get_all_intents_formatted(self) -> str:
         """Get formatted string representation of all intents for prompts"""
-        intents_data = self.load_intents_data()
+        return self.get_snapshot().intents_formatted
 
-        try:
-            # Format the intents data for the prompt
-            return json.dumps(intents_data, indent=2)
-        except Exception as e:
-            logger.error(f"Error formatting intents data: {e}")
-            return "{}"
+    def format_intents(self, intents: List[Dict[str, Any]]) -> str:
+        """Get formatted string representation of a subset of intents for prompts"""
+        return self.get_snapshot().format_intents(intents)
 
     def load_response_format(self) -> str:
-        """Load sample response format from JSON file"""
-        try:
-            response_format_path = settings.SAMPLE_RESPONSE_PATH
-            if not os.path.exists(response_format_path):
-                logger.warning(f"Response format file not found at {response_format_path}")
-                # Return default format
-                default_format = {
-                    "intent": "intent_name_or_Unknown",
-                    "is_matched": True,
-                    "intentId": "intent_id_or_null",
-                    "entity": [
-                        {
-                            "id": "entity_id",
-                            "label": "Entity Label",
-                            "type": "TEXT_INPUT",
-                            "options": [],
-                            "user_input": "extracted_value_or_null",
-                            "response": "matched_option_or_null"
-                        }
-                    ]
-                }
-                return json.dumps(default_format, indent=2)
-
-            with open(response_format_path, 'r', encoding='utf-8') as file:
-                response_format = json.load(file)
-                return json.dumps(response_format, indent=2)
+        """Load sample response format"""
+        return self.get_snapshot().response_format
 
-        except Exception as e:
-            logger.error(f"Error loading response format: {e}")
-            # Return minimal format on error
-            return '{"intent": "Unknown", "is_matched": false, "intentId": null, "entity": []}'
+    def get_catalog_version(self) -> str:
+        """Get content hash of the loaded intents and response format"""
+        return self.get_snapshot().version
 
     def get_entities_for_intent(self, intent_id: str) -> List[Dict[str, Any]]:
         """Get entities list for specific intent"""
@@ -96,4 +321,4 @@ class DataLoader:
 
 
 # Global instance
-data_loader = DataLoader()
\ No newline at end of file
+data_loader = DataLoader()
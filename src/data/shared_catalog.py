@@ -0,0 +1,155 @@
+import fcntl
+import json
+import os
+import socket
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Published artifacts kept per catalog, so a worker that read an older pointer can still load it
+_KEEP_ARTIFACTS = 3
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+_STARTED_AT = time.time()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Readers see either the old file or the complete new one"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class SharedCatalogStore:
+    """
+    Compiled catalogs shared by all workers through CATALOG_SHARED_DIR.
+
+    A reload (or a change of the catalog files) is compiled once, by whichever worker
+    sees it first, into an immutable artifact named after its content version. A
+    per-catalog pointer file then names the version every worker should serve.
+    Workers poll the pointer and load the artifact without recompiling the sources.
+    Each worker also leaves a heartbeat with the versions it serves.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.CATALOG_SHARED_DIR)
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(settings.CATALOG_SHARED_DIR, *parts)
+
+    def _artifact_path(self, name: str, version: str) -> str:
+        return self._path(f"{name}-{version}.json")
+
+    def current_version(self, name: str) -> Optional[str]:
+        """Version the pointer of a catalog names, or None before the first publish"""
+        try:
+            with open(self._path(f"{name}.current"), "r", encoding="utf-8") as file:
+                return file.read().strip() or None
+        except OSError:
+            return None
+
+    def published_versions(self) -> Dict[str, str]:
+        versions = {}
+        try:
+            entries = os.listdir(settings.CATALOG_SHARED_DIR)
+        except OSError:
+            return versions
+        for entry in entries:
+            if entry.endswith(".current"):
+                version = self.current_version(entry[:-len(".current")])
+                if version:
+                    versions[entry[:-len(".current")]] = version
+        return versions
+
+    def publish(self, name: str, version: str, intents_data: Dict[str, Any], response_format: Any,
+                mtimes: Any) -> None:
+        """Write the artifact for a compiled catalog and point every worker at it"""
+        os.makedirs(settings.CATALOG_SHARED_DIR, exist_ok=True)
+        artifact_path = self._artifact_path(name, version)
+        if not os.path.exists(artifact_path):
+            artifact = {"name": name, "version": version, "mtimes": list(mtimes), "published_at": time.time(),
+                        "intents": intents_data, "response_format": response_format}
+            _write_atomic(artifact_path, json.dumps(artifact, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        if self.current_version(name) != version:
+            _write_atomic(self._path(f"{name}.current"), version.encode("utf-8"))
+            logger.info(f"Published catalog '{name}' version {version}")
+        self._prune(name, version)
+
+    def _prune(self, name: str, keep_version: str) -> None:
+        """Delete all but the newest artifacts of one catalog (ids may contain "-", versions never do)"""
+        artifacts = []
+        for entry in os.listdir(settings.CATALOG_SHARED_DIR):
+            if not entry.endswith(".json"):
+                continue
+            entry_name, _, version = entry[:-len(".json")].rpartition("-")
+            if entry_name == name and version != keep_version:
+                artifacts.append(self._path(entry))
+        artifacts.sort(key=lambda path: os.stat(path).st_mtime, reverse=True)
+        for path in artifacts[_KEEP_ARTIFACTS - 1:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def load(self, name: str, version: str) -> Optional[Dict[str, Any]]:
+        """Read a published artifact, or None when it is missing or unreadable"""
+        try:
+            with open(self._artifact_path(name, version), "rb") as file:
+                return json.loads(file.read())
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load published catalog '{name}' version {version}: {e}")
+            return None
+
+    @contextmanager
+    def lock(self, name: str) -> Iterator[None]:
+        """Cross-process lock, so a changed catalog is compiled and published by one worker"""
+        os.makedirs(settings.CATALOG_SHARED_DIR, exist_ok=True)
+        with open(self._path(f"{name}.lock"), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def write_heartbeat(self, catalogs: Dict[str, str]) -> None:
+        """Record the catalog versions this worker serves"""
+        directory = self._path("workers")
+        os.makedirs(directory, exist_ok=True)
+        heartbeat = {"worker": WORKER_ID, "pid": os.getpid(), "started_at": _STARTED_AT,
+                     "updated_at": time.time(), "catalogs": catalogs}
+        _write_atomic(os.path.join(directory, f"{WORKER_ID}.json"), json.dumps(heartbeat).encode("utf-8"))
+
+    def remove_heartbeat(self) -> None:
+        try:
+            os.remove(self._path("workers", f"{WORKER_ID}.json"))
+        except OSError:
+            pass
+
+    def read_heartbeats(self) -> List[Dict[str, Any]]:
+        directory = self._path("workers")
+        heartbeats = []
+        try:
+            entries = os.listdir(directory)
+        except OSError:
+            return heartbeats
+        for entry in entries:
+            if not entry.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, entry), "r", encoding="utf-8") as file:
+                    heartbeats.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return heartbeats
+
+
+# Global instance
+shared_catalog_store = SharedCatalogStore()
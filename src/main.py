@@ -1,4 +1,12 @@
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+import json
+import math
+import secrets
+import time
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime
 import logging
@@ -6,17 +14,164 @@ from typing import Optional, Dict, Any
 
 from src.services.intent_service import intent_service
 from src.services.feedback_service import feedback_service
+from src.services.intent_retriever import intent_retriever
+from src.services.response_cache import response_cache
+from src.services.similarity_cache import similarity_cache
+from src.services.feedback_store import feedback_store
+from src.services.llm_service import llm_service, LLMOverloadedError
+from src.services.session_store import session_store
+from src.services.option_matcher import option_matcher
+from src.services.output_validator import output_validator
+from src.services.model_cascade import model_cascade
+from src.utils.prompt_builder import prompt_stats
+from src.utils.deadline import DeadlineExceededError, set_deadline, reset_deadline
+from src.utils.structured_log import (
+    configure_logging, log_event, new_request_id, set_request_id, reset_request_id, get_stats as get_logging_stats
+)
+from src.utils.metrics import HTTP_REQUESTS, HTTP_REQUEST_LATENCY, render_metrics, mark_process_dead
+from src.utils.profiler import sampling_profiler
+from src.utils.timing import current_timings, reset_timings, span, start_timings
+from src.data.loader import CatalogSnapshot
+from src.data.catalogs import catalog_registry, UnknownCatalogError
+from src.data.shared_catalog import shared_catalog_store
 from src.config.settings import settings
-from src.models.schemas import ConversationMetadata, ProcessMessageRequest, FeedbackAnalysisRequest
+from src.models.schemas import ConversationMetadata, ProcessMessageRequest, FeedbackAnalysisRequest, FeedbackBatchRequest
 from src.utils.auth import verify_api_key
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm caches on startup and watch the catalog files for changes."""
+    await asyncio.to_thread(catalog_registry.default_loader.get_snapshot)
+    # Building the LLM backend imports its client library (seconds for LangChain); doing
+    # that on the first request would stall every request the event loop is serving
+    await asyncio.to_thread(lambda: llm_service.backend)
+    await catalog_registry.heartbeat()
+    if settings.FEEDBACK_CACHE_ENABLED:
+        await feedback_store.warm_start()
+
+    watcher = None
+    if settings.CATALOG_WATCH_INTERVAL_SECONDS > 0:
+        watcher = asyncio.create_task(catalog_registry.watch(settings.CATALOG_WATCH_INTERVAL_SECONDS))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    shared_catalog_store.remove_heartbeat()
+    mark_process_dead()
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Chatbot AI", version="1.0.0")
+app = FastAPI(title="Chatbot AI", version="1.0.0", lifespan=lifespan)
 
-# Configure logging
-logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
+# Configure logging (structured, written by a background thread)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+
+def _service_unavailable(error: Exception) -> HTTPException:
+    """503 for a shed LLM call; clients should back off for about one queue deadline"""
+    logger.warning(f"Shedding request: {error}")
+    return HTTPException(
+        status_code=503,
+        detail="Service overloaded, please retry",
+        headers={"Retry-After": str(max(1, math.ceil(settings.LLM_QUEUE_TIMEOUT_SECONDS)))}
+    )
+
+
+def _deadline_exceeded(error: Exception) -> HTTPException:
+    """504 when the request's deadline budget ran out before the LLM answered"""
+    logger.warning(f"Deadline exceeded: {error}")
+    return HTTPException(status_code=504, detail="Request deadline exceeded")
+
+
+async def _resolve_catalog(http_request: Request, request: ProcessMessageRequest) -> CatalogSnapshot:
+    """
+    Tenant catalog for an intent request: the catalog header or conversation_metadata.catalog_id
+    (404 when unknown), else conversation_metadata.channel when such a catalog exists, else the default
+    """
+    metadata = request.conversation_metadata
+    catalog_id = http_request.headers.get(settings.CATALOG_HEADER) or (metadata.catalog_id if metadata else None)
+    try:
+        with span("catalog"):
+            if catalog_id:
+                return await catalog_registry.get_snapshot(catalog_id)
+            return await catalog_registry.get_snapshot(metadata.channel if metadata else None, fallback_to_default=True)
+    except UnknownCatalogError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Return per-stage timings in Server-Timing, and profile the request when the debug header asks for it."""
+    profile_token = None
+    if settings.PROFILE_TOKEN:
+        provided = request.headers.get(settings.PROFILE_HEADER)
+        if provided and secrets.compare_digest(provided, settings.PROFILE_TOKEN):
+            profile_token = sampling_profiler.start(uuid.uuid4().hex[:16], f"{request.method} {request.url.path}")
+    timings_token = start_timings() if settings.SERVER_TIMING_ENABLED else None
+    try:
+        response = await call_next(request)
+        timings = current_timings()
+        if timings is not None:
+            # Streamed bodies are still being produced; their header covers the time to the first byte
+            response.headers["Server-Timing"] = timings.server_timing()
+    finally:
+        if timings_token is not None:
+            reset_timings(timings_token)
+        profile_id = sampling_profiler.stop(profile_token) if profile_token is not None else None
+    if profile_id is not None:
+        response.headers["X-Profile-ID"] = profile_id
+    return response
+
+
+@app.middleware("http")
+async def apply_request_deadline(request: Request, call_next):
+    """Start the request's deadline budget from the deadline header, or the configured default."""
+    budget_ms = settings.REQUEST_DEADLINE_MS
+    header = request.headers.get(settings.REQUEST_DEADLINE_HEADER)
+    if header:
+        try:
+            budget_ms = int(header)
+        except ValueError:
+            logger.warning(f"Ignoring invalid {settings.REQUEST_DEADLINE_HEADER} header: {header}")
+
+    token = set_deadline(budget_ms / 1000)
+    try:
+        return await call_next(request)
+    finally:
+        reset_deadline(token)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and observe latency per route template (bounded label cardinality)."""
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.labels(endpoint, request.method, str(status_code)).inc()
+        HTTP_REQUEST_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+
+
+# Registered last so it runs outermost: the other middlewares' log records carry the id too
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag the request's log records with a correlation id (taken from X-Request-ID when given)."""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = set_request_id(request_id[:64])
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id[:64]
+        return response
+    finally:
+        reset_request_id(token)
+
+
 @app.post("/v1/chatbot-ai/feedback-analysis")
 async def analyze_feedback(
     request: FeedbackAnalysisRequest,
@@ -33,8 +188,7 @@ async def analyze_feedback(
 
         target_language = request.target_language_code or "en"
 
-        logger.info(f"Analyzing sentiment for feedback: {feedback_message[:50]}...")
-        logger.info(f"Target language: {target_language}")
+        log_event(logger, "feedback.request", feedback=feedback_message, target_language=target_language)
 
         # Process sentiment analysis
         result = await feedback_service.analyze_feedback(feedback_message, target_language)
@@ -47,14 +201,61 @@ async def analyze_feedback(
 
     except HTTPException:
         raise
+    except LLMOverloadedError as e:
+        raise _service_unavailable(e)
+    except DeadlineExceededError as e:
+        raise _deadline_exceeded(e)
     except Exception as e:
         logger.error(f"Error in sentiment analysis: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/v1/chatbot-ai/feedback-analysis/batch")
+async def analyze_feedback_batch(
+    request: FeedbackBatchRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Analyze sentiment of a batch of customer feedback messages.
+    Returns one result per item, in request order; a failed item does not fail the batch.
+    """
+    try:
+        if not request.items:
+            raise HTTPException(status_code=400, detail="At least one feedback item is required")
+        if len(request.items) > settings.FEEDBACK_BATCH_MAX_REQUEST_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.FEEDBACK_BATCH_MAX_REQUEST_ITEMS} feedback items per request"
+            )
+
+        log_event(logger, "feedback.batch_request", items=len(request.items))
+
+        results = await feedback_service.analyze_feedback_batch([
+            (item.feedback_message, item.target_language_code or "en") for item in request.items
+        ])
+
+        return {
+            "status": "Success",
+            "total": len(results),
+            "failed": sum(1 for result in results if result.get("status") == "Error"),
+            "results": results
+        }
+
+    except HTTPException:
+        raise
+    except LLMOverloadedError as e:
+        raise _service_unavailable(e)
+    except DeadlineExceededError as e:
+        raise _deadline_exceeded(e)
+    except Exception as e:
+        logger.error(f"Error in batch sentiment analysis: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @app.post("/v1/chatbot-ai/intent-entity-detection")
 async def intent_entity_detection(
     request: ProcessMessageRequest,
+    http_request: Request,
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -66,10 +267,11 @@ async def intent_entity_detection(
         if not message:
             raise HTTPException(status_code=400, detail="Message is required")
 
-        logger.info(f"Processing message: {message}")
-        logger.info(f"Active intent: {request.active_intent_id}")
-
-        result = await intent_service.process_message(message, request.active_intent_id)
+        session_id = request.conversation_metadata.session_id if request.conversation_metadata else None
+        snapshot = await _resolve_catalog(http_request, request)
+        log_event(logger, "intent.request", user_message=message,
+                  active_intent_id=request.active_intent_id, session_id=session_id, catalog=snapshot.version)
+        result = await intent_service.process_message(message, request.active_intent_id, session_id, snapshot)
 
         # Check for errors
         if result.get("status") == "Error":
@@ -79,11 +281,49 @@ async def intent_entity_detection(
 
     except HTTPException:
         raise
+    except LLMOverloadedError as e:
+        raise _service_unavailable(e)
+    except DeadlineExceededError as e:
+        raise _deadline_exceeded(e)
     except Exception as e:
         logger.error(f"Error processing message: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/v1/chatbot-ai/intent-entity-detection/stream")
+async def intent_entity_detection_stream(
+    request: ProcessMessageRequest,
+    http_request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Streaming variant of intent-entity-detection over Server-Sent Events.
+    Emits `intent` once the intent is decided, one `entity` event per extracted entity,
+    then `result` with the same payload as the non-streaming endpoint (or `error`).
+    """
+    message = request.message.strip()
+    if not message:
+        raise HTTPException(status_code=400, detail="Message is required")
+
+    snapshot = await _resolve_catalog(http_request, request)
+    log_event(logger, "intent.request", user_message=message, active_intent_id=request.active_intent_id,
+              catalog=snapshot.version, stream=True)
+
+    # Once the event stream has started the status code is sent, so shed up front
+    if llm_service.admission.would_shed():
+        raise _service_unavailable(LLMOverloadedError("LLM admission queue is full"))
+
+    async def event_stream():
+        async for event, data in intent_service.stream_message(message, request.active_intent_id, snapshot):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint - no authentication required."""
@@ -95,6 +335,13 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint - no authentication required."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     """Root endpoint - no authentication required."""
@@ -137,20 +384,63 @@ async def validate_entities_endpoint(
         raise HTTPException(status_code=500, detail="Error validating entities")
 
 
+@app.get("/v1/chatbot-ai/stats")
+async def service_stats(api_key: str = Depends(verify_api_key)):
+    """Runtime counters for the optimisation layers in front of the LLM."""
+    return {
+        "status": "Success",
+        "llm": llm_service.get_stats(),
+        "model_cascade": model_cascade.get_stats(),
+        "intent_service": intent_service.get_stats(),
+        "sessions": session_store.get_stats(),
+        "option_fast_path": option_matcher.get_stats(),
+        "output_validation": output_validator.get_stats(),
+        "prompts": prompt_stats.get_stats(),
+        "catalogs": catalog_registry.get_stats(),
+        "intent_prefilter": intent_retriever.get_stats(),
+        "response_cache": response_cache.get_stats(),
+        "similarity_cache": similarity_cache.get_stats(),
+        "feedback": feedback_service.get_stats(),
+        "feedback_store": feedback_store.get_stats(),
+        "profiler": sampling_profiler.get_stats(),
+        "logging": get_logging_stats()
+    }
+
+
+@app.get("/v1/chatbot-ai/catalog/workers")
+async def catalog_workers(api_key: str = Depends(verify_api_key)):
+    """Catalog version each worker is serving, from the heartbeats in the shared catalog directory."""
+    return await catalog_registry.get_workers()
+
+
+@app.get("/v1/chatbot-ai/debug/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, api_key: str = Depends(verify_api_key)):
+    """Sampled stacks of a profiled request (see X-Profile-ID), in the collapsed flame graph format."""
+    profile = await asyncio.to_thread(sampling_profiler.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    return PlainTextResponse(profile)
+
+
 @app.post("/v1/chatbot-ai/reload-intents")
-async def reload_intents(api_key: str = Depends(verify_api_key)):
-    """Reload intents data from file."""
+async def reload_intents(catalog_id: Optional[str] = None, api_key: str = Depends(verify_api_key)):
+    """Reload intents data from file (the default catalog, or the tenant catalog given by catalog_id)."""
     try:
-        from src.data.loader import data_loader
-        # Clear cache to force reload
-        data_loader._intents_cache = None
-        intents_data = data_loader.load_intents_data()
+        # Compile a new snapshot and swap it in atomically; file reads, compiling and
+        # publishing run in a thread so in-flight requests keep being served
+        snapshot = await catalog_registry.reload(catalog_id)
+        intents_data = snapshot.intents_data
+        await catalog_registry.heartbeat()
 
         return {
             "status": "Success",
-            "message": "Intents data reloaded",
-            "intents_count": len(intents_data.get("intents", []))
+            # With a shared catalog directory the other workers pick the new version up on their next poll
+            "message": "Intents data reloaded" + (" and published to all workers" if shared_catalog_store.enabled else ""),
+            "intents_count": len(intents_data.get("intents", [])),
+            "version": snapshot.version
         }
+    except UnknownCatalogError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error reloading intents: {e}")
         raise HTTPException(status_code=500, detail="Error reloading intents")
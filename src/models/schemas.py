@@ -1,9 +1,10 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 # Pydantic models
 class ConversationMetadata(BaseModel):
     channel: str = "web"
+    catalog_id: Optional[str] = None
     language: str = "en"
     session_id: str = None
     timestamp: Optional[str] = None
@@ -15,4 +16,7 @@ class ProcessMessageRequest(BaseModel):
 
 class FeedbackAnalysisRequest(BaseModel):
     feedback_message: str
-    target_language_code: str = "en"
\ No newline at end of file
+    target_language_code: str = "en"
+
+class FeedbackBatchRequest(BaseModel):
+    items: List[FeedbackAnalysisRequest]
\ No newline at end of file
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Deque
+from src.utils.deadline import DeadlineExceededError, remaining
+from src.utils.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_SHED
+
+logger = logging.getLogger(__name__)
+
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call cannot be admitted before its queue deadline"""
+
+
+class AdmissionGate:
+    """
+    Bounded-concurrency gate for upstream LLM calls with a FIFO wait queue.
+
+    A call that cannot get a slot within `queue_timeout` seconds - or that
+    would obviously not get one, judging by queue length and recent call
+    latency - is rejected with LLMOverloadedError so the API can answer 503
+    quickly instead of piling up requests.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_hold = 0.0
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_estimate": 0, "shed_timeout": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self) -> float:
+        """Rough wait for a new arrival: queued calls ahead of it times average slot hold time"""
+        if self._active < self.max_concurrency and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) / self.max_concurrency * self._avg_hold
+
+    def would_shed(self) -> bool:
+        """Whether a call arriving now would be rejected without waiting"""
+        return len(self._waiters) >= self.max_queue or self.estimated_wait() > self.queue_timeout
+
+    def _shed(self, reason: str) -> None:
+        self.stats[f"shed_{reason}"] += 1
+        LLM_SHED.labels(reason).inc()
+        raise LLMOverloadedError(f"LLM capacity exhausted ({reason.replace('_', ' ')})")
+
+    async def _acquire(self) -> float:
+        """Take a slot, waiting in line if needed; returns the time spent waiting"""
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return 0.0
+
+        # A request with less budget left than the queue deadline waits only that long
+        timeout = self.queue_timeout
+        left = remaining()
+        bounded_by_deadline = left is not None and left < timeout
+        if bounded_by_deadline:
+            timeout = max(left, 0.0)
+
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+        if self.estimated_wait() > timeout:
+            if bounded_by_deadline:
+                raise DeadlineExceededError("Request deadline would expire waiting for an LLM slot")
+            self._shed("estimate")
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats["queued"] += 1
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            if bounded_by_deadline:
+                raise DeadlineExceededError("Request deadline expired waiting for an LLM slot")
+            self._shed("timeout")
+        finally:
+            LLM_QUEUE_DEPTH.dec()
+        return time.monotonic() - started
+
+    def _release(self) -> None:
+        """Hand the slot to the next live waiter, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without queueing (for optional calls such as hedges); pair with release()"""
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.stats["admitted"] += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give back a slot taken with try_acquire()"""
+        self._release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold a concurrency slot for the duration of the block; yields the queue wait"""
+        waited = await self._acquire()
+        LLM_QUEUE_WAIT.observe(waited)
+        self.stats["admitted"] += 1
+        held_since = time.monotonic()
+        try:
+            yield waited
+        finally:
+            # Exponentially weighted average of slot hold time, for the wait estimate
+            self._avg_hold = 0.9 * self._avg_hold + 0.1 * (time.monotonic() - held_since)
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return gate counters and current queue depth"""
+        return {
+            **self.stats,
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "avg_slot_seconds": round(self._avg_hold, 4),
+            "estimated_wait_seconds": round(self.estimated_wait(), 4),
+        }
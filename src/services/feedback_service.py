@@ -1,54 +1,289 @@
+import asyncio
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
-from src.services.llm_service import llm_service
-from src.utils.prompts import FEEDBACK_PROMPT
+from src.services.llm_service import LLMOverloadedError
+from src.utils.deadline import DeadlineExceededError
+from src.services.feedback_store import feedback_store
+from src.services.model_cascade import model_cascade, STRONG_TIER
+from src.config.settings import settings
+from src.utils.prompts import (
+    FEEDBACK_PROMPT, FEEDBACK_BATCH_PROMPT, FEEDBACK_SENTIMENT_PROMPT, FEEDBACK_BATCH_SENTIMENT_PROMPT
+)
+from src.utils.prompt_builder import PromptLayout
+from src.utils.language import count_tokens, detect_language, normalize_language_code
+from src.utils.metrics import FEEDBACK_LANGUAGE
+from src.utils.structured_log import log_event
+from src.utils.timing import span
 
 logger = logging.getLogger(__name__)
 
+FEEDBACK_SYSTEM_MESSAGE = "You are a helpful assistant that analyzes customer feedback sentiment and responds only in valid JSON format."
+
+FEEDBACK_LAYOUT = PromptLayout("feedback", FEEDBACK_PROMPT, "feedback_message")
+FEEDBACK_BATCH_LAYOUT = PromptLayout("feedback_batch", FEEDBACK_BATCH_PROMPT, "feedback_items")
+FEEDBACK_SENTIMENT_LAYOUT = PromptLayout("feedback_sentiment", FEEDBACK_SENTIMENT_PROMPT, "feedback_message")
+FEEDBACK_BATCH_SENTIMENT_LAYOUT = PromptLayout("feedback_batch_sentiment", FEEDBACK_BATCH_SENTIMENT_PROMPT, "feedback_items")
+
 
 class FeedbackService:
 
     def __init__(self):
-        pass
+        self.stats = {"language_checks": 0, "same_language": 0, "other_language": 0, "undetected": 0, "detected": {}}
 
-    async def analyze_feedback(self, feedback_message: str, target_language_code: str = "en") -> Dict[str, Any]:
+    async def analyze_feedback(
+            self,
+            feedback_message: str,
+            target_language_code: str = "en",
+            same_language: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
-        Analyze sentiment, translate if needed, and extract keywords from feedback message
+        Analyze sentiment, translate if needed, and extract keywords from feedback message.
+        Feedback already in the target language (detected locally unless `same_language`
+        is given) is not sent for translation; its translation is the original text.
         """
         try:
-            logger.info(f"Analyzing sentiment for feedback: {feedback_message[:50]}...")
+            log_event(logger, "feedback.analyze", feedback=feedback_message, target_language=target_language_code)
+
+            # Identical feedback is resubmitted often, across restarts and workers
+            cache_key = None
+            if settings.FEEDBACK_CACHE_ENABLED:
+                cache_key = feedback_store.make_key(feedback_message, target_language_code)
+                with span("feedback_cache"):
+                    cached = await feedback_store.get(cache_key)
+                if cached is not None:
+                    log_event(logger, "feedback.cache_hit")
+                    return self._with_own_text(cached, feedback_message)
+
             # Create the sentiment analysis prompt
-            prompt = self._create_feedback_prompt(feedback_message, target_language_code)
+            if same_language is None:
+                same_language = self._in_target_language(feedback_message, target_language_code)
+            prompt = self._create_feedback_prompt(feedback_message, target_language_code, same_language)
 
-            # Call LLM service
-            llm_response = await llm_service.get_completion(
-                prompt,
-                "You are a helpful assistant that analyzes customer feedback sentiment and responds only in valid JSON format."
-            )
+            # Call LLM service, escalating a doubtful fast-tier answer to the strong model
+            tier = model_cascade.first_tier("feedback")
+            llm_response = await model_cascade.complete(prompt, FEEDBACK_SYSTEM_MESSAGE, "feedback", tier)
+            if model_cascade.escalation("feedback", tier, self._escalation_signals(llm_response)):
+                llm_response = await model_cascade.complete(prompt, FEEDBACK_SYSTEM_MESSAGE, "feedback", STRONG_TIER)
 
             if "error" in llm_response:
                 return self._create_error_response(llm_response["error"])
 
             # Process and validate the response
-            return self._process_sentiment_response(llm_response)
+            result = self._process_sentiment_response(llm_response, feedback_message if same_language else None)
+            if cache_key is not None:
+                await feedback_store.set(cache_key, self._for_cache(result, same_language))
+            return result
 
+        except (LLMOverloadedError, DeadlineExceededError):
+            raise
         except Exception as e:
             logger.error(f"Error in sentiment analysis: {e}")
             return self._create_error_response(str(e))
 
-    def _create_feedback_prompt(self, feedback_message: str, target_language_code: str) -> str:
-        """Create Feedback analysis prompt"""
+    async def analyze_feedback_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Analyze many (feedback_message, target_language_code) items, packing several per LLM call.
+        Returns one result per item in input order, each shaped like analyze_feedback's result.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        pending: Dict[str, List[int]] = {}
+
+        for index, (feedback_message, target_language_code) in enumerate(items):
+            feedback_message = (feedback_message or "").strip()
+            if not feedback_message:
+                results[index] = self._create_error_response("Feedback message is required")
+                continue
+
+            key = feedback_store.make_key(feedback_message, target_language_code)
+            if key in pending:
+                # Identical feedback within one burst is analyzed once
+                pending[key].append(index)
+                continue
+
+            if settings.FEEDBACK_CACHE_ENABLED:
+                with span("feedback_cache"):
+                    cached = await feedback_store.get(key)
+                if cached is not None:
+                    results[index] = self._with_own_text(cached, feedback_message)
+                    continue
+
+            pending[key] = [index]
+
+        # Feedback already in its target language is packed separately, without translation
+        to_translate, same_language = [], []
+        for key, indexes in pending.items():
+            feedback_message, target_language_code = items[indexes[0]][0].strip(), items[indexes[0]][1] or "en"
+            in_target = self._in_target_language(feedback_message, target_language_code)
+            (same_language if in_target else to_translate).append((key, feedback_message, target_language_code))
+
+        groups = ([(group, False) for group in self._pack_feedback_items(to_translate)]
+                  + [(group, True) for group in self._pack_feedback_items(same_language, sentiment_only=True)])
+        log_event(logger, "feedback.batch", items=len(items), to_analyze=len(pending), same_language=len(same_language),
+                  llm_calls=len(groups))
+
+        semaphore = asyncio.Semaphore(settings.FEEDBACK_BATCH_CONCURRENCY)
+
+        async def run_group(group: List[Tuple[str, str, str]], sentiment_only: bool) -> Dict[str, Dict[str, Any]]:
+            async with semaphore:
+                return await self._analyze_feedback_group(group, sentiment_only)
+
+        # Messages sharing a key may differ in case and edge punctuation; a same-language
+        # result's translation must be each item's own text
+        same_language_keys = {key for key, _, _ in same_language}
+        for group_results in await asyncio.gather(*(run_group(group, sentiment_only) for group, sentiment_only in groups)):
+            for key, result in group_results.items():
+                for index in pending[key]:
+                    if key in same_language_keys:
+                        results[index] = self._with_own_text(self._for_cache(result, True), items[index][0].strip())
+                    else:
+                        results[index] = result
+
+        return results
+
+    def _pack_feedback_items(self, items: List[Tuple[str, str, str]],
+                             sentiment_only: bool = False) -> List[List[Tuple[str, str, str]]]:
+        """Greedily pack (key, message, language) items into groups under the token budget"""
+        groups = []
+        current: List[Tuple[str, str, str]] = []
+        used = 0
+        for item in items:
+            cost = self._estimate_tokens(item[1], sentiment_only)
+            if current and (used + cost > settings.FEEDBACK_BATCH_TOKEN_BUDGET
+                            or len(current) >= settings.FEEDBACK_BATCH_MAX_ITEMS_PER_CALL):
+                groups.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += cost
+        if current:
+            groups.append(current)
+        return groups
+
+    def _estimate_tokens(self, feedback_message: str, sentiment_only: bool = False) -> int:
+        """Rough input + output token estimate for one item (message, its translation unless not needed, keywords)"""
+        return (len(feedback_message) // 4) * (1 if sentiment_only else 2) + 40
+
+    async def _analyze_feedback_group(self, group: List[Tuple[str, str, str]],
+                                      sentiment_only: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze one packed group; items the packed call fails to answer are retried on their own.
+        A sentiment_only group is already in its target language and is not translated.
+        """
+        if len(group) == 1:
+            _, feedback_message, target_language_code = group[0]
+            return {group[0][0]: await self._analyze_single(feedback_message, target_language_code, sentiment_only)}
+
+        results: Dict[str, Dict[str, Any]] = {}
+        entries: Dict[str, Any] = {}
+        try:
+            if sentiment_only:
+                packed = [{"id": index, "text": feedback_message} for index, (_, feedback_message, _) in enumerate(group)]
+                layout = FEEDBACK_BATCH_SENTIMENT_LAYOUT
+            else:
+                packed = [
+                    {"id": index, "text": feedback_message, "target_language_code": target_language_code}
+                    for index, (_, feedback_message, target_language_code) in enumerate(group)
+                ]
+                layout = FEEDBACK_BATCH_LAYOUT
+            prompt = layout.render(json.dumps(packed, ensure_ascii=False, indent=2))
+            tier = model_cascade.first_tier("feedback_batch")
+            llm_response = await model_cascade.complete(prompt, FEEDBACK_SYSTEM_MESSAGE, "feedback_batch", tier)
+            if model_cascade.escalation("feedback_batch", tier, model_cascade.response_signals(llm_response)):
+                llm_response = await model_cascade.complete(prompt, FEEDBACK_SYSTEM_MESSAGE, "feedback_batch", STRONG_TIER)
+
+            if "error" in llm_response:
+                logger.warning(f"Packed feedback call failed for {len(group)} items: {llm_response['error']}")
+            elif isinstance(llm_response.get("results"), list):
+                entries = {str(entry.get("id")): entry for entry in llm_response["results"] if isinstance(entry, dict)}
+        except (LLMOverloadedError, DeadlineExceededError) as e:
+            # Retrying item by item would only add load or time; fail just this group
+            return {key: self._create_error_response(str(e)) for key, _, _ in group}
+        except Exception as e:
+            logger.error(f"Error in packed feedback analysis: {e}")
+
+        retry = []
+        for index, (key, feedback_message, target_language_code) in enumerate(group):
+            entry = entries.get(str(index))
+            if entry is None:
+                retry.append((key, feedback_message, target_language_code))
+                continue
+
+            result = self._process_sentiment_response(entry, feedback_message if sentiment_only else None)
+            results[key] = result
+            if settings.FEEDBACK_CACHE_ENABLED:
+                await feedback_store.set(key, self._for_cache(result, sentiment_only))
+
+        if retry:
+            logger.warning(f"Retrying {len(retry)}/{len(group)} feedback items individually")
+            singles = await asyncio.gather(*(
+                self._analyze_single(feedback_message, target_language_code, sentiment_only)
+                for _, feedback_message, target_language_code in retry
+            ))
+            for (key, _, _), result in zip(retry, singles):
+                results[key] = result
+
+        return results
+
+    async def _analyze_single(self, feedback_message: str, target_language_code: str,
+                              same_language: bool = False) -> Dict[str, Any]:
+        """analyze_feedback for one batch item; overload or deadline fails the item, not the batch"""
+        try:
+            return await self.analyze_feedback(feedback_message, target_language_code, same_language)
+        except (LLMOverloadedError, DeadlineExceededError) as e:
+            return self._create_error_response(str(e))
+
+    def _in_target_language(self, feedback_message: str, target_language_code: str) -> bool:
+        """Whether the feedback is confidently identified as being in the target language already"""
+        if not settings.FEEDBACK_LANGID_ENABLED:
+            return False
+        with span("langid"):
+            language, confidence = detect_language(feedback_message)
+        self.stats["language_checks"] += 1
+        if (language is None or confidence < settings.FEEDBACK_LANGID_MIN_CONFIDENCE
+                or count_tokens(feedback_message) < settings.FEEDBACK_LANGID_MIN_TOKENS):
+            outcome = "undetected"
+        else:
+            self.stats["detected"][language] = self.stats["detected"].get(language, 0) + 1
+            outcome = "same_language" if language == normalize_language_code(target_language_code) else "other_language"
+        self.stats[outcome] += 1
+        FEEDBACK_LANGUAGE.labels(outcome).inc()
+        return outcome == "same_language"
+
+    def _create_feedback_prompt(self, feedback_message: str, target_language_code: str, same_language: bool = False) -> str:
+        """Create Feedback analysis prompt (without translation when the feedback is in the target language)"""
+        with span("prompt_render"):
+            if same_language:
+                return FEEDBACK_SENTIMENT_LAYOUT.render(feedback_message)
+            return FEEDBACK_LAYOUT.render(feedback_message, target_language_code=target_language_code)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return language identification counters"""
+        checks = self.stats["language_checks"]
+        return {
+            **self.stats,
+            "detected": dict(self.stats["detected"]),
+            "same_language_ratio": round(self.stats["same_language"] / checks, 4) if checks else 0.0,
+            "detection_rate": round((checks - self.stats["undetected"]) / checks, 4) if checks else 0.0,
+        }
 
-        return FEEDBACK_PROMPT.format(feedback_message, target_language_code,target_language_code)
+    @staticmethod
+    def _escalation_signals(llm_response: Dict[str, Any]) -> List[str]:
+        """Low-confidence signals of a feedback reply, for the model cascade"""
+        signals = list(model_cascade.response_signals(llm_response))
+        if "error" not in llm_response:
+            if "sentiment" not in llm_response or not isinstance(llm_response.get("keywords"), list):
+                signals.append("missing_entities")
+            elif llm_response["sentiment"] not in ("positive", "negative", "neutral"):
+                signals.append("catalog_mismatch")
+        return signals
 
-    def _process_sentiment_response(self, llm_response: Dict[str, Any]) -> Dict[str, Any]:
-        """Process and validate sentiment analysis response"""
+    def _process_sentiment_response(self, llm_response: Dict[str, Any], original_text: Optional[str] = None) -> Dict[str, Any]:
+        """Process and validate sentiment analysis response; `original_text` is the translation when given"""
         try:
             # Extract key information from LLM response
             sentiment = llm_response.get("sentiment", "neutral")
-            translation = llm_response.get("translation", "")
+            translation = original_text if original_text is not None else llm_response.get("translation", "")
             keywords = llm_response.get("keywords", [])
 
             # Validate sentiment value
@@ -75,6 +310,26 @@ class FeedbackService:
             logger.error(f"Error processing sentiment response: {e}")
             return self._create_error_response(str(e))
 
+    @staticmethod
+    def _for_cache(result: Dict[str, Any], same_language: bool) -> Dict[str, Any]:
+        """
+        The result as stored under a cache key. Keys are built from the normalized message,
+        so a same-language result is stored without its translation (the original text).
+        """
+        if not same_language or result.get("status") != "Success":
+            return result
+        return {**result, "result": [{**entry, "translation": None} for entry in result["result"]]}
+
+    @staticmethod
+    def _with_own_text(result: Dict[str, Any], feedback_message: str) -> Dict[str, Any]:
+        """A cached result whose stored-empty translation is filled with this message's own text"""
+        if all(entry.get("translation") is not None for entry in result.get("result", [])):
+            return result
+        return {**result, "result": [
+            {**entry, "translation": feedback_message if entry.get("translation") is None else entry["translation"]}
+            for entry in result["result"]
+        ]}
+
     def _create_error_response(self, error_message: str) -> Dict[str, Any]:
         """Create error response"""
         return {
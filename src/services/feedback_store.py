@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+from src.config.settings import settings
+from src.services.response_cache import ResponseCache
+from src.utils.prompts import (
+    FEEDBACK_PROMPT, FEEDBACK_SENTIMENT_PROMPT, FEEDBACK_BATCH_PROMPT, FEEDBACK_BATCH_SENTIMENT_PROMPT
+)
+from src.utils.text import normalize_message
+from src.utils.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+def _prompt_version() -> str:
+    """
+    Changing a prompt or a model must not serve results produced by the old one. Batch results
+    are stored under the same keys, so the batch prompts count as well; with the model cascade,
+    answers also come from its fast and strong models.
+    """
+    return hashlib.sha256("\x00".join([
+        settings.OPENAI_MODEL,
+        settings.LLM_CASCADE_FAST_MODEL if settings.LLM_CASCADE_ENABLED else "",
+        settings.LLM_CASCADE_STRONG_MODEL if settings.LLM_CASCADE_ENABLED else "",
+        FEEDBACK_PROMPT, FEEDBACK_SENTIMENT_PROMPT, FEEDBACK_BATCH_PROMPT, FEEDBACK_BATCH_SENTIMENT_PROMPT
+    ]).encode("utf-8")).hexdigest()[:12]
+
+
+FEEDBACK_PROMPT_VERSION = _prompt_version()
+
+# Avoid a write on every hit; access times only need to be roughly right for eviction
+_TOUCH_INTERVAL_SECONDS = 300
+# Check the row count once every N inserts rather than on every insert
+_EVICTION_CHECK_EVERY = 100
+
+
+class FeedbackStore:
+    """
+    Persistent feedback-analysis result store shared by all worker processes.
+    SQLite in WAL mode on disk, fronted by a small per-process in-memory LRU.
+    """
+
+    def __init__(self, path: str, max_entries: int, warm_start_size: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.warm_start_size = warm_start_size
+        self._memory = ResponseCache("feedback_memory", max(warm_start_size, 1), float("inf"))
+        self._local = threading.local()
+        self._initialized = False
+        self._inserts = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def make_key(self, feedback_message: str, target_language_code: str) -> str:
+        """Build a key from the normalized feedback, target language and prompt version"""
+        raw = f"{FEEDBACK_PROMPT_VERSION}\x00{(target_language_code or '').lower()}\x00{normalize_message(feedback_message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS feedback_results ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_last_access ON feedback_results(last_access)")
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._connection()
+        row = conn.execute("SELECT response, last_access FROM feedback_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if now - row[1] > _TOUCH_INTERVAL_SECONDS:
+            conn.execute("UPDATE feedback_results SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Dict[str, Any]) -> int:
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO feedback_results (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now)
+        )
+        conn.commit()
+
+        self._inserts += 1
+        if self._inserts % _EVICTION_CHECK_EVERY != 0:
+            return 0
+        return self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Delete least recently accessed rows above max_entries"""
+        count = conn.execute("SELECT COUNT(*) FROM feedback_results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+
+        conn.execute(
+            "DELETE FROM feedback_results WHERE key IN "
+            "(SELECT key FROM feedback_results ORDER BY last_access ASC LIMIT ?)",
+            (excess,)
+        )
+        conn.commit()
+        logger.info(f"Evicted {excess} feedback results from {self.path}")
+        return excess
+
+    def _load_recent(self) -> int:
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT key, response FROM feedback_results ORDER BY last_access DESC LIMIT ?",
+            (self.warm_start_size,)
+        ).fetchall()
+        # Insert oldest first so the most recent entries end up at the MRU end
+        for key, response in reversed(rows):
+            self._memory.set(key, json.loads(response))
+        return len(rows)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result in memory, then on disk"""
+        cached = self._memory.get(key)
+        if cached is not None:
+            self.stats["memory_hits"] += 1
+            return cached
+
+        try:
+            value = await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Error reading feedback store: {e}")
+            return None
+
+        if value is None:
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.labels("feedback_disk", "miss").inc()
+            return None
+
+        self.stats["disk_hits"] += 1
+        CACHE_LOOKUPS.labels("feedback_disk", "hit").inc()
+        self._memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Persist a successful result; errors are never stored"""
+        if not isinstance(value, dict) or value.get("status") == "Error":
+            return
+
+        self._memory.set(key, value)
+        try:
+            self.stats["evictions"] += await asyncio.to_thread(self._set, key, value)
+            self.stats["writes"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Error writing feedback store: {e}")
+
+    async def warm_start(self) -> None:
+        """Preload the most recently used results into memory after a (re)deploy"""
+        if self._initialized:
+            return
+        self._initialized = True
+        try:
+            loaded = await asyncio.to_thread(self._load_recent)
+            logger.info(f"Warm-started feedback store with {loaded} results from {self.path}")
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Error warm-starting feedback store: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return store counters"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_size": len(self._memory),
+            "max_entries": self.max_entries,
+            "prompt_version": FEEDBACK_PROMPT_VERSION,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global instance
+feedback_store = FeedbackStore(
+    settings.FEEDBACK_CACHE_PATH,
+    settings.FEEDBACK_CACHE_MAX_ENTRIES,
+    settings.FEEDBACK_CACHE_WARM_START_SIZE
+)
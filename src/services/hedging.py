@@ -0,0 +1,62 @@
+import logging
+import math
+from collections import deque
+from typing import Dict, Any, Deque, Optional
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """
+    Decides when a slow upstream LLM call gets a second, hedged attempt.
+
+    The hedge delay is a percentile of a rolling window of recent successful call
+    latencies; the number of hedges is capped at a fraction of recent calls so a
+    slow upstream is not hit with twice the load.
+    """
+
+    def __init__(self, percentile: float, window: int, min_samples: int, max_rate: float):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self._latencies: Deque[float] = deque(maxlen=window)
+        # Recent upstream calls: 0 for a primary call, 1 for a hedge
+        self._recent: Deque[int] = deque(maxlen=window)
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "rate_limited": 0, "no_slot": 0}
+
+    def record_latency(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait for the primary call before hedging, or None while there are too few samples"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)]
+
+    def start_call(self) -> None:
+        self.stats["calls"] += 1
+        self._recent.append(0)
+
+    def allow_hedge(self) -> bool:
+        """Whether one more hedge stays within the hedge rate cap over recent upstream calls"""
+        if sum(self._recent) + 1 > self.max_rate * (len(self._recent) + 1):
+            self.stats["rate_limited"] += 1
+            return False
+        return True
+
+    def record_hedge(self) -> None:
+        self._recent.append(1)
+        self.stats["hedged"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hedge counters and the current hedge delay"""
+        delay = self.delay()
+        return {
+            **self.stats,
+            "enabled": settings.LLM_HEDGE_ENABLED,
+            "samples": len(self._latencies),
+            "delay_seconds": round(delay, 4) if delay is not None else None,
+            "recent_hedge_rate": round(sum(self._recent) / len(self._recent), 4) if self._recent else 0.0,
+        }
@@ -0,0 +1,139 @@
+import math
+import re
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from src.config.settings import settings
+from src.data.loader import CatalogSnapshot
+from src.utils.metrics import INTENT_PREFILTER
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "but", "by", "can", "do", "for", "from", "have", "i", "if",
+    "in", "is", "it", "its", "me", "my", "of", "on", "or", "so", "that", "the", "this", "to", "was",
+    "we", "what", "when", "with", "you", "your", "would", "like", "please", "copy", "ref", "v",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase stemmed tokens (handles snake_case, CamelCase and UPPER_CASE)"""
+    tokens = []
+    for raw in _TOKEN_RE.findall(text or ""):
+        token = raw.lower()
+        if token in _STOPWORDS or len(token) < 2:
+            continue
+        # Crude prefix stemming keeps "browsing"/"browse" and "slowly"/"slow" together
+        tokens.append(token[:5])
+    return tokens
+
+
+class _RetrievalIndex:
+    """Term frequencies of the intents of one catalog snapshot"""
+
+    def __init__(self, intents: List[Dict[str, Any]]):
+        """Index intent names, entity labels and option values"""
+        self.documents: List[Tuple[Dict[str, Any], Dict[str, int]]] = []
+        self.doc_freq: Dict[str, int] = {}
+        for intent in intents:
+            parts = [intent.get("intent", ""), intent.get("intentId", "")]
+            for entity in intent.get("entity", []):
+                parts.append(entity.get("label", ""))
+                parts.append(entity.get("id", ""))
+                parts.extend(str(option) for option in entity.get("options", []))
+
+            term_freq: Dict[str, int] = {}
+            for token in tokenize(" ".join(parts)):
+                term_freq[token] = term_freq.get(token, 0) + 1
+            for token in term_freq:
+                self.doc_freq[token] = self.doc_freq.get(token, 0) + 1
+            self.documents.append((intent, term_freq))
+
+    def idf(self, token: str) -> float:
+        return math.log(1 + (len(self.documents) + 1) / (self.doc_freq.get(token, 0) + 0.5))
+
+
+class IntentRetriever:
+    """Rank catalog intents against a user message in-process, before calling the LLM"""
+
+    def __init__(self):
+        # One index per catalog version, so requests alternating between tenant catalogs do not rebuild
+        self._indexes: "OrderedDict[str, _RetrievalIndex]" = OrderedDict()
+        self.stats = {"requests": 0, "filtered": 0, "fallbacks": 0, "disabled": 0}
+
+    def _get_index(self, snapshot: CatalogSnapshot) -> _RetrievalIndex:
+        index = self._indexes.get(snapshot.version)
+        if index is not None:
+            self._indexes.move_to_end(snapshot.version)
+            return index
+
+        index = self._indexes[snapshot.version] = _RetrievalIndex(snapshot.intents_data.get("intents") or [])
+        while len(self._indexes) > settings.CATALOG_CACHE_MAX_ENTRIES + 1:
+            self._indexes.popitem(last=False)
+        logger.info(f"Built intent retrieval index over {len(index.documents)} intents")
+        return index
+
+    def rank(self, user_message: str, snapshot: CatalogSnapshot) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Score every intent of the snapshot against the message.
+        The score is the share of the message's IDF mass covered by the intent, in [0, 1].
+        """
+        index = self._get_index(snapshot)
+
+        query = set(tokenize(user_message))
+        if not query:
+            return [(0.0, intent) for intent, _ in index.documents]
+
+        weights = {token: index.idf(token) for token in query}
+        total = sum(weights.values())
+
+        scored = []
+        for intent, term_freq in index.documents:
+            matched = sum(weight for token, weight in weights.items() if token in term_freq)
+            scored.append((matched / total, intent))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
+
+    def select_candidates(self, user_message: str, snapshot: CatalogSnapshot) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the top-k candidate intents for the message, or None when the whole
+        catalog should be sent (pre-filter disabled, catalog already small, or low confidence).
+        """
+        self.stats["requests"] += 1
+        intents_data = snapshot.intents_data
+        intents = intents_data.get("intents") if isinstance(intents_data, dict) else None
+
+        if not settings.INTENT_PREFILTER_ENABLED or not intents or len(intents) <= settings.INTENT_PREFILTER_TOP_K:
+            self.stats["disabled"] += 1
+            INTENT_PREFILTER.labels("disabled").inc()
+            return None
+
+        ranked = self.rank(user_message, snapshot)
+        candidates = [intent for score, intent in ranked[:settings.INTENT_PREFILTER_TOP_K]
+                      if score >= settings.INTENT_PREFILTER_MIN_SCORE]
+
+        if not candidates:
+            self.stats["fallbacks"] += 1
+            INTENT_PREFILTER.labels("fallback").inc()
+            logger.info(f"Intent pre-filter low confidence (best score {ranked[0][0]:.2f}), sending all intents")
+            return None
+
+        self.stats["filtered"] += 1
+        INTENT_PREFILTER.labels("filtered").inc()
+        logger.info(f"Intent pre-filter selected {len(candidates)}/{len(intents)} intents")
+        return candidates
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return pre-filter counters"""
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "fallback_rate": round(self.stats["fallbacks"] / requests, 4) if requests else 0.0,
+        }
+
+
+# Global instance
+intent_retriever = IntentRetriever()
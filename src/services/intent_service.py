@@ -1,57 +1,492 @@
+import asyncio
+import contextvars
 import json
 import logging
-from typing import Dict, Any, List, Optional
+import random
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 from datetime import datetime
-from src.services.llm_service import llm_service
-from src.data.loader import data_loader
+from src.services.llm_service import llm_service, LLMOverloadedError, INVALID_JSON_ERROR
+from src.utils.deadline import DeadlineExceededError
+from src.data.loader import data_loader, CatalogSnapshot
+from src.config.settings import settings
+from src.utils.prompts import CHATBOT_SYSTEM_MESSAGE, SLOT_FILLING_PROMPT, REASK_PROMPT
+from src.utils.prompt_builder import PromptLayout
+from src.services.intent_retriever import intent_retriever
+from src.services.response_cache import response_cache
+from src.services.session_store import session_store
+from src.services.response_builder import build_entity, build_intent_response
+from src.services.option_matcher import option_matcher
+from src.services.output_validator import output_validator
+from src.services.model_cascade import model_cascade, STRONG_TIER
+from src.services.similarity_cache import similarity_cache, SimilarMatch
+from src.utils.json_stream import IncrementalJSONParser
+from src.utils.structured_log import log_event
+from src.utils.timing import span
 
 logger = logging.getLogger(__name__)
 
+_HEADER_FIELDS = ("intent", "intentId")
+
+# Validator repairs showing an answer disagrees with the catalog (model cascade signal)
+_CATALOG_MISMATCH_REPAIRS = frozenset({"unknown_intent", "intent_id_from_name", "dropped_entity", "nulled_option"})
+
+SLOT_FILLING_LAYOUT = PromptLayout("slot_filling", SLOT_FILLING_PROMPT, "user_message")
+
 
 class IntentService:
 
     def __init__(self):
-        pass
+        self.stats = {"full_classifications": 0, "slot_filling": 0, "intent_switches": 0}
+        # Background false-reuse audits, referenced until they finish
+        self._audits: set = set()
 
-    async def process_message(self, user_message: str, active_intent_id: Optional[str] = None) -> Dict[str, Any]:
+    async def process_message(
+            self,
+            user_message: str,
+            active_intent_id: Optional[str] = None,
+            session_id: Optional[str] = None,
+            snapshot: Optional[CatalogSnapshot] = None
+    ) -> Dict[str, Any]:
         """
         Process user message using single unified prompt approach.
         Handles both intent classification and entity extraction in one call.
-        The active_intent_id parameter is ignored since we use single prompt for everything.
+        On a follow-up turn (active_intent_id given, or known from the session), a much
+        smaller prompt only extracts the active intent's unfilled entities, falling back
+        to full classification when the customer switches intent.
+        `snapshot` is the tenant catalog to use (the default catalog when not given).
         """
         try:
-            # Get intents data (mapping)
-            intents_data = data_loader.get_all_intents_formatted()
+            # One snapshot per request, so a concurrent reload cannot mix catalog versions
+            snapshot = snapshot or data_loader.get_snapshot()
 
-            # Get response format template
-            response_format = data_loader.load_response_format()
+            session = await self._load_session(session_id)
+            previous_intent_id = active_intent_id or (session or {}).get("intentId")
 
-            logger.info(f"Processing message with single prompt approach: {user_message}")
-            if active_intent_id:
-                logger.info(
-                    f"Note: Active intent {active_intent_id} provided but single prompt approach will classify from scratch")
+            if previous_intent_id:
+                response = await self._fill_slots(user_message, previous_intent_id, session, snapshot)
+                if response is not None:
+                    await self._save_session(session_id, response)
+                    return response
 
-            # Call LLM with single unified prompt
-            llm_response = await llm_service.process_message(
-                intents_data, user_message, response_format
-            )
+            self.stats["full_classifications"] += 1
+            cache_key, response = self._lookup_cache(user_message, snapshot)
+            if response is None:
+                # Deterministic fast path for messages that map unambiguously onto OPTION entities
+                local, confidence = None, 0.0
+                if settings.OPTION_FAST_PATH_MODE in ("on", "shadow"):
+                    local, confidence = option_matcher.match(user_message, snapshot)
 
-            if "error" in llm_response:
-                return self._create_error_response(llm_response["error"])
+                if (settings.OPTION_FAST_PATH_MODE == "on" and local is not None
+                        and confidence >= settings.OPTION_FAST_PATH_MIN_CONFIDENCE):
+                    log_event(logger, "intent.local_match", confidence=round(confidence, 3))
+                    option_matcher.stats["served_locally"] += 1
+                    response = local
+                else:
+                    # A paraphrase of an answered message only needs its entities extracted
+                    response = await self._reuse_similar(user_message, snapshot)
+                if response is None:
+                    # Call LLM with single unified prompt
+                    prompt = self._build_prompt(user_message, snapshot)
+                    tier = model_cascade.first_tier("intent")
+                    llm_response = await model_cascade.complete(prompt, CHATBOT_SYSTEM_MESSAGE, "intent", tier)
+                    response = await self._finalize_response(llm_response, prompt, snapshot, cache_key, tier)
+                    option_matcher.record_shadow(local, confidence, response)
+                    self._remember_similar(user_message, response, snapshot)
 
-            response = llm_response
-            if isinstance(llm_response,str):
-                response = json.loads(llm_response)
+            if response.get("status") != "Error" and previous_intent_id:
+                result = response["result"][0]
+                result["intent_changed"] = result.get("intentId") != previous_intent_id
+                result["previous_intentId"] = previous_intent_id
 
-            response["result"][0]["intent_changed"] = None
-            response["result"][0]["previous_intentId"] = None
-            # Process and validate the response
+            await self._save_session(session_id, response)
             return response
 
+        except (LLMOverloadedError, DeadlineExceededError):
+            raise
         except Exception as e:
             logger.error(f"Error in message processing: {e}")
             return self._create_error_response(str(e))
 
+    async def stream_message(
+            self,
+            user_message: str,
+            active_intent_id: Optional[str] = None,
+            snapshot: Optional[CatalogSnapshot] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of process_message. Yields ("intent", ...) as soon as the
+        intent is decided, one ("entity", ...) per completed entity, then ("result", ...)
+        with the same payload process_message returns (or ("error", ...)).
+        Not cascaded: events already sent cannot be taken back, so it uses OPENAI_MODEL.
+        """
+        try:
+            snapshot = snapshot or data_loader.get_snapshot()
+
+            cache_key, cached = self._lookup_cache(user_message, snapshot)
+            if cached is not None:
+                result = cached["result"][0]
+                yield "intent", {"intent": result.get("intent"), "intentId": result.get("intentId")}
+                for entity in result.get("entity") or []:
+                    yield "entity", entity
+                yield "result", cached
+                return
+
+            prompt = self._build_prompt(user_message, snapshot)
+
+            header: Dict[str, Any] = {}
+            intent_sent = False
+            parser = IncrementalJSONParser(self._is_streamed_path)
+            async for chunk in llm_service.stream_completion(prompt, CHATBOT_SYSTEM_MESSAGE, prompt_kind="intent"):
+                for path, value in parser.feed(chunk):
+                    if path[0] == "entities":
+                        # Compact output: one entity id -> value pair, expanded from the catalog
+                        entity = self._expand_streamed_entity(header.get("intentId"), path[1], value, snapshot)
+                        if entity is not None:
+                            if not intent_sent:
+                                intent_sent = True
+                                yield "intent", dict(header)
+                            yield "entity", entity
+                        continue
+
+                    if path[-1] in _HEADER_FIELDS:
+                        header[path[-1]] = value
+                        if path == ("intentId",) and "intent" not in header:
+                            # Compact output carries no intent name
+                            intent_config = snapshot.get_intent(value)
+                            header["intent"] = intent_config.get("intent") if intent_config else "Unknown"
+                        if not intent_sent and "intent" in header and "intentId" in header:
+                            intent_sent = True
+                            yield "intent", dict(header)
+                        continue
+
+                    # An entity completed; the intent is decided by now even if a header field is missing
+                    if not intent_sent:
+                        intent_sent = True
+                        yield "intent", dict(header)
+                    yield "entity", value
+
+            try:
+                llm_response = json.loads(parser.text)
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse streamed LLM response as JSON: {e}")
+                llm_response = {"error": INVALID_JSON_ERROR}
+
+            response = await self._finalize_response(llm_response, prompt, snapshot, cache_key)
+            yield ("error" if response.get("status") == "Error" else "result"), response
+
+        except Exception as e:
+            logger.error(f"Error in streaming message processing: {e}")
+            yield "error", self._create_error_response(str(e))
+
+    @staticmethod
+    def _is_streamed_path(path: Tuple) -> bool:
+        """Intent header fields and completed entities of the first result (or of the compact output)"""
+        if not path or len(path) > 4:
+            return False
+        if len(path) == 2 and path[0] == "entities":
+            return isinstance(path[1], str)
+        if path[-1] in _HEADER_FIELDS:
+            return len(path) == 1 or (len(path) == 3 and path[0] == "result")
+        return len(path) >= 2 and path[-2] == "entity" and isinstance(path[-1], int)
+
+    @staticmethod
+    def _expand_streamed_entity(
+            intent_id: Optional[str],
+            entity_id: str,
+            value: Any,
+            snapshot: CatalogSnapshot
+    ) -> Optional[Dict[str, Any]]:
+        """Full entity for a streamed compact value; None for entities the intent does not have"""
+        entity_config = snapshot.get_entity(intent_id, entity_id) if intent_id else None
+        if entity_config is None:
+            return None
+        if entity_config.get("type") == "OPTION":
+            value, _ = output_validator.check_option(snapshot, intent_id, entity_id, value)
+        return build_entity(entity_config, value)
+
+    def _lookup_cache(self, user_message: str, snapshot: CatalogSnapshot) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Serve repeated messages from the cache (keyed on the catalog version as well)"""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None, None
+
+        with span("cache"):
+            cache_key = response_cache.make_key(user_message, snapshot.version)
+            cached = response_cache.get(cache_key)
+        if cached is not None:
+            log_event(logger, "intent.cache_hit")
+        return cache_key, cached
+
+    def _build_prompt(self, user_message: str, snapshot: CatalogSnapshot) -> str:
+        """Render the intent prompt, narrowed to the top-k candidate intents when confident"""
+        with span("prefilter"):
+            candidates = intent_retriever.select_candidates(user_message, snapshot)
+
+        log_event(logger, "intent.classify", candidate_intents=len(candidates) if candidates is not None else "all")
+        with span("prompt_render"):
+            return snapshot.render_chatbot_prompt(user_message, candidates)
+
+    async def _reuse_similar(self, user_message: str, snapshot: CatalogSnapshot) -> Optional[Dict[str, Any]]:
+        """
+        Serve a near-duplicate of an answered message from its intent: directly when the
+        intent has no entities, else after extracting this message's entity values with the
+        slot-filling prompt. None (full classification) on a miss or when extraction rejects it.
+        """
+        if not settings.SIMILARITY_CACHE_ENABLED:
+            return None
+        with span("similarity"):
+            match = similarity_cache.lookup(user_message, snapshot)
+        intent_config = snapshot.get_intent(match.intent_id) if match is not None else None
+        if intent_config is None:
+            return None
+
+        log_event(logger, "intent.similar_reuse", intent_id=match.intent_id, similarity=match.similarity)
+        if not intent_config.get("entity"):
+            similarity_cache.record_reuse("direct")
+            response = build_intent_response(intent_config, {}, source="similarity-cache")
+        else:
+            response = await self._fill_slots(user_message, match.intent_id, None, snapshot, reused=True)
+            if response is None:
+                # The extraction step saw a different topic (or failed): classify from scratch
+                similarity_cache.record_reuse("rejected")
+                return None
+            similarity_cache.record_reuse("extraction")
+
+        if random.random() < settings.SIMILARITY_CACHE_AUDIT_RATE:
+            self._schedule_audit(user_message, match, snapshot)
+        return response
+
+    def _remember_similar(self, user_message: str, response: Dict[str, Any], snapshot: CatalogSnapshot) -> None:
+        """Index a fully classified message for near-duplicate reuse (matched intents only)"""
+        if not settings.SIMILARITY_CACHE_ENABLED or response.get("status") == "Error":
+            return
+        result = response["result"][0]
+        if result.get("is_matched"):
+            similarity_cache.add(user_message, result.get("intentId"), snapshot)
+
+    def _schedule_audit(self, user_message: str, match: SimilarMatch, snapshot: CatalogSnapshot) -> None:
+        """Re-classify a reused message in the background, outside the request's deadline and spans"""
+        task = asyncio.get_running_loop().create_task(
+            self._audit_reuse(user_message, match, snapshot), context=contextvars.Context()
+        )
+        self._audits.add(task)
+        task.add_done_callback(self._audits.discard)
+
+    async def _audit_reuse(self, user_message: str, match: SimilarMatch, snapshot: CatalogSnapshot) -> None:
+        """Compare a reused intent with a full classification on the strong model"""
+        try:
+            prompt = self._build_prompt(user_message, snapshot)
+            llm_response = await model_cascade.complete(prompt, CHATBOT_SYSTEM_MESSAGE, "intent_audit", STRONG_TIER)
+        except (LLMOverloadedError, DeadlineExceededError):
+            # Audits never compete with live traffic for LLM capacity
+            similarity_cache.record_audit("skipped")
+            return
+        except Exception as e:
+            logger.error(f"Similarity cache audit failed: {e}")
+            similarity_cache.record_audit("inconclusive")
+            return
+
+        response, _, _ = output_validator.validate(llm_response, snapshot)
+        if response is None:
+            similarity_cache.record_audit("inconclusive")
+            return
+        intent_id = response["result"][0].get("intentId")
+        if intent_id == match.intent_id:
+            similarity_cache.record_audit("agreed")
+            return
+
+        similarity_cache.record_audit("false_reuse")
+        log_event(
+            logger, "intent.false_reuse", level=logging.WARNING, message=user_message, matched_message=match.message,
+            similarity=match.similarity, reused_intent_id=match.intent_id, audited_intent_id=intent_id
+        )
+        # The audited answer becomes the nearest neighbour for this wording from now on
+        self._remember_similar(user_message, response, snapshot)
+
+    async def _load_session(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not session_id or not settings.SESSION_STORE_ENABLED:
+            return None
+        return await session_store.get(session_id)
+
+    async def _save_session(self, session_id: Optional[str], response: Dict[str, Any]) -> None:
+        """Remember the active intent and the entity values filled so far"""
+        if not session_id or not settings.SESSION_STORE_ENABLED or response.get("status") == "Error":
+            return
+
+        result = response["result"][0]
+        entities = {}
+        for entity in result.get("entity") or []:
+            if not isinstance(entity, dict):
+                continue
+            value = entity.get("user_input") or entity.get("response")
+            if value not in (None, ""):
+                entities[entity.get("id")] = value
+
+        await session_store.save(session_id, {"intentId": result.get("intentId"), "entities": entities})
+
+    async def _fill_slots(
+            self,
+            user_message: str,
+            intent_id: str,
+            session: Optional[Dict[str, Any]],
+            snapshot: CatalogSnapshot,
+            reused: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Extract only the remaining entities of the active intent.
+        Returns None when full classification is needed (unknown intent, nothing left
+        to fill, intent switch, or a failed call).
+        `reused` marks an intent taken from a near-duplicate message rather than the session.
+        """
+        intent_config = snapshot.get_intent(intent_id)
+        if intent_config is None:
+            return None
+
+        filled = dict(session.get("entities") or {}) if session and session.get("intentId") == intent_id else {}
+        remaining = [entity for entity in intent_config.get("entity", []) if filled.get(entity.get("id")) in (None, "")]
+        if not remaining:
+            return None
+
+        # A reply to the pending OPTION question ("leave it") can often be resolved locally
+        local, confidence = None, 0.0
+        if settings.OPTION_FAST_PATH_MODE in ("on", "shadow") and not reused:
+            local, confidence = option_matcher.match(user_message, snapshot, intent_id, filled)
+            if (settings.OPTION_FAST_PATH_MODE == "on" and local is not None
+                    and confidence >= settings.OPTION_FAST_PATH_MIN_CONFIDENCE):
+                log_event(logger, "intent.local_match", confidence=round(confidence, 3), intent_id=intent_id)
+                option_matcher.stats["served_locally"] += 1
+                self.stats["slot_filling"] += 1
+                return local
+
+        with span("prompt_render"):
+            entities = json.dumps(
+                [{key: entity.get(key) for key in ("id", "label", "type", "options")} for entity in remaining],
+                separators=(",", ":"), ensure_ascii=False
+            )
+            prompt = SLOT_FILLING_LAYOUT.render(
+                user_message, intent_name=intent_config.get("intent", intent_id), entities=entities
+            )
+        log_event(logger, "intent.slot_filling", intent_id=intent_id, remaining_entities=len(remaining))
+
+        tier = model_cascade.first_tier("slot_filling")
+        llm_response = await model_cascade.complete(prompt, CHATBOT_SYSTEM_MESSAGE, "slot_filling", tier)
+        extracted, signals = self._extract_slots(llm_response, remaining, intent_id, snapshot)
+        if model_cascade.escalation("slot_filling", tier, [*model_cascade.response_signals(llm_response), *signals]):
+            llm_response = await model_cascade.complete(prompt, CHATBOT_SYSTEM_MESSAGE, "slot_filling", STRONG_TIER)
+            extracted, _ = self._extract_slots(llm_response, remaining, intent_id, snapshot)
+
+        if not isinstance(llm_response, dict) or "error" in llm_response:
+            error = llm_response.get("error") if isinstance(llm_response, dict) else "reply is not a JSON object"
+            logger.warning(f"Slot filling failed, falling back to full classification: {error}")
+            return None
+
+        if llm_response.get("intent_switch"):
+            if not reused:
+                self.stats["intent_switches"] += 1
+            log_event(logger, "intent.switch", intent_id=intent_id)
+            return None
+
+        filled.update(extracted)
+        if reused:
+            return build_intent_response(intent_config, filled, source="similarity-cache-slot-filling")
+        self.stats["slot_filling"] += 1
+        response = build_intent_response(
+            intent_config, filled, intent_changed=False, previous_intent_id=intent_id, source="session-slot-filling"
+        )
+        option_matcher.record_shadow(local, confidence, response)
+        return response
+
+    @staticmethod
+    def _extract_slots(
+            llm_response: Dict[str, Any],
+            remaining: List[Dict[str, Any]],
+            intent_id: str,
+            snapshot: CatalogSnapshot
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """Valid values of the remaining entities in a slot-filling reply, plus cascade signals"""
+        values: Dict[str, Any] = {}
+        signals: List[str] = []
+        extracted = llm_response.get("entities") if isinstance(llm_response, dict) else None
+        extracted = extracted if isinstance(extracted, dict) else {}
+        for entity in remaining:
+            value = extracted.get(entity.get("id"))
+            if value in (None, ""):
+                continue
+            if entity.get("type") == "OPTION":
+                value, repair = output_validator.check_option(snapshot, intent_id, entity.get("id"), value)
+                if repair:
+                    logger.warning(f"Slot filling {repair.replace('_', ' ')} for entity {entity.get('id')}")
+                if repair in _CATALOG_MISMATCH_REPAIRS:
+                    signals.append("catalog_mismatch")
+                if value is None:
+                    continue
+            values[entity.get("id")] = value
+        return values, signals
+
+    @staticmethod
+    def _escalation_signals(llm_response: Any, response: Optional[Dict[str, Any]], repairs: List[str]) -> List[str]:
+        """Low-confidence signals of a validated intent result, for the model cascade"""
+        signals = list(model_cascade.response_signals(llm_response))
+        if response is None:
+            # Parsed, but not usable as an intent result
+            signals.append("invalid_json")
+        else:
+            if not response["result"][0].get("is_matched"):
+                signals.append("unknown_intent")
+            if "filled_entity" in repairs:
+                signals.append("missing_entities")
+        if _CATALOG_MISMATCH_REPAIRS.intersection(repairs):
+            signals.append("catalog_mismatch")
+        return signals
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return routing counters"""
+        return dict(self.stats)
+
+    async def _finalize_response(
+            self,
+            llm_response: Any,
+            prompt: str,
+            snapshot: CatalogSnapshot,
+            cache_key: Optional[str],
+            tier: str = STRONG_TIER
+    ) -> Dict[str, Any]:
+        """
+        Validate and repair the LLM output against the catalog, escalate a fast-tier answer
+        to the strong model on a low-confidence signal, re-ask once when it is unusable,
+        then turn it into the response payload and cache it
+        """
+        if isinstance(llm_response, dict) and llm_response.get("error") not in (None, INVALID_JSON_ERROR):
+            # Upstream failure rather than a bad reply; asking again would not help
+            return self._create_error_response(llm_response["error"])
+
+        with span("validate"):
+            response, problem, repairs = output_validator.validate(llm_response, snapshot)
+        if model_cascade.escalation("intent", tier, self._escalation_signals(llm_response, response, repairs)):
+            llm_response = await model_cascade.complete(prompt, CHATBOT_SYSTEM_MESSAGE, "intent", STRONG_TIER)
+            if isinstance(llm_response, dict) and llm_response.get("error") not in (None, INVALID_JSON_ERROR):
+                return self._create_error_response(llm_response["error"])
+            response, problem, _ = output_validator.validate(llm_response, snapshot)
+
+        if response is None and settings.OUTPUT_REASK_ENABLED:
+            output_validator.stats["reasks"] += 1
+            log_event(logger, "intent.reask", level=logging.WARNING, problem=problem)
+            llm_response = await model_cascade.complete(
+                prompt + REASK_PROMPT.format(problem=problem), CHATBOT_SYSTEM_MESSAGE, "intent_reask", STRONG_TIER
+            )
+            response, problem, _ = output_validator.validate(llm_response, snapshot)
+            if response is not None:
+                output_validator.stats["reask_recovered"] += 1
+        if response is None:
+            error = llm_response.get("error") if isinstance(llm_response, dict) else None
+            return self._create_error_response(error or f"Unusable LLM response: {problem}")
+
+        response["result"][0]["intent_changed"] = None
+        response["result"][0]["previous_intentId"] = None
+
+        if cache_key is not None:
+            response_cache.set(cache_key, response)
+        return response
+
     def _create_error_response(self, error_message: str) -> Dict[str, Any]:
         """Create error response"""
         return {
@@ -0,0 +1,235 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Any, AsyncIterator, List, Optional
+import httpx
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_OPENAI_API_URL = "https://api.openai.com/v1"
+
+
+class LLMResult:
+    """Completion text plus normalized token usage (prompt, cached, completion)"""
+    __slots__ = ("content", "usage")
+
+    def __init__(self, content: str, usage: Optional[Dict[str, int]] = None):
+        self.content = content
+        self.usage = usage
+
+
+class LLMHTTPError(Exception):
+    """Upstream answered with an HTTP error status; `response` carries the headers (Retry-After)"""
+
+    def __init__(self, status_code: int, response: Any = None, message: str = ""):
+        super().__init__(message or f"LLM API returned HTTP {status_code}")
+        self.status_code = status_code
+        self.response = response
+
+
+class LLMConnectionError(Exception):
+    """Upstream could not be reached or timed out"""
+
+
+def _openai_usage(usage: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """Normalize an OpenAI `usage` object"""
+    if not usage:
+        return None
+    return {
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+    }
+
+
+def _pooled_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS
+    )
+
+
+class LLMBackend(ABC):
+    """One upstream chat completion in JSON mode, plain or streamed; retries are up to the caller"""
+
+    name = "base"
+
+    @abstractmethod
+    async def complete(self, system_message: Optional[str], prompt: str, model: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> LLMResult:
+        """`model` and `max_tokens` override OPENAI_MODEL and OPENAI_MAX_TOKENS for this call"""
+
+    @abstractmethod
+    def stream(self, system_message: Optional[str], prompt: str) -> AsyncIterator[LLMResult]:
+        """Yield text chunks; the last chunk may carry only usage"""
+
+
+class HTTPBackend(LLMBackend):
+    """Direct calls to the chat completions API over a pooled httpx client"""
+
+    name = "http"
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.url = (settings.OPENAI_BASE_URL or _OPENAI_API_URL).rstrip("/") + "/chat/completions"
+        self._client = http_client or _pooled_client()
+        self._headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+
+    def _body(self, system_message: Optional[str], prompt: str, stream: bool, model: Optional[str] = None,
+              max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        messages: List[Dict[str, str]] = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+        body = {
+            "model": model or settings.OPENAI_MODEL,
+            "temperature": settings.OPENAI_TEMPERATURE,
+            "max_tokens": max_tokens or settings.OPENAI_MAX_TOKENS,
+            "response_format": {"type": "json_object"},
+            "messages": messages,
+        }
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    @staticmethod
+    def _error(response: httpx.Response) -> LLMHTTPError:
+        try:
+            message = response.json().get("error", {}).get("message", "")
+        except (ValueError, AttributeError):
+            message = response.text[:200]
+        return LLMHTTPError(response.status_code, response, f"LLM API returned HTTP {response.status_code}: {message}")
+
+    async def complete(self, system_message: Optional[str], prompt: str, model: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> LLMResult:
+        body = self._body(system_message, prompt, False, model, max_tokens)
+        try:
+            response = await self._client.post(self.url, json=body, headers=self._headers)
+        except httpx.TransportError as e:
+            raise LLMConnectionError(f"LLM API unreachable: {e!r}") from e
+        if response.status_code >= 400:
+            raise self._error(response)
+        data = response.json()
+        return LLMResult(data["choices"][0]["message"].get("content") or "", _openai_usage(data.get("usage")))
+
+    async def stream(self, system_message: Optional[str], prompt: str) -> AsyncIterator[LLMResult]:
+        try:
+            async with self._client.stream(
+                    "POST", self.url, json=self._body(system_message, prompt, True), headers=self._headers
+            ) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise self._error(response)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or []
+                    text = (choices[0].get("delta") or {}).get("content") or "" if choices else ""
+                    usage = _openai_usage(chunk.get("usage"))
+                    if text or usage:
+                        yield LLMResult(text, usage)
+        except httpx.TransportError as e:
+            raise LLMConnectionError(f"LLM API unreachable: {e!r}") from e
+
+
+class LangChainBackend(LLMBackend):
+    """Calls through LangChain's ChatOpenAI; imported on first use because the import is slow"""
+
+    name = "langchain"
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        import openai
+        from langchain_openai import ChatOpenAI
+        from langchain.schema import HumanMessage, SystemMessage
+
+        self._openai = openai
+        self._system_message = SystemMessage
+        self._human_message = HumanMessage
+        self.llm = ChatOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            model=settings.OPENAI_MODEL,
+            temperature=settings.OPENAI_TEMPERATURE,
+            max_tokens=settings.OPENAI_MAX_TOKENS,
+            model_kwargs={"response_format": {"type": "json_object"}},
+            stream_usage=True,
+            # Retries are done in LLMService, inside the admission slot and with Retry-After honored
+            max_retries=0,
+            timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            http_async_client=http_client or _pooled_client()
+        )
+
+    def _messages(self, system_message: Optional[str], prompt: str) -> List[Any]:
+        messages = []
+        if system_message:
+            messages.append(self._system_message(content=system_message))
+        messages.append(self._human_message(content=prompt))
+        return messages
+
+    def _translate(self, error: Exception) -> Exception:
+        """Map OpenAI SDK errors onto the backend-neutral ones"""
+        if isinstance(error, self._openai.APIStatusError):
+            return LLMHTTPError(error.status_code, error.response, str(error))
+        if isinstance(error, self._openai.APIConnectionError):
+            return LLMConnectionError(str(error))
+        return error
+
+    @staticmethod
+    def _usage(message: Any) -> Optional[Dict[str, int]]:
+        usage = _openai_usage((getattr(message, "response_metadata", None) or {}).get("token_usage"))
+        if usage:
+            return usage
+        metadata = getattr(message, "usage_metadata", None)
+        if not metadata:
+            return None
+        return {
+            "prompt_tokens": metadata.get("input_tokens") or 0,
+            "cached_tokens": (metadata.get("input_token_details") or {}).get("cache_read") or 0,
+            "completion_tokens": metadata.get("output_tokens") or 0,
+        }
+
+    async def complete(self, system_message: Optional[str], prompt: str, model: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> LLMResult:
+        # Per-call overrides are merged over the ChatOpenAI defaults in the request payload
+        overrides = {key: value for key, value in (("model", model), ("max_tokens", max_tokens)) if value}
+        try:
+            response = await self.llm.ainvoke(self._messages(system_message, prompt), **overrides)
+        except Exception as e:
+            translated = self._translate(e)
+            if translated is e:
+                raise
+            raise translated from e
+        return LLMResult(response.content, self._usage(response))
+
+    async def stream(self, system_message: Optional[str], prompt: str) -> AsyncIterator[LLMResult]:
+        try:
+            async for chunk in self.llm.astream(self._messages(system_message, prompt)):
+                usage = self._usage(chunk)
+                if chunk.content or usage:
+                    yield LLMResult(chunk.content, usage)
+        except Exception as e:
+            translated = self._translate(e)
+            if translated is e:
+                raise
+            raise translated from e
+
+
+_BACKENDS = {HTTPBackend.name: HTTPBackend, LangChainBackend.name: LangChainBackend}
+
+
+def create_backend(name: str, http_client: Optional[httpx.AsyncClient] = None) -> LLMBackend:
+    """Build the LLM backend selected by name ("langchain" or "http")"""
+    backend_class = _BACKENDS.get(name)
+    if backend_class is None:
+        logger.error(f"Unknown LLM backend '{name}', using langchain")
+        backend_class = LangChainBackend
+    logger.info(f"Using {backend_class.name} LLM backend")
+    return backend_class(http_client)
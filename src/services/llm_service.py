@@ -1,51 +1,441 @@
+import asyncio
+import contextvars
+import copy
+import hashlib
 import json
 import logging
-from typing import Dict, Any, List, Optional
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, AsyncIterator
 from src.config.settings import settings
+from src.services.llm_backends import LLMBackend, LLMConnectionError, LLMResult, create_backend
+from src.services.admission import AdmissionGate, LLMOverloadedError
+from src.services.hedging import HedgePolicy
+from src.utils.deadline import (
+    DeadlineExceededError, check_deadline, get_deadline, remaining, set_deadline, set_deadline_at
+)
+from src.utils.prompt_builder import prompt_stats
+from src.utils.structured_log import log_event
+from src.utils.profiler import clear_profile, profiled
+from src.utils.timing import clear_timings, record_span, span
+from src.utils.metrics import (
+    LLM_CALL_LATENCY, LLM_COALESCED, LLM_HEDGES, LLM_IN_FLIGHT, LLM_JSON_PARSE_FAILURES, LLM_RETRIES, LLM_TOKENS
+)
 
 logger = logging.getLogger(__name__)
 
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Error returned when the upstream call succeeded but its content did not parse
+INVALID_JSON_ERROR = "Invalid JSON response from LLM"
+
+
+def _detach_from_request() -> None:
+    """Drop the current request's deadline, timings and profile from the running context"""
+    set_deadline(None)
+    clear_timings()
+    clear_profile()
+
+
+def _shared_context() -> contextvars.Context:
+    """
+    Context for a call shared by concurrent requests. It must not inherit the first
+    caller's timings and profile; its deadline is managed by the _SharedCall.
+    """
+    context = contextvars.copy_context()
+    context.run(_detach_from_request)
+    return context
+
+
+class _SharedCall:
+    """
+    An upstream call shared by concurrent identical requests (single-flight).
+    It runs until the latest of its waiters' deadlines and is cancelled when
+    the last waiter leaves, so it never outlives every request that wants it.
+    """
+
+    def __init__(self, coro, deadline: Optional[float]):
+        self.deadline = deadline
+        self.waiters = 0
+        self.context = _shared_context()
+        self.context.run(set_deadline_at, deadline)
+        self.task = asyncio.get_running_loop().create_task(coro, context=self.context)
+
+    def join(self, deadline: Optional[float]) -> None:
+        """Extend the call's deadline to cover a new waiter's (None: the waiter has no deadline)"""
+        if self.deadline is not None and (deadline is None or deadline > self.deadline):
+            self.deadline = deadline
+            # The task is suspended while another request runs, so its context can be updated
+            self.context.run(set_deadline_at, deadline)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's Retry-After (seconds or HTTP date) from an upstream HTTP error, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
 
 class LLMService:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            model=settings.OPENAI_MODEL,
-            temperature=settings.OPENAI_TEMPERATURE,
-            max_tokens=settings.OPENAI_MAX_TOKENS,
-            model_kwargs={"response_format": {"type": "json_object"}}
+        # Built on first use (at start-up, in a thread): the LangChain backend takes seconds to import
+        self._backend: Optional[LLMBackend] = None
+        self.admission = AdmissionGate(
+            settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE, settings.LLM_QUEUE_TIMEOUT_SECONDS
+        )
+        self.hedging = HedgePolicy(
+            settings.LLM_HEDGE_PERCENTILE, settings.LLM_HEDGE_WINDOW,
+            settings.LLM_HEDGE_MIN_SAMPLES, settings.LLM_HEDGE_MAX_RATE
         )
+        self._inflight: Dict[str, _SharedCall] = {}
+        self.stats = {"calls": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "shed": 0, "deadline_exceeded": 0}
+
+    @property
+    def backend(self) -> LLMBackend:
+        if self._backend is None:
+            self._backend = create_backend(settings.LLM_BACKEND)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend: LLMBackend) -> None:
+        self._backend = backend
+
+    def _request_key(self, prompt: str, system_message: Optional[str], model: Optional[str] = None,
+                     max_tokens: Optional[int] = None) -> str:
+        """Identify a completion request by its messages and model parameters"""
+        raw = "\x00".join([
+            model or settings.OPENAI_MODEL, str(settings.OPENAI_TEMPERATURE), str(max_tokens or settings.OPENAI_MAX_TOKENS),
+            system_message or "", prompt
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get_completion(
+            self,
+            prompt: str,
+            system_message: str = None,
+            prompt_kind: str = "default",
+            model: Optional[str] = None,
+            max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Get completion from OpenAI API, sharing one upstream call between
+        concurrent identical requests (single-flight).
+        `model` and `max_tokens` override OPENAI_MODEL and OPENAI_MAX_TOKENS (model cascade tiers).
+        Raises LLMOverloadedError when admission control sheds the call and
+        DeadlineExceededError when the request's deadline budget runs out.
+        """
+        self.stats["calls"] += 1
+        if not settings.LLM_COALESCE_ENABLED:
+            return await self._get_completion(prompt, system_message, prompt_kind, model, max_tokens)
+
+        key = self._request_key(prompt, system_message, model, max_tokens)
+        shared = self._inflight.get(key)
+        if shared is None:
+            shared = _SharedCall(self._get_completion(prompt, system_message, prompt_kind, model, max_tokens),
+                                 get_deadline())
+            self._inflight[key] = shared
+            shared.task.add_done_callback(lambda done: self._finish_shared(key, shared, done))
+        else:
+            shared.join(get_deadline())
+            self.stats["coalesced"] += 1
+            LLM_COALESCED.labels(prompt_kind).inc()
+            log_event(logger, "llm.coalesced", kind=prompt_kind)
+
+        # Shield so a cancelled or timed-out waiter never cancels the call other waiters
+        # still share; every waiter gets its own copy because callers mutate the result
+        shared.waiters += 1
+        left = remaining()
+        try:
+            with span("llm"):
+                if left is None:
+                    result = await asyncio.shield(shared.task)
+                else:
+                    result = await asyncio.wait_for(asyncio.shield(shared.task), max(left, 0.0))
+        except asyncio.TimeoutError:
+            self.stats["deadline_exceeded"] += 1
+            raise DeadlineExceededError("Request deadline exceeded waiting for a shared LLM call")
+        finally:
+            shared.waiters -= 1
+            if shared.waiters == 0 and not shared.task.done():
+                # Nobody wants the answer any more: free the admission slot and stop retrying
+                shared.task.cancel()
+                self._forget(key, shared)
+        return copy.deepcopy(result)
+
+    def _finish_shared(self, key: str, shared: _SharedCall, task: asyncio.Future) -> None:
+        """Done callback of a shared call; its waiters may all have left before it failed"""
+        if not task.cancelled():
+            task.exception()
+        self._forget(key, shared)
+
+    def _forget(self, key: str, shared: _SharedCall) -> None:
+        """Stop offering a finished or abandoned shared call to new requests"""
+        if self._inflight.get(key) is shared:
+            del self._inflight[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return LLM call counters and admission queue state"""
+        return {
+            **self.stats,
+            "backend": settings.LLM_BACKEND,
+            "in_flight": len(self._inflight),
+            "admission": self.admission.get_stats(),
+            "hedging": self.hedging.get_stats()
+        }
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a failed upstream call, or None if it should not be retried"""
+        if attempt >= settings.LLM_MAX_RETRIES:
+            return None
+        status = getattr(error, "status_code", None)
+        if not isinstance(error, LLMConnectionError) and status not in _RETRYABLE_STATUS:
+            return None
+
+        # Equal jitter: half the exponential step is fixed, half random, so retries spread out
+        step = min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+        delay = step / 2 + random.uniform(0, step / 2)
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            if retry_after > settings.LLM_RETRY_MAX_SECONDS:
+                # The server wants us away for longer than we are willing to hold the request
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _invoke(self, system_message: Optional[str], prompt: str, prompt_kind: str,
+                      model: Optional[str] = None, max_tokens: Optional[int] = None) -> LLMResult:
+        """One upstream call under admission control, retried on 429/5xx/connection errors"""
+        try:
+            async with self.admission.slot() as waited:
+                record_span("llm_queue", waited)
+                attempt = 0
+                while True:
+                    try:
+                        return await self._attempt(system_message, prompt, prompt_kind, model, max_tokens)
+                    except DeadlineExceededError:
+                        raise
+                    except Exception as e:
+                        delay = self._retry_delay(e, attempt)
+                        left = remaining()
+                        if delay is None or (left is not None and delay >= left):
+                            raise
+                        attempt += 1
+                        reason = str(getattr(e, "status_code", None) or type(e).__name__)
+                        self.stats["retries"] += 1
+                        LLM_RETRIES.labels(reason).inc()
+                        logger.warning(f"LLM call failed ({reason}), retry {attempt} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+        except LLMOverloadedError:
+            self.stats["shed"] += 1
+            raise
+        except DeadlineExceededError:
+            self.stats["deadline_exceeded"] += 1
+            raise
+
+    async def _attempt(self, system_message: Optional[str], prompt: str, prompt_kind: str,
+                       model: Optional[str] = None, max_tokens: Optional[int] = None) -> LLMResult:
+        """One upstream attempt, bounded by what is left of the request deadline"""
+        left = check_deadline("LLM call")
+        if settings.LLM_HEDGE_ENABLED:
+            call = self._hedged_call(system_message, prompt, model, max_tokens)
+        else:
+            call = self.backend.complete(system_message, prompt, model, max_tokens)
+        call = profiled(call)
+        started = time.perf_counter()
+        outcome = "error"
+        LLM_IN_FLIGHT.inc()
+        try:
+            with span("llm"):
+                if left is None:
+                    response = await call
+                else:
+                    try:
+                        response = await self._await_within_deadline(call, left)
+                    except asyncio.TimeoutError:
+                        outcome = "deadline"
+                        raise DeadlineExceededError("Request deadline exceeded waiting for the LLM")
+            outcome = "success"
+            if not settings.LLM_HEDGE_ENABLED:
+                self.hedging.record_latency(time.perf_counter() - started)
+            return response
+        finally:
+            LLM_IN_FLIGHT.dec()
+            LLM_CALL_LATENCY.labels(prompt_kind, outcome).observe(time.perf_counter() - started)
+
+    async def _await_within_deadline(self, call, left: float):
+        """
+        Await `call` until the deadline runs out, re-reading it on expiry because a
+        shared call's deadline is extended when a later request joins it.
+        Raises asyncio.TimeoutError (after cancelling the call) once it has passed.
+        """
+        task = asyncio.ensure_future(call)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=None if left is None else max(left, 0.0))
+                if done:
+                    return task.result()
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise asyncio.TimeoutError()
+        finally:
+            task.cancel()
 
-    async def get_completion(self, prompt: str, system_message: str = None) -> Dict[str, Any]:
-        """Get completion from OpenAI API using LangChain"""
+    async def _hedged_call(self, system_message: Optional[str], prompt: str, model: Optional[str] = None,
+                           max_tokens: Optional[int] = None) -> LLMResult:
+        """
+        Issue the call; if it has not returned by the hedge delay (a recent latency
+        percentile) and the hedge rate cap allows, race a second identical call.
+        The hedge needs a free admission slot of its own, so hedging never exceeds
+        LLM_MAX_CONCURRENCY. The first successful response wins and the other call is
+        cancelled. Only the primary call's latency feeds the hedge delay.
+        """
+        self.hedging.start_call()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(profiled(self.backend.complete(system_message, prompt, model, max_tokens)))
+        pending = {primary}
         try:
-            messages = []
+            delay = self.hedging.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    if not self.hedging.allow_hedge():
+                        LLM_HEDGES.labels("rate_limited").inc()
+                    elif not self.admission.try_acquire():
+                        # Under load a hedge would only add to the queue it is meant to bypass
+                        self.hedging.stats["no_slot"] += 1
+                        LLM_HEDGES.labels("no_slot").inc()
+                    else:
+                        self.hedging.record_hedge()
+                        LLM_HEDGES.labels("issued").inc()
+                        hedge = asyncio.ensure_future(
+                            profiled(self.backend.complete(system_message, prompt, model, max_tokens))
+                        )
+                        hedge.add_done_callback(lambda _: self.admission.release())
+                        pending.add(hedge)
 
-            if system_message:
-                messages.append(SystemMessage(content=system_message))
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedging.stats["hedge_wins"] += 1
+                            LLM_HEDGES.labels("won").inc()
+                        # When the hedge wins, this is a lower bound of the primary's latency,
+                        # still above the current delay, so the percentile is not dragged down
+                        self.hedging.record_latency(time.perf_counter() - started)
+                        return task.result()
+                if not pending:
+                    # Every attempt failed; surface the failure
+                    return done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
 
-            messages.append(HumanMessage(content=prompt))
+    def _record_usage(self, usage: Optional[Dict[str, int]], prompt_kind: str) -> None:
+        """Record prompt/cached/completion token counts reported by the backend"""
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        cached_tokens = usage.get("cached_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
 
-            # Use ainvoke for async call
-            response = await self.llm.ainvoke(messages)
+        prompt_stats.record_usage(prompt_kind, prompt_tokens, cached_tokens, completion_tokens)
+        LLM_TOKENS.labels(prompt_kind, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(prompt_kind, "cached").inc(cached_tokens)
+        LLM_TOKENS.labels(prompt_kind, "completion").inc(completion_tokens)
+        logger.debug(f"LLM usage ({prompt_kind}): prompt={prompt_tokens} cached={cached_tokens} completion={completion_tokens}")
+
+    async def _get_completion(self, prompt: str, system_message: str = None, prompt_kind: str = "default",
+                              model: Optional[str] = None, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Get completion from OpenAI API through the configured backend"""
+        self.stats["upstream_calls"] += 1
+        try:
+            response = await self._invoke(system_message, prompt, prompt_kind, model, max_tokens)
             content = response.content
+            self._record_usage(response.usage, prompt_kind)
 
-            logger.info(f"LLM Response: {content}")
+            log_event(logger, "llm.response", kind=prompt_kind, chars=len(content), content=content)
 
             # Parse JSON response
             try:
-                return json.loads(content)
+                with span("llm_parse"):
+                    return json.loads(content)
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse LLM response as JSON: {e}")
-                logger.error(f"Raw response: {content}")
-                return {"error": "Invalid JSON response from LLM"}
+                LLM_JSON_PARSE_FAILURES.labels(prompt_kind).inc()
+                log_event(logger, "llm.invalid_json", f"Failed to parse LLM response as JSON: {e}",
+                          level=logging.ERROR, kind=prompt_kind, content=content)
+                return {"error": INVALID_JSON_ERROR}
 
+        except (LLMOverloadedError, DeadlineExceededError):
+            raise
         except Exception as e:
             logger.error(f"Error getting LLM completion: {e}")
             return {"error": str(e)}
 
+    async def stream_completion(
+            self,
+            prompt: str,
+            system_message: str = None,
+            prompt_kind: str = "default"
+    ) -> AsyncIterator[str]:
+        """Stream completion text chunks from OpenAI API as they are generated"""
+        self.stats["calls"] += 1
+        self.stats["upstream_calls"] += 1
+        try:
+            async with self.admission.slot() as waited:
+                record_span("llm_queue", waited)
+                started = time.perf_counter()
+                outcome = "error"
+                usage = None
+                LLM_IN_FLIGHT.inc()
+                stream = self.backend.stream(system_message, prompt).__aiter__()
+                try:
+                    # Not retried: chunks may already have been handed to the client
+                    while True:
+                        left = check_deadline("LLM stream chunk")
+                        try:
+                            chunk = await (asyncio.wait_for(stream.__anext__(), left) if left is not None
+                                           else stream.__anext__())
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            outcome = "deadline"
+                            raise DeadlineExceededError("Request deadline exceeded while streaming from the LLM")
+                        if chunk.usage:
+                            usage = chunk.usage
+                        if chunk.content:
+                            yield chunk.content
+                    outcome = "success"
+                finally:
+                    LLM_IN_FLIGHT.dec()
+                    record_span("llm_stream", time.perf_counter() - started)
+                    LLM_CALL_LATENCY.labels(f"{prompt_kind}_stream", outcome).observe(time.perf_counter() - started)
+                    if usage is not None:
+                        self._record_usage(usage, prompt_kind)
+        except LLMOverloadedError:
+            self.stats["shed"] += 1
+            raise
+        except DeadlineExceededError:
+            self.stats["deadline_exceeded"] += 1
+            raise
+
     async def process_message(
             self,
             intents_data: str,
@@ -54,18 +444,20 @@ class LLMService:
     ) -> Dict[str, Any]:
         """Process user message using single unified prompt"""
         try:
-            from src.utils.prompts import CHATBOT_PROMPT
+            from src.utils.prompts import CHATBOT_PROMPT, CHATBOT_SYSTEM_MESSAGE
 
             prompt = CHATBOT_PROMPT.format(
-                intents_data,
-                user_message,
-                response_format
+                intents_data=intents_data,
+                user_message=user_message,
+                response_format=response_format
             )
 
-            system_message = "You are a helpful assistant that responds only in valid JSON format."
+            system_message = CHATBOT_SYSTEM_MESSAGE
 
-            return await self.get_completion(prompt, system_message)
+            return await self.get_completion(prompt, system_message, prompt_kind="intent")
 
+        except (LLMOverloadedError, DeadlineExceededError):
+            raise
         except Exception as e:
             logger.error(f"Error in single prompt processing: {e}")
             return {"error": str(e)}
@@ -0,0 +1,172 @@
+import math
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Deque, FrozenSet, Iterable, Optional, Tuple
+from src.config.settings import settings
+from src.services.llm_service import llm_service, INVALID_JSON_ERROR
+from src.utils.metrics import LLM_CASCADE_CALLS, LLM_CASCADE_ESCALATIONS, LLM_CASCADE_LATENCY
+from src.utils.structured_log import log_event
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = "fast"
+STRONG_TIER = "strong"
+
+# Low-confidence signals a caller may report about a fast-tier answer
+SIGNALS = ("invalid_json", "unknown_intent", "missing_entities", "catalog_mismatch")
+
+# Recent latencies kept per (kind, tier) for the percentiles in the stats
+_LATENCY_WINDOW = 500
+
+
+def _parse_policies(raw: str) -> Dict[str, FrozenSet[str]]:
+    """"intent=invalid_json+unknown_intent,feedback=invalid_json" -> {kind: escalation signals}"""
+    policies = {}
+    for item in (raw or "").split(","):
+        kind, _, signals = item.partition("=")
+        if not kind.strip():
+            continue
+        parsed = frozenset(signal.strip() for signal in signals.split("+") if signal.strip() in SIGNALS)
+        unknown = {signal.strip() for signal in signals.split("+") if signal.strip()} - set(parsed)
+        if unknown:
+            logger.warning(f"Ignoring unknown cascade signals for '{kind.strip()}': {', '.join(sorted(unknown))}")
+        policies[kind.strip()] = parsed
+    return policies
+
+
+def _parse_max_tokens(raw: str) -> Dict[str, Tuple[int, int]]:
+    """"intent=1024/4096" -> {"intent": (fast tier limit, strong tier limit)}"""
+    limits = {}
+    for item in (raw or "").split(","):
+        kind, _, values = item.partition("=")
+        fast, _, strong = values.partition("/")
+        try:
+            limits[kind.strip()] = (int(fast), int(strong or fast))
+        except ValueError:
+            continue
+    return limits
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class ModelCascade:
+    """
+    Tiered model routing. Calls of a kind that has a policy go to the fast model first;
+    the caller checks the answer and, when it shows one of the policy's low-confidence
+    signals, asks the strong model the same prompt. Other kinds (and every kind while
+    the cascade is disabled) go straight to the strong model.
+    Per kind and tier it records calls, outcomes, latency and escalations by signal.
+    """
+
+    def __init__(self):
+        self.policies = _parse_policies(settings.LLM_CASCADE_POLICIES)
+        self.max_tokens = _parse_max_tokens(settings.LLM_CASCADE_MAX_TOKENS)
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def _kind_stats(self, kind: str) -> Dict[str, Any]:
+        stats = self.stats.get(kind)
+        if stats is None:
+            stats = self.stats[kind] = {"requests": 0, "escalated": 0, "escalations": {}, "tiers": {}}
+        return stats
+
+    def first_tier(self, kind: str) -> str:
+        """Tier a new call of this kind starts on"""
+        return FAST_TIER if settings.LLM_CASCADE_ENABLED and kind in self.policies else STRONG_TIER
+
+    def _params(self, kind: str, tier: str) -> Dict[str, Any]:
+        """Model and token limit of a tier; empty (the OPENAI_* settings) while the cascade is off"""
+        if not settings.LLM_CASCADE_ENABLED:
+            return {}
+        limits = self.max_tokens.get(kind)
+        if tier == FAST_TIER:
+            return {"model": settings.LLM_CASCADE_FAST_MODEL, "max_tokens": limits[0] if limits else None}
+        return {"model": settings.LLM_CASCADE_STRONG_MODEL or None, "max_tokens": limits[1] if limits else None}
+
+    async def complete(self, prompt: str, system_message: str, kind: str, tier: Optional[str] = None) -> Dict[str, Any]:
+        """get_completion on the given tier (the kind's first tier by default), recording its latency"""
+        tier = tier or self.first_tier(kind)
+        if tier == self.first_tier(kind):
+            # Escalations are counted against the request that started on the fast tier
+            self._kind_stats(kind)["requests"] += 1
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await llm_service.get_completion(prompt, system_message, prompt_kind=kind, **self._params(kind, tier))
+            if not isinstance(response, dict) or response.get("error") == INVALID_JSON_ERROR:
+                # Valid JSON that is not an object is as unusable as invalid JSON
+                outcome = "invalid_json"
+            elif "error" not in response:
+                outcome = "success"
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            tier_stats = self._kind_stats(kind)["tiers"].setdefault(
+                tier, {"calls": 0, "success": 0, "invalid_json": 0, "error": 0}
+            )
+            tier_stats["calls"] += 1
+            tier_stats[outcome] += 1
+            latencies = self._latencies.get((kind, tier))
+            if latencies is None:
+                latencies = self._latencies[(kind, tier)] = deque(maxlen=_LATENCY_WINDOW)
+            latencies.append(elapsed)
+            LLM_CASCADE_CALLS.labels(kind, tier, outcome).inc()
+            LLM_CASCADE_LATENCY.labels(kind, tier).observe(elapsed)
+
+    def escalation(self, kind: str, tier: str, signals: Iterable[str]) -> Optional[str]:
+        """
+        The signal that escalates a fast-tier answer to the strong model under the kind's
+        policy, or None when the answer stands
+        """
+        if tier != FAST_TIER:
+            return None
+        policy = self.policies.get(kind, frozenset())
+        signal = next((signal for signal in signals if signal in policy), None)
+        if signal is not None:
+            stats = self._kind_stats(kind)
+            stats["escalated"] += 1
+            stats["escalations"][signal] = stats["escalations"].get(signal, 0) + 1
+            LLM_CASCADE_ESCALATIONS.labels(kind, signal).inc()
+            log_event(logger, "llm.escalate", kind=kind, signal=signal)
+        return signal
+
+    @staticmethod
+    def response_signals(llm_response: Any) -> Tuple[str, ...]:
+        """Signals readable from the raw reply alone"""
+        if not isinstance(llm_response, dict) or llm_response.get("error") == INVALID_JSON_ERROR:
+            return ("invalid_json",)
+        return ()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the tier models and, per kind, escalations plus calls and latency per tier"""
+        kinds = {}
+        for kind, stats in self.stats.items():
+            tiers = {}
+            for tier, tier_stats in stats["tiers"].items():
+                ordered = sorted(self._latencies.get((kind, tier)) or [])
+                tiers[tier] = {
+                    **tier_stats,
+                    "p50_ms": round(_percentile(ordered, 0.5) * 1000, 1) if ordered else None,
+                    "p95_ms": round(_percentile(ordered, 0.95) * 1000, 1) if ordered else None,
+                }
+            kinds[kind] = {
+                **stats,
+                "escalations": dict(stats["escalations"]),
+                "escalation_rate": round(stats["escalated"] / stats["requests"], 4) if stats["requests"] else 0.0,
+                "tiers": tiers,
+            }
+        return {
+            "enabled": settings.LLM_CASCADE_ENABLED,
+            "fast_model": settings.LLM_CASCADE_FAST_MODEL,
+            "strong_model": settings.LLM_CASCADE_STRONG_MODEL or settings.OPENAI_MODEL,
+            "policies": {kind: sorted(signals) for kind, signals in self.policies.items()},
+            "kinds": kinds,
+        }
+
+
+# Global instance
+model_cascade = ModelCascade()
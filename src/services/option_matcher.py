@@ -0,0 +1,283 @@
+import json
+import os
+import re
+import logging
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Tuple
+from src.config.settings import settings
+from src.data.loader import CatalogSnapshot
+from src.services.response_builder import build_intent_response
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+_NEGATIONS = {"not", "no", "never", "isn't", "dont", "don't", "didn't", "doesn't", "cannot", "can't", "without"}
+
+# Words that carry no information for intent or entity values
+_FILLER_WORDS = {
+    "a", "an", "and", "am", "are", "at", "be", "been", "but", "for", "from", "have", "has", "hello", "hi", "i",
+    "i'm", "im", "is", "it", "it's", "its", "me", "my", "of", "on", "or", "please", "so", "the", "there", "this",
+    "to", "very", "was", "we", "with", "you", "your", "hey", "sir", "madam", "ok", "okay", "thanks", "thank",
+    "really", "just", "too", "since", "getting", "facing", "experiencing", "issue", "problem", "problems",
+}
+
+# Score given to a phrase whose words all match approximately (typos), but not exactly in sequence
+_FUZZY_MATCH_SCORE = 0.9
+_FUZZY_WORD_RATIO = 0.85
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower().replace("’", "'"))
+
+
+def _phrase_from_value(value: str) -> str:
+    """SLOW_BROWSING -> "slow browsing" """
+    return " ".join(part for part in re.split(r"[_\-\s]+", str(value).lower()) if part)
+
+
+class _OptionIndex:
+    """Option and intent phrases compiled for one catalog snapshot"""
+
+    def __init__(self, snapshot: CatalogSnapshot, synonyms: Dict[str, Any]):
+        option_synonyms = synonyms.get("options", {})
+        intent_keywords = synonyms.get("intents", {})
+
+        self.intents: List[Dict[str, Any]] = []
+        for intent in snapshot.intents_by_id.values():
+            keywords = set(_words(" ".join([intent.get("intent", "")] + list(intent_keywords.get(intent["intentId"], [])))))
+            # Every entity in question order; only OPTION entities have options to match
+            entities = []
+            for entity in intent.get("entity", []):
+                options = []
+                if entity.get("type") != "OPTION":
+                    entities.append((entity.get("id"), options))
+                    continue
+                for option in entity.get("options", []):
+                    phrases = {_phrase_from_value(option)}
+                    phrases.update(phrase.lower() for phrase in option_synonyms.get(option, []))
+                    options.append((option, [_words(phrase) for phrase in phrases if phrase]))
+                entities.append((entity.get("id"), options))
+            self.intents.append({"config": intent, "keywords": keywords, "entities": entities})
+
+
+class OptionMatcher:
+    """
+    Deterministic intent and OPTION-entity resolver built from the catalog plus
+    per-option synonym lists. Produces the standard response with a confidence
+    score so confident messages can skip the LLM.
+    """
+
+    def __init__(self):
+        # One index per catalog version (tenant catalogs each have their own)
+        self._indexes: "OrderedDict[str, _OptionIndex]" = OrderedDict()
+        self.stats = {
+            "evaluated": 0, "confident": 0, "served_locally": 0,
+            "shadow_compared": 0, "shadow_confident": 0,
+            "shadow_intent_agree": 0, "shadow_full_agree": 0, "shadow_confident_full_agree": 0,
+        }
+
+    def _load_synonyms(self) -> Dict[str, Any]:
+        path = settings.OPTION_SYNONYMS_PATH
+        if not os.path.exists(path):
+            logger.warning(f"Option synonyms file not found at {path}, using option values only")
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except Exception as e:
+            logger.error(f"Error loading option synonyms: {e}")
+            return {}
+
+    def _get_index(self, snapshot: CatalogSnapshot) -> _OptionIndex:
+        index = self._indexes.get(snapshot.version)
+        if index is not None:
+            self._indexes.move_to_end(snapshot.version)
+            return index
+
+        index = self._indexes[snapshot.version] = _OptionIndex(snapshot, self._load_synonyms())
+        while len(self._indexes) > settings.CATALOG_CACHE_MAX_ENTRIES + 1:
+            self._indexes.popitem(last=False)
+        logger.info(f"Built option matcher index for catalog {snapshot.version}")
+        return index
+
+    @staticmethod
+    def _similar(word: str, token: str) -> bool:
+        """Typo-tolerant word comparison; cheap length/initial checks run before difflib"""
+        if word == token:
+            return True
+        if len(token) < 4 or word[:1] != token[:1] or abs(len(word) - len(token)) > 2:
+            return False
+        return SequenceMatcher(None, word, token).ratio() >= _FUZZY_WORD_RATIO
+
+    @staticmethod
+    def _match_phrase(words: List[str], phrase: List[str]) -> Tuple[float, List[int]]:
+        """Score a phrase against the message words; returns (score, matched word positions)"""
+        size = len(phrase)
+        for start in range(len(words) - size + 1):
+            if words[start:start + size] == phrase:
+                positions = list(range(start, start + size))
+                # A negation right before the phrase flips its meaning; let the LLM decide
+                if start > 0 and words[start - 1] in _NEGATIONS and phrase[0] not in _NEGATIONS:
+                    return -1.0, positions
+                return 1.0, positions
+
+        positions = []
+        for token in phrase:
+            match = next((i for i, word in enumerate(words)
+                          if i not in positions and OptionMatcher._similar(word, token)), None)
+            if match is None:
+                return 0.0, []
+            positions.append(match)
+        return _FUZZY_MATCH_SCORE, positions
+
+    def _match_options(self, words: List[str], options: List) -> Optional[Tuple[float, str, List[int]]]:
+        """
+        Best (score, option, matched word positions) for one entity, or None when no option matched.
+        The score is 0 when the entity is negated or ambiguous between options.
+        """
+        scored = []
+        for option, phrases in options:
+            best, best_positions = 0.0, []
+            for phrase in phrases:
+                score, positions = self._match_phrase(words, phrase)
+                if score < 0:
+                    best, best_positions = score, positions
+                    break
+                if score > best or (score == best and len(positions) > len(best_positions)):
+                    best, best_positions = score, positions
+            if best != 0.0:
+                scored.append((best, option, best_positions))
+
+        if not scored:
+            return None
+        scored.sort(key=lambda item: item[0], reverse=True)
+        top_score, top_option, positions = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if scored[-1][0] < 0 or runner_up >= settings.OPTION_FAST_PATH_MIN_CONFIDENCE:
+            # Negated or ambiguous between options
+            return 0.0, top_option, positions
+        return top_score, top_option, positions
+
+    @staticmethod
+    def _asked_entity(intent: Dict[str, Any], filled: Dict[str, Any]) -> Optional[Tuple[str, List]]:
+        """The entity being asked about: the intent's first one without a value"""
+        return next(((entity_id, options) for entity_id, options in intent["entities"]
+                     if filled.get(entity_id) in (None, "")), None)
+
+    def match(
+            self,
+            user_message: str,
+            snapshot: CatalogSnapshot,
+            active_intent_id: Optional[str] = None,
+            filled: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Resolve the intent and OPTION entities locally.
+        Only the option being asked about is matched: on a follow-up turn, the first unfilled
+        entity of the active intent (`filled` holds its values so far); otherwise the first
+        entity of an intent the message names by keyword. A reply such as "leave it" names no
+        intent, so it only resolves while its option's question is pending.
+        Returns (response, confidence); response is None when nothing matched.
+        """
+        self.stats["evaluated"] += 1
+        index = self._get_index(snapshot)
+        words = _words(user_message)
+        content = {i for i, word in enumerate(words) if word not in _FILLER_WORDS}
+        if not content or not index.intents:
+            return None, 0.0
+
+        filled = filled or {}
+        intents = index.intents
+        if active_intent_id:
+            intents = [intent for intent in intents if intent["config"].get("intentId") == active_intent_id]
+
+        candidates = []
+        for intent in intents:
+            explained = {i for i, word in enumerate(words) if word in intent["keywords"]}
+            if not active_intent_id and not explained:
+                # The message does not name this intent
+                continue
+            values: Dict[str, Any] = {}
+            confidence = 0.0
+            asked = self._asked_entity(intent, filled if active_intent_id else {})
+            matched = self._match_options(words, asked[1]) if asked else None
+            if matched is not None:
+                score, option, positions = matched
+                explained.update(positions)
+                if score > 0:
+                    values[asked[0]] = option
+
+            coverage = len(explained & content) / len(content)
+            if values:
+                confidence = min(score, coverage)
+            candidates.append((confidence, coverage, intent["config"], values))
+
+        if not candidates:
+            return None, 0.0
+        candidates.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        confidence, _, intent_config, values = candidates[0]
+        if len(candidates) > 1 and candidates[1][0] >= confidence * 0.8:
+            # Two intents explain the message about equally well
+            confidence = 0.0
+        if confidence <= 0.0 and not values:
+            return None, 0.0
+
+        if confidence >= settings.OPTION_FAST_PATH_MIN_CONFIDENCE:
+            self.stats["confident"] += 1
+        if active_intent_id:
+            return build_intent_response(
+                intent_config, {**filled, **values}, intent_changed=False, previous_intent_id=active_intent_id,
+                source="local-option-matcher"
+            ), confidence
+        return build_intent_response(intent_config, values, source="local-option-matcher"), confidence
+
+    def record_shadow(self, local: Optional[Dict[str, Any]], confidence: float, llm_response: Dict[str, Any]) -> None:
+        """Compare a local result with the LLM's for the same message"""
+        if local is None or llm_response.get("status") == "Error":
+            return
+        try:
+            local_result = local["result"][0]
+            llm_result = llm_response["result"][0]
+        except (KeyError, IndexError, TypeError):
+            return
+
+        confident = confidence >= settings.OPTION_FAST_PATH_MIN_CONFIDENCE
+        self.stats["shadow_compared"] += 1
+        self.stats["shadow_confident"] += int(confident)
+
+        if local_result.get("intentId") != llm_result.get("intentId"):
+            logger.info(f"Option matcher shadow disagreement on intent: "
+                        f"{local_result.get('intentId')} vs {llm_result.get('intentId')}")
+            return
+        self.stats["shadow_intent_agree"] += 1
+
+        llm_values = {}
+        for entity in llm_result.get("entity") or []:
+            if isinstance(entity, dict):
+                llm_values[entity.get("id")] = entity.get("user_input") or entity.get("response")
+        local_values = {entity["id"]: entity["user_input"] for entity in local_result["entity"] if entity["type"] == "OPTION"}
+
+        if all((llm_values.get(entity_id) or None) == value for entity_id, value in local_values.items()):
+            self.stats["shadow_full_agree"] += 1
+            self.stats["shadow_confident_full_agree"] += int(confident)
+        else:
+            logger.info(f"Option matcher shadow disagreement on entities: {local_values} vs {llm_values}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return matcher counters with shadow agreement rates"""
+        compared = self.stats["shadow_compared"]
+        confident = self.stats["shadow_confident"]
+        return {
+            **self.stats,
+            "mode": settings.OPTION_FAST_PATH_MODE,
+            "shadow_full_agreement_rate": round(self.stats["shadow_full_agree"] / compared, 4) if compared else 0.0,
+            "shadow_confident_agreement_rate": (
+                round(self.stats["shadow_confident_full_agree"] / confident, 4) if confident else 0.0
+            ),
+        }
+
+
+# Global instance
+option_matcher = OptionMatcher()
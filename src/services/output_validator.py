@@ -0,0 +1,198 @@
+import re
+import logging
+from difflib import get_close_matches
+from typing import Dict, Any, List, Optional, Tuple
+from src.config.settings import settings
+from src.data.loader import CatalogSnapshot
+from src.services.response_builder import build_intent_response
+from src.utils.metrics import LLM_OUTPUT_REPAIRS
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]+")
+
+# Keys the LLM may put an entity value under ("user_input" for text, "response" for options)
+_VALUE_KEYS = ("user_input", "response")
+_UNCHECKED = object()
+
+
+def _option_key(value: str) -> str:
+    """"slow browsing" / "Slow-Browsing" -> "SLOW_BROWSING" """
+    return _NON_ALNUM_RE.sub("_", value.upper()).strip("_")
+
+
+def _unknown_result(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {**item, "intent": "Unknown", "is_matched": False, "intentId": None, "entity": []}
+
+
+class OutputValidator:
+    """
+    Checks LLM intent results (full, or compact ones expanded from the catalog) against
+    the catalog registry of the snapshot and repairs what can be repaired: unknown
+    intentIds become Unknown, missing entities are filled with null, unknown entities
+    dropped, and invalid option values corrected to the closest option or nulled.
+    Cost is O(entities of the matched intent).
+    """
+
+    def __init__(self):
+        self.stats = {
+            "validated": 0, "valid": 0, "repaired": 0, "unrecoverable": 0, "reasks": 0, "reask_recovered": 0,
+            "repairs": {}
+        }
+
+    def _repair(self, repairs: List[str], kind: str) -> None:
+        repairs.append(kind)
+        LLM_OUTPUT_REPAIRS.labels(kind).inc()
+
+    def check_option(self, snapshot: CatalogSnapshot, intent_id: str, entity_id: str, value: Any) -> Tuple[Any, Optional[str]]:
+        """
+        Validate one OPTION value. Returns (value, None) when valid, the closest option and
+        "corrected_option" when it is near enough, else (None, "nulled_option").
+        """
+        options = snapshot.get_options(intent_id, entity_id)
+        if value in (None, "") or value in options:
+            return value, None
+        if isinstance(value, str) and options:
+            by_key = {_option_key(option): option for option in options}
+            key = _option_key(value)
+            if key in by_key:
+                return by_key[key], "corrected_option"
+            close = get_close_matches(key, list(by_key), n=1, cutoff=settings.OUTPUT_OPTION_FUZZY_CUTOFF)
+            if close:
+                return by_key[close[0]], "corrected_option"
+        return None, "nulled_option"
+
+    def validate(self, llm_response: Any, snapshot: CatalogSnapshot) -> Tuple[Optional[Dict[str, Any]], Optional[str], List[str]]:
+        """
+        Validate and repair an intent-detection reply.
+        Returns (response, None, repairs applied), or (None, problem, repairs) when the reply is unusable.
+        """
+        self.stats["validated"] += 1
+        response, problem, repairs = self._validate(llm_response, snapshot)
+
+        if response is None:
+            self.stats["unrecoverable"] += 1
+            LLM_OUTPUT_REPAIRS.labels("unrecoverable").inc()
+        elif repairs:
+            self.stats["repaired"] += 1
+            for kind in repairs:
+                self.stats["repairs"][kind] = self.stats["repairs"].get(kind, 0) + 1
+            logger.info(f"Repaired LLM intent result: {', '.join(sorted(set(repairs)))}")
+        else:
+            self.stats["valid"] += 1
+        return response, problem, repairs
+
+    def _validate(self, llm_response: Any, snapshot: CatalogSnapshot) -> Tuple[Optional[Dict[str, Any]], Optional[str], List[str]]:
+        repairs: List[str] = []
+        if not isinstance(llm_response, dict):
+            return None, "the reply was not a JSON object.", repairs
+        if "error" in llm_response:
+            return None, "the reply was not valid JSON.", repairs
+
+        envelope = llm_response
+        result = llm_response.get("result")
+        if result is None and isinstance(llm_response.get("entities"), dict):
+            envelope = {"status": "Success"}
+            result = [self._expand_compact(llm_response, snapshot, repairs)]
+        elif result is None and "intentId" in llm_response:
+            # A bare result object instead of {"status": ..., "result": [...]}
+            self._repair(repairs, "wrapped_result")
+            envelope = {"status": "Success"}
+            result = [{key: value for key, value in llm_response.items() if key != "status"}]
+        elif isinstance(result, dict):
+            self._repair(repairs, "wrapped_result")
+            result = [result]
+        if not isinstance(result, list) or not result or not isinstance(result[0], dict):
+            return None, 'the "result" list with the matched intent was missing.', repairs
+
+        item = result[0]
+        intent_id = item.get("intentId")
+        intent_config = snapshot.get_intent(intent_id) if isinstance(intent_id, str) else None
+        if intent_config is None and isinstance(item.get("intent"), str):
+            # intentId missing or made up, but the intent name is a catalog one
+            mapped = snapshot.intent_ids_by_name.get(item["intent"])
+            if mapped is not None:
+                self._repair(repairs, "intent_id_from_name")
+                intent_config = snapshot.get_intent(mapped)
+
+        if intent_config is None:
+            if intent_id or item.get("is_matched"):
+                self._repair(repairs, "unknown_intent")
+            item = _unknown_result(item)
+        else:
+            item = {**item, "intent": intent_config.get("intent"), "intentId": intent_config["intentId"], "is_matched": True}
+            item["entity"] = self._repair_entities(item.get("entity"), intent_config, snapshot, repairs)
+
+        return {**envelope, "status": envelope.get("status") or "Success", "result": [item]}, None, repairs
+
+    def _expand_compact(self, llm_response: Dict[str, Any], snapshot: CatalogSnapshot, repairs: List[str]) -> Dict[str, Any]:
+        """
+        Expand {"intentId": ..., "entities": {id: value}} into a full result item;
+        entities the model left out are filled with null from the catalog
+        """
+        intent_id = llm_response.get("intentId")
+        intent_config = snapshot.get_intent(intent_id) if isinstance(intent_id, str) else None
+        if intent_config is None:
+            return {"intent": None, "is_matched": bool(intent_id), "intentId": intent_id, "entity": []}
+
+        values = llm_response["entities"]
+        for entity_id in values:
+            if snapshot.get_entity(intent_id, entity_id) is None:
+                self._repair(repairs, "dropped_entity")
+        for entity in intent_config.get("entity", []):
+            if entity.get("id") not in values:
+                # Left out by the model: filled with null, the cascade's missing_entities signal
+                self._repair(repairs, "filled_entity")
+        return build_intent_response(intent_config, values)["result"][0]
+
+    def _repair_entities(self, entities: Any, intent_config: Dict[str, Any], snapshot: CatalogSnapshot,
+                         repairs: List[str]) -> List[Dict[str, Any]]:
+        """Entities of the matched intent in catalog order, with values checked against the registry"""
+        intent_id = intent_config["intentId"]
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for entity in entities if isinstance(entities, list) else []:
+            if isinstance(entity, dict) and snapshot.get_entity(intent_id, entity.get("id")) is not None:
+                by_id.setdefault(entity["id"], entity)
+            else:
+                self._repair(repairs, "dropped_entity")
+
+        repaired = []
+        for entity_config in intent_config.get("entity", []):
+            entity_id = entity_config.get("id")
+            entity = by_id.get(entity_id)
+            if entity is None:
+                self._repair(repairs, "filled_entity")
+                entity = {"user_input": None}
+
+            entity = {
+                **entity,
+                "id": entity_id,
+                "label": entity_config.get("label", ""),
+                "type": entity_config.get("type", "TEXT_INPUT"),
+                "options": list(entity_config.get("options", [])),
+            }
+            if entity_config.get("type") == "OPTION":
+                checked: List[Tuple[Any, Any]] = []
+                for key in _VALUE_KEYS:
+                    if key not in entity:
+                        continue
+                    raw = entity[key]
+                    # user_input and response usually carry the same option: check and count it once
+                    same = next((fixed for value, fixed in checked if value == raw), _UNCHECKED)
+                    if same is not _UNCHECKED:
+                        entity[key] = same
+                        continue
+                    entity[key], repair = self.check_option(snapshot, intent_id, entity_id, raw)
+                    checked.append((raw, entity[key]))
+                    if repair:
+                        self._repair(repairs, repair)
+            repaired.append(entity)
+        return repaired
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return validation and repair counters"""
+        return {**self.stats, "repairs": dict(self.stats["repairs"])}
+
+
+# Global instance
+output_validator = OutputValidator()
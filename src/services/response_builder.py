@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+
+def build_entity(entity_config: Dict[str, Any], value: Any) -> Dict[str, Any]:
+    """
+    Entity in the public response shape (DEFAULT_RESPONSE_FORMAT): the extracted value in
+    user_input, and for OPTION entities the matched option in response as well
+    """
+    is_option = entity_config.get("type") == "OPTION"
+    return {
+        "id": entity_config.get("id"),
+        "label": entity_config.get("label", ""),
+        "type": entity_config.get("type", "TEXT_INPUT"),
+        "options": list(entity_config.get("options", [])),
+        "user_input": value,
+        "response": value if is_option else None
+    }
+
+
+def build_intent_response(
+        intent_config: Dict[str, Any],
+        values: Dict[str, Any],
+        intent_changed: Optional[bool] = None,
+        previous_intent_id: Optional[str] = None,
+        source: str = "single-prompt-llm-service"
+) -> Dict[str, Any]:
+    """Full intent-entity-detection response for a catalog intent and entity id -> value map"""
+    return {
+        "status": "Success",
+        "result": [{
+            "intent": intent_config.get("intent"),
+            "is_matched": True,
+            "intent_changed": intent_changed,
+            "intentId": intent_config.get("intentId"),
+            "previous_intentId": previous_intent_id,
+            "entity": [build_entity(entity, values.get(entity.get("id"))) for entity in intent_config.get("entity", [])],
+            "metadata": {
+                "version": "v1.0",
+                "last_updated": datetime.now().isoformat(),
+                "source": source
+            }
+        }]
+    }
@@ -0,0 +1,83 @@
+import copy
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from src.config.settings import settings
+from src.utils.text import normalize_message
+from src.utils.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Bounded LRU cache with TTL for successful intent detection results"""
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "rejected": 0}
+
+    def make_key(self, message: str, catalog_version: str) -> str:
+        """Build a cache key from the normalized message and the catalog content hash"""
+        raw = f"{catalog_version}\x00{normalize_message(message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached response, or None on miss/expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        CACHE_LOOKUPS.labels(self.name, "hit").inc()
+        # Callers mutate the response, so never hand out the stored object
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response; error results are never cached"""
+        if not isinstance(value, dict) or value.get("status") == "Error" or "error" in value:
+            self.stats["rejected"] += 1
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global instance
+response_cache = ResponseCache("intent_response", settings.RESPONSE_CACHE_MAX_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
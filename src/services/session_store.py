@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend(ABC):
+    """Persistent session backend interface; the in-memory LRU sits in front of it"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """State of an unexpired session, or None"""
+
+    @abstractmethod
+    def set(self, session_id: str, state: Dict[str, Any], expires_at: float) -> None:
+        """Store a session's state until `expires_at` (time.time())"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Forget a session"""
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in a WAL-mode SQLite file, shared by all worker processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE session_id = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id: str, state: Dict[str, Any], expires_at: float) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, state, expires_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(state), expires_at)
+        )
+        conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+
+class SessionStore:
+    """
+    Conversation state per session_id: the active intent and the entity values filled so far.
+    In-memory LRU with TTL, optionally backed by a persistent SessionBackend.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: float, backend: Optional[SessionBackend] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "backend_hits": 0, "evictions": 0, "errors": 0}
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get the session state, or None if unknown or expired"""
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            expires_at, state = entry
+            if expires_at > time.monotonic():
+                self._sessions.move_to_end(session_id)
+                self.stats["hits"] += 1
+                return dict(state)
+            del self._sessions[session_id]
+
+        if self.backend is not None:
+            try:
+                state = await asyncio.to_thread(self.backend.get, session_id)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error reading session backend: {e}")
+                state = None
+            if state is not None:
+                self.stats["backend_hits"] += 1
+                self._remember(session_id, state)
+                return dict(state)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Store the session state and refresh its TTL"""
+        state = {**state, "updated_at": time.time()}
+        self._remember(session_id, state)
+        if self.backend is not None:
+            try:
+                await asyncio.to_thread(self.backend.set, session_id, state, time.time() + self.ttl_seconds)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error writing session backend: {e}")
+
+    async def delete(self, session_id: str) -> None:
+        """Forget a session"""
+        self._sessions.pop(session_id, None)
+        if self.backend is not None:
+            try:
+                await asyncio.to_thread(self.backend.delete, session_id)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error deleting from session backend: {e}")
+
+    def _remember(self, session_id: str, state: Dict[str, Any]) -> None:
+        self._sessions[session_id] = (time.monotonic() + self.ttl_seconds, state)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return session counters"""
+        return {
+            **self.stats,
+            "size": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "backend": type(self.backend).__name__ if self.backend else None,
+        }
+
+
+def _create_backend() -> Optional[SessionBackend]:
+    if settings.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionBackend(settings.SESSION_DB_PATH)
+    return None
+
+
+# Global instance
+session_store = SessionStore(settings.SESSION_MAX_SESSIONS, settings.SESSION_TTL_SECONDS, _create_backend())
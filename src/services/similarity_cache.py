@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Set, Tuple
+from src.config.settings import settings
+from src.data.loader import CatalogSnapshot
+from src.services.intent_retriever import tokenize
+from src.utils.metrics import CACHE_LOOKUPS, SIMILARITY_CACHE_AUDITS, SIMILARITY_CACHE_REUSE
+from src.utils.text import normalize_message
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime modulus of the MinHash permutations (hashes are 61-bit)
+_PRIME = (1 << 61) - 1
+
+# Stats counter of each reuse mode and audit result
+_REUSE_COUNTERS = {"direct": "served_direct", "extraction": "served_extraction", "rejected": "rejected"}
+_AUDIT_COUNTERS = {
+    "agreed": "audit_agreed", "false_reuse": "false_reuse", "inconclusive": "audit_inconclusive", "skipped": "audit_skipped"
+}
+
+
+def _shingles(message: str) -> frozenset:
+    """Stemmed content words plus their character trigrams, so small rewordings and typos still overlap"""
+    shingles = set()
+    for token in tokenize(normalize_message(message)):
+        shingles.add(token)
+        padded = f"^{token}$"
+        shingles.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(shingles)
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") & _PRIME
+
+
+@dataclass
+class SimilarMatch:
+    """A cached message similar enough to reuse its classification"""
+    intent_id: str
+    similarity: float
+    message: str
+
+
+class _Entry:
+    __slots__ = ("message", "intent_id", "shingles", "bands", "expires_at")
+
+    def __init__(self, message: str, intent_id: str, shingles: frozenset, bands: List[int], expires_at: float):
+        self.message = message
+        self.intent_id = intent_id
+        self.shingles = shingles
+        self.bands = bands
+        self.expires_at = expires_at
+
+
+class _CatalogIndex:
+    """LSH buckets over the answered messages of one catalog version"""
+
+    def __init__(self, version: str):
+        self.version = version
+        self.entries: Dict[str, _Entry] = {}
+        # (band number, band hash) -> keys of the entries falling in that bucket
+        self.buckets: Dict[Tuple[int, int], Set[str]] = {}
+
+
+class SimilarityCache:
+    """
+    Near-duplicate lookup of previously classified messages. Each message is reduced to a
+    MinHash signature of its shingles; LSH banding finds candidates in constant time, and
+    the exact Jaccard similarity of the shingle sets decides the match. Entries are kept
+    per catalog, dropped when that catalog's version changes, and bounded overall by an LRU.
+    """
+
+    def __init__(self, max_entries: int, num_perm: int, bands: int):
+        self.max_entries = max_entries
+        self.bands = max(1, min(bands, num_perm))
+        self.rows = max(1, num_perm // self.bands)
+        rng = random.Random(num_perm)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(self.bands * self.rows)]
+        self._indexes: Dict[str, _CatalogIndex] = {}
+        # LRU over (catalog name, entry key) across all catalogs
+        self._lru: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self.stats = {
+            "lookups": 0, "hits": 0, "misses": 0, "added": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+            "served_direct": 0, "served_extraction": 0, "rejected": 0,
+            "audits": 0, "audit_agreed": 0, "false_reuse": 0, "audit_inconclusive": 0, "audit_skipped": 0,
+        }
+
+    def _band_hashes(self, shingles: frozenset) -> List[int]:
+        """MinHash signature of the shingles, hashed band by band"""
+        hashes = [_hash(shingle) for shingle in shingles]
+        signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms]
+        return [hash(tuple(signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+    def _index(self, snapshot: CatalogSnapshot, create: bool = False) -> Optional[_CatalogIndex]:
+        """Index of the snapshot's catalog, dropping it when the catalog has moved to another version"""
+        index = self._indexes.get(snapshot.name)
+        if index is not None and index.version != snapshot.version:
+            if not create:
+                return None
+            for key in index.entries:
+                self._lru.pop((snapshot.name, key), None)
+            self.stats["invalidations"] += 1
+            logger.info(f"Similarity cache for catalog '{snapshot.name}' invalidated ({len(index.entries)} entries)")
+            index = None
+        if index is None and create:
+            index = self._indexes[snapshot.name] = _CatalogIndex(snapshot.version)
+        return index
+
+    def _remove(self, catalog: str, index: _CatalogIndex, key: str) -> None:
+        entry = index.entries.pop(key, None)
+        if entry is None:
+            return
+        for band, band_hash in enumerate(entry.bands):
+            bucket = index.buckets.get((band, band_hash))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del index.buckets[(band, band_hash)]
+        self._lru.pop((catalog, key), None)
+
+    def lookup(self, message: str, snapshot: CatalogSnapshot) -> Optional[SimilarMatch]:
+        """Most similar answered message of the same catalog version at or above the threshold"""
+        self.stats["lookups"] += 1
+        index = self._index(snapshot)
+        shingles = _shingles(message)
+        best: Optional[Tuple[float, str]] = None
+        if index is not None and shingles:
+            candidates = set()
+            for band, band_hash in enumerate(self._band_hashes(shingles)):
+                candidates.update(index.buckets.get((band, band_hash), ()))
+            now = time.monotonic()
+            for key in candidates:
+                entry = index.entries[key]
+                if entry.expires_at < now:
+                    self._remove(snapshot.name, index, key)
+                    self.stats["expirations"] += 1
+                    continue
+                similarity = len(shingles & entry.shingles) / len(shingles | entry.shingles)
+                if similarity >= settings.SIMILARITY_CACHE_THRESHOLD and (best is None or similarity > best[0]):
+                    best = (similarity, key)
+
+        if best is None:
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.labels("similarity", "miss").inc()
+            return None
+
+        similarity, key = best
+        entry = index.entries[key]
+        self._lru.move_to_end((snapshot.name, key))
+        self.stats["hits"] += 1
+        CACHE_LOOKUPS.labels("similarity", "hit").inc()
+        return SimilarMatch(entry.intent_id, round(similarity, 4), entry.message)
+
+    def add(self, message: str, intent_id: str, snapshot: CatalogSnapshot) -> None:
+        """Remember the intent a message was classified as"""
+        shingles = _shingles(message)
+        if not shingles or not intent_id:
+            return
+        index = self._index(snapshot, create=True)
+        key = hashlib.sha256(normalize_message(message).encode("utf-8")).hexdigest()
+        self._remove(snapshot.name, index, key)
+
+        bands = self._band_hashes(shingles)
+        index.entries[key] = _Entry(
+            message, intent_id, shingles, bands, time.monotonic() + settings.SIMILARITY_CACHE_TTL_SECONDS
+        )
+        for band, band_hash in enumerate(bands):
+            index.buckets.setdefault((band, band_hash), set()).add(key)
+        self._lru[(snapshot.name, key)] = None
+        self.stats["added"] += 1
+
+        while len(self._lru) > self.max_entries:
+            (catalog, old_key), _ = self._lru.popitem(last=False)
+            old_index = self._indexes.get(catalog)
+            if old_index is not None:
+                self._remove(catalog, old_index, old_key)
+            self.stats["evictions"] += 1
+
+    def record_reuse(self, mode: str) -> None:
+        """Count how a hit was served: direct, extraction, or rejected (fell back to a full call)"""
+        self.stats[_REUSE_COUNTERS[mode]] += 1
+        SIMILARITY_CACHE_REUSE.labels(mode).inc()
+
+    def record_audit(self, result: str) -> None:
+        """Count a background re-classification: agreed, false_reuse, inconclusive or skipped"""
+        if result in ("agreed", "false_reuse"):
+            self.stats["audits"] += 1
+        self.stats[_AUDIT_COUNTERS[result]] += 1
+        SIMILARITY_CACHE_AUDITS.labels(result).inc()
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._indexes.clear()
+        self._lru.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit rate, reuse and false-reuse audit counters"""
+        lookups = self.stats["lookups"]
+        audits = self.stats["audits"]
+        return {
+            **self.stats,
+            "enabled": settings.SIMILARITY_CACHE_ENABLED,
+            "size": len(self._lru),
+            "catalogs": len(self._indexes),
+            "max_entries": self.max_entries,
+            "threshold": settings.SIMILARITY_CACHE_THRESHOLD,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "false_reuse_rate": round(self.stats["false_reuse"] / audits, 4) if audits else 0.0,
+        }
+
+
+# Global instance
+similarity_cache = SimilarityCache(
+    settings.SIMILARITY_CACHE_MAX_ENTRIES, settings.SIMILARITY_CACHE_NUM_PERM, settings.SIMILARITY_CACHE_BANDS
+)
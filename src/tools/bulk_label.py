@@ -0,0 +1,276 @@
+"""
+Offline bulk intent labeling over a JSONL file of messages.
+
+Each input line is a JSON object with the message (--message-field, default
+"message") and optionally an id (--id-field), "active_intent_id" and "catalog_id".
+Messages go through IntentService.process_message with bounded concurrency and
+results are appended to the output JSONL as they complete.
+
+Progress is checkpointed in SQLite next to the output: completed ids plus the
+output size they correspond to. A crashed or interrupted run resumes where it left
+off, without relabeling completed lines or duplicating output. Repeated ids are
+skipped. Repeated messages reuse the earlier label without another LLM call. Input
+is streamed, so memory does not grow with the file size.
+
+    python -m src.tools.bulk_label transcripts.jsonl labels.jsonl --concurrency 16
+    python -m src.tools.bulk_label transcripts.jsonl labels.jsonl --catalog brandA --full
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.data.catalogs import catalog_registry
+from src.services.intent_service import intent_service
+from src.services.llm_service import LLMOverloadedError
+from src.utils.structured_log import configure_logging, shutdown_logging
+from src.utils.text import normalize_message
+
+logger = logging.getLogger(__name__)
+
+# Back-off when the LLM admission gate sheds a labeling call
+_OVERLOAD_BACKOFF_SECONDS = 1.0
+
+
+class Checkpoint:
+    """Completed ids, the output size they were committed at, and labels of seen messages"""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS done (key TEXT PRIMARY KEY)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS labels (message_key TEXT PRIMARY KEY, record_key TEXT, label TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def get_meta(self, name: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name: str, value: Any) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def is_done(self, key: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM done WHERE key = ?", (key,)).fetchone() is not None
+
+    def completed(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM done").fetchone()[0]
+
+    def find_label(self, message_key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        row = self.conn.execute("SELECT record_key, label FROM labels WHERE message_key = ?", (message_key,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def commit(self, records: List[Dict[str, Any]], output_offset: int) -> None:
+        """Mark records done together with the output size that contains them"""
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO done (key) VALUES (?)", [(record["key"],) for record in records])
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO labels (message_key, record_key, label) VALUES (?, ?, ?)",
+                [(record["message_key"], record["key"], json.dumps(record["label"], ensure_ascii=False))
+                 for record in records if record["label"].get("status") != "Error" and "duplicate_of" not in record["label"]]
+            )
+            self.set_meta("output_offset", output_offset)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _message_key(message: str, active_intent_id: Optional[str], catalog_id: Optional[str]) -> str:
+    raw = f"{catalog_id or ''}\x00{active_intent_id or ''}\x00{normalize_message(message)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _label(response: Dict[str, Any], full: bool) -> Dict[str, Any]:
+    """Labeling output: the full response, or intentId plus entity id -> value"""
+    if full:
+        return response
+    result = (response.get("result") or [{}])[0]
+    label = {
+        "status": response.get("status"),
+        "intent": result.get("intent"),
+        "intentId": result.get("intentId"),
+        "entities": {entity.get("id"): entity.get("user_input") for entity in result.get("entity") or []
+                     if entity.get("user_input") not in (None, "")},
+    }
+    if response.get("error"):
+        label["error"] = response["error"]
+    return label
+
+
+class BulkLabeler:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.stats = {"labeled": 0, "reused": 0, "skipped": 0, "errors": 0, "invalid": 0}
+        self._pending_keys: set = set()
+        self._started = time.monotonic()
+        self._input_size = max(os.path.getsize(args.input), 1)
+        self._input_position = 0
+
+    async def _read(self, work: asyncio.Queue, checkpoint: Checkpoint) -> None:
+        """Stream input lines into the bounded work queue, skipping completed and repeated ids"""
+        args = self.args
+        with open(args.input, "rb") as file:
+            for line_number, raw in enumerate(file, 1):
+                self._input_position = file.tell()
+                if not raw.strip():
+                    continue
+                try:
+                    item = json.loads(raw)
+                    message = str(item[args.message_field]).strip()
+                except (ValueError, KeyError, TypeError) as e:
+                    self.stats["invalid"] += 1
+                    logger.warning(f"Skipping line {line_number}: {e!r}")
+                    continue
+
+                record_id = item.get(args.id_field)
+                key = str(record_id) if record_id is not None else f"line:{line_number}"
+                if key in self._pending_keys or checkpoint.is_done(key):
+                    self.stats["skipped"] += 1
+                    continue
+                self._pending_keys.add(key)
+                await work.put((key, line_number, item, message))
+
+        for _ in range(args.concurrency):
+            await work.put(None)
+
+    async def _label_one(self, key: str, line_number: int, item: Dict[str, Any], message: str,
+                         checkpoint: Checkpoint) -> Dict[str, Any]:
+        args = self.args
+        active_intent_id = item.get("active_intent_id")
+        catalog_id = item.get("catalog_id") or args.catalog
+        message_key = _message_key(message, active_intent_id, catalog_id)
+
+        record_id = item.get(args.id_field)
+        record = {"key": key, "id": record_id if record_id is not None else line_number, "line": line_number,
+                  "message_key": message_key}
+        previous = checkpoint.find_label(message_key)
+        if previous is not None:
+            self.stats["reused"] += 1
+            record["label"] = {**previous[1], "duplicate_of": previous[0]}
+            return record
+
+        while True:
+            try:
+                snapshot = await catalog_registry.get_snapshot(catalog_id)
+                response = await intent_service.process_message(message, active_intent_id, None, snapshot)
+                break
+            except LLMOverloadedError:
+                await asyncio.sleep(_OVERLOAD_BACKOFF_SECONDS)
+            except Exception as e:
+                response = {"status": "Error", "error": str(e)}
+                break
+
+        if response.get("status") == "Error":
+            self.stats["errors"] += 1
+        else:
+            self.stats["labeled"] += 1
+        record["label"] = _label(response, args.full)
+        return record
+
+    async def _work(self, work: asyncio.Queue, done: asyncio.Queue, checkpoint: Checkpoint) -> None:
+        while True:
+            entry = await work.get()
+            if entry is None:
+                await done.put(None)
+                return
+            await done.put(await self._label_one(*entry, checkpoint))
+
+    async def _write(self, done: asyncio.Queue, output, checkpoint: Checkpoint) -> None:
+        """Append results and commit the checkpoint every --checkpoint-every records"""
+        args = self.args
+        batch: List[Dict[str, Any]] = []
+        finished_workers = 0
+        last_report = time.monotonic()
+
+        def flush() -> None:
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint.commit(batch, output.tell())
+            for record in batch:
+                self._pending_keys.discard(record["key"])
+            batch.clear()
+
+        while finished_workers < args.concurrency:
+            record = await done.get()
+            if record is None:
+                finished_workers += 1
+                continue
+            line = {args.id_field: record["id"], "line": record["line"], **record["label"]}
+            output.write((json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8"))
+            batch.append(record)
+            if len(batch) >= args.checkpoint_every:
+                flush()
+            if time.monotonic() - last_report >= args.progress_seconds:
+                last_report = time.monotonic()
+                self._report()
+        if batch:
+            flush()
+
+    def _report(self, final: bool = False) -> None:
+        elapsed = time.monotonic() - self._started
+        processed = self.stats["labeled"] + self.stats["reused"] + self.stats["errors"]
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        done_share = self._input_position / self._input_size
+        eta = elapsed * (1 - done_share) / done_share if done_share > 0 and not final else 0.0
+        print(f"{'Done' if final else 'Progress'}: {processed} processed ({self.stats['reused']} reused, "
+              f"{self.stats['errors']} errors, {self.stats['skipped']} skipped) "
+              f"{rate:.1f}/s, input {100 * done_share:.1f}%, ETA {eta:.0f}s", file=sys.stderr, flush=True)
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint.sqlite3")
+        try:
+            # Drop output written after the last checkpoint; those records are labeled again
+            offset = int(checkpoint.get_meta("output_offset") or 0)
+            mode = "r+b" if os.path.exists(args.output) else "wb"
+            with open(args.output, mode) as output:
+                output.truncate(offset)
+                output.seek(offset)
+                if offset:
+                    print(f"Resuming: {checkpoint.completed()} records already done", file=sys.stderr, flush=True)
+
+                work: asyncio.Queue = asyncio.Queue(maxsize=2 * args.concurrency)
+                done: asyncio.Queue = asyncio.Queue(maxsize=2 * args.concurrency)
+                await asyncio.gather(
+                    self._read(work, checkpoint),
+                    self._write(done, output, checkpoint),
+                    *(self._work(work, done, checkpoint) for _ in range(args.concurrency))
+                )
+            self._report(final=True)
+            return dict(self.stats)
+        finally:
+            checkpoint.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Label a JSONL file of messages with intents and entities")
+    parser.add_argument("input", help="Input JSONL, one object with a message per line")
+    parser.add_argument("output", help="Output JSONL (appended to when resuming)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Messages labeled at once")
+    parser.add_argument("--message-field", default="message")
+    parser.add_argument("--id-field", default="id", help="Record id field (the line number when absent)")
+    parser.add_argument("--catalog", default=None, help="Tenant catalog for lines without catalog_id")
+    parser.add_argument("--full", action="store_true", help="Write the full API response instead of compact labels")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint database (default <output>.checkpoint.sqlite3)")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="Records per checkpoint commit")
+    parser.add_argument("--progress-seconds", type=float, default=10.0)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    try:
+        asyncio.run(BulkLabeler(args).run())
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
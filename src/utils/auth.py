@@ -1,5 +1,6 @@
 from fastapi import HTTPException, status, Depends, Header
 from src.config.settings import settings
+from src.utils.timing import span
 import logging
 import secrets
 from typing import Optional
@@ -11,6 +12,11 @@ def verify_api_key(authorization: Optional[str] = Header(None)) -> str:
     Verify API key using simple token in Authorization header.
     Expected format: Authorization: <api_key>
     """
+    with span("auth"):
+        return _check_api_key(authorization)
+
+
+def _check_api_key(authorization: Optional[str]) -> str:
     if not settings.API_KEY:
         logger.error("API_KEY not configured in environment variables")
         raise HTTPException(
@@ -36,5 +42,5 @@ def verify_api_key(authorization: Optional[str] = Header(None)) -> str:
             detail="No valid API key provided"
         )
     
-    logger.info("Authentication successful")
+    logger.debug("Authentication successful")
     return provided_key
\ No newline at end of file
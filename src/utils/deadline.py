@@ -0,0 +1,45 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+# Absolute time.monotonic() by which the current request must be answered; None means unbounded
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the current request's deadline budget runs out"""
+
+
+def set_deadline(budget_seconds: Optional[float]) -> Token:
+    """Start a deadline budget for the current request (and the tasks it spawns)"""
+    return _deadline.set(time.monotonic() + budget_seconds if budget_seconds and budget_seconds > 0 else None)
+
+
+def set_deadline_at(deadline: Optional[float]) -> Token:
+    """Set an absolute time.monotonic() deadline for the current context (None: unbounded)"""
+    return _deadline.set(deadline)
+
+
+def get_deadline() -> Optional[float]:
+    """Absolute time.monotonic() deadline of the current request, or None when there is none"""
+    return _deadline.get()
+
+
+def reset_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None when there is no deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(stage: str) -> Optional[float]:
+    """Raise DeadlineExceededError if the budget is spent; otherwise return the seconds left"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError(f"Request deadline exceeded before {stage}")
+    return left
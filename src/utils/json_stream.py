@@ -0,0 +1,120 @@
+import json
+import logging
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+JSONPath = Tuple[Union[str, int], ...]
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = ",}]" + _WHITESPACE
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "start", "key", "index", "expect_key")
+
+    def __init__(self, kind: str, path: JSONPath, start: int):
+        self.kind = kind
+        self.path = path
+        self.start = start
+        self.key: Optional[str] = None
+        self.index = -1
+        self.expect_key = kind == "object"
+
+
+class IncrementalJSONParser:
+    """
+    Incremental JSON scanner for streamed LLM output.
+
+    Feed text chunks as they arrive; every value whose path satisfies `want`
+    is returned from feed() as (path, value) as soon as its closing character
+    is seen, without waiting for the rest of the document. Paths are tuples of
+    object keys and array indexes, e.g. ("result", 0, "entity", 2).
+    """
+
+    def __init__(self, want: Callable[[JSONPath], bool]):
+        self.want = want
+        self.text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._string_start: Optional[int] = None
+        self._string_is_key = False
+        self._escaped = False
+        self._scalar_start: Optional[int] = None
+        self._value_path: JSONPath = ()
+
+    def _begin_value(self) -> JSONPath:
+        """Path of a value starting at the current position"""
+        if not self._stack:
+            return ()
+        top = self._stack[-1]
+        if top.kind == "array":
+            top.index += 1
+            return top.path + (top.index,)
+        return top.path + (top.key,)
+
+    def _complete(self, path: JSONPath, start: int, end: int, events: List[Tuple[JSONPath, Any]]) -> None:
+        if self.want(path):
+            try:
+                events.append((path, json.loads(self.text[start:end])))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Could not decode streamed JSON value at {path}: {e}")
+
+    def feed(self, chunk: str) -> List[Tuple[JSONPath, Any]]:
+        """Consume a chunk of text and return the wanted values it completed"""
+        events: List[Tuple[JSONPath, Any]] = []
+        self.text += chunk
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._string_start is not None:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    start, self._string_start = self._string_start, None
+                    if self._string_is_key:
+                        top = self._stack[-1]
+                        top.key = json.loads(text[start:i + 1])
+                        top.expect_key = False
+                    else:
+                        self._complete(self._value_path, start, i + 1, events)
+                continue
+
+            if self._scalar_start is not None:
+                if c not in _SCALAR_END:
+                    continue
+                start, self._scalar_start = self._scalar_start, None
+                self._complete(self._value_path, start, i, events)
+
+            if c in _WHITESPACE or c == ":":
+                continue
+            if c == ",":
+                if self._stack and self._stack[-1].kind == "object":
+                    self._stack[-1].expect_key = True
+                continue
+            if c in "}]":
+                if self._stack:
+                    frame = self._stack.pop()
+                    self._complete(frame.path, frame.start, i + 1, events)
+                continue
+            if c == '"':
+                self._string_start = i
+                self._string_is_key = bool(self._stack) and self._stack[-1].kind == "object" and self._stack[-1].expect_key
+                if not self._string_is_key:
+                    self._value_path = self._begin_value()
+                continue
+            if c in "{[":
+                path = self._begin_value()
+                self._stack.append(_Frame("object" if c == "{" else "array", path, i))
+                continue
+
+            # Number or literal (true/false/null)
+            self._value_path = self._begin_value()
+            self._scalar_start = i
+
+        self._pos = len(text)
+        return events
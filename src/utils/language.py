@@ -0,0 +1,161 @@
+import re
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+# Words of 1+ letters (any script, apostrophes kept inside words)
+_WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# Frequent function words of the Latin-script languages we tell apart. A word listed for
+# several languages counts as a fraction of a hit for each of them. Content and sentiment
+# words do not belong here: short feedback such as "good service" is no evidence of a language.
+_STOPWORDS: Dict[str, str] = {
+    "en": "the and is are was were not you your it this that with for have has had been but they my me i "
+          "very what why when can can't don't i'm it's there of to on at be do no am",
+    "es": "el la los las y es que no de en por para con una un muy pero como mi su se lo del al está "
+          "fue son tiene nada cuando porque también",
+    "fr": "le la les et est que ne pas de des du en pour avec une un très mais je vous il elle nous "
+          "mon ma c'est sur dans qui ce au",
+    "de": "der die das und ist nicht ich sie es ein eine mit für auf zu den dem sehr aber mein war "
+          "wie auch noch kein nur habe",
+    "pt": "o a os as e é que não de do da em para com uma um muito mas meu minha está foi são tem "
+          "nada quando porque também",
+    "it": "il lo la gli le e è che non di del della in per con una un molto ma mio mia sono ho "
+          "anche quando perché",
+    "nl": "de het een en is niet ik je van voor met op te zijn maar mijn was wat heel geen ook "
+          "nog dat",
+    "tr": "ve bir bu çok için ile ama ben sen o değil var yok da de ne gibi daha",
+    "id": "dan yang tidak saya di ke dari untuk dengan ini itu ada sangat tapi sudah belum bisa "
+          "juga karena",
+    "pl": "i w nie na jest że się z do to ale bardzo mój jak co tak już",
+    "ro": "și este nu în la cu pe un o foarte dar eu mai din pentru care sunt",
+    "sv": "och är inte jag att det en ett på med för till men mycket min var som har",
+}
+
+# Letters that only (or mostly) occur in one of those languages
+_MARKERS: Dict[str, str] = {
+    "es": "ñ¿¡", "de": "ß", "pt": "ãõ", "fr": "œ", "tr": "ğı", "pl": "ąęłźż", "ro": "ăț", "sv": "å",
+}
+
+# Frequent words telling Russian and Ukrainian apart when no marker letter does
+_RUSSIAN_WORDS = frozenset("очень что это как нет был была было только уже когда".split())
+_UKRAINIAN_WORDS = frozenset("дуже що це як немає був була було тільки вже коли".split())
+
+# Scripts that identify a language (or a small family, refined by marker letters below)
+_SCRIPT_LANGUAGES = {
+    "ARABIC": "ar", "CYRILLIC": "ru", "GREEK": "el", "HEBREW": "he", "DEVANAGARI": "hi", "BENGALI": "bn",
+    "TAMIL": "ta", "TELUGU": "te", "THAI": "th", "GEORGIAN": "ka", "ARMENIAN": "hy", "HANGUL": "ko",
+    "HIRAGANA": "ja", "KATAKANA": "ja", "CJK": "zh", "GUJARATI": "gu", "KANNADA": "kn", "MALAYALAM": "ml",
+    "GURMUKHI": "pa", "SINHALA": "si", "KHMER": "km", "LAO": "lo", "MYANMAR": "my", "ETHIOPIC": "am",
+}
+
+# Frequent Chinese function characters; kanji-only Japanese rarely has them, and without
+# them (or kana) Han text cannot be told apart
+_CHINESE_CHARS = frozenset("的了是我你他她们們这這个個很吗嗎呢吧没沒么麼说說还還")
+
+# Scripts written without spaces between words
+_UNSPACED_SCRIPTS = frozenset({"CJK", "HIRAGANA", "KATAKANA", "THAI", "LAO", "KHMER", "MYANMAR"})
+
+_WORD_LANGUAGES: Dict[str, Tuple[str, ...]] = {}
+for _language, _words in _STOPWORDS.items():
+    for _word in _words.split():
+        _WORD_LANGUAGES[_word] = _WORD_LANGUAGES.get(_word, ()) + (_language,)
+
+# Hits of a Latin-script text needed for full confidence
+_FULL_CONFIDENCE_HITS = 2.0
+
+
+def normalize_language_code(code: Optional[str]) -> str:
+    """"en-US" / "EN_gb" -> "en" """
+    return re.split(r"[-_]", (code or "").strip().lower(), maxsplit=1)[0]
+
+
+def _script(char: str) -> Optional[str]:
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        return None
+    return name.split(" ", 1)[0]
+
+
+def count_tokens(text: str) -> int:
+    """Words in a text; in scripts written without spaces, every two characters count as one"""
+    tokens = 0
+    for word in _WORD_RE.findall(text or ""):
+        unspaced = sum(1 for char in word if _script(char) in _UNSPACED_SCRIPTS)
+        tokens += (unspaced + 1) // 2 if unspaced else 1
+    return tokens
+
+
+def _refine_script_language(language: str, text: str) -> Tuple[str, float]:
+    """Tell apart languages sharing a script by their marker letters; (language, confidence factor)"""
+    if language == "zh":
+        # Han characters without kana: Chinese only when its function characters show up
+        return ("zh", 1.0) if any(char in _CHINESE_CHARS for char in text) else ("zh", 0.5)
+    if language == "ar":
+        if any(char in text for char in "ٹڈڑںے"):
+            return "ur", 1.0
+        if any(char in text for char in "پچژگی"):
+            return "fa", 1.0
+        return "ar", 0.95
+    if language == "ru":
+        if any(char in text for char in "іїєґІЇЄҐ"):
+            return "uk", 1.0
+        if any(char in text for char in "ђјљњћџѓќѕЂЈЉЊЋЏ"):
+            return "sr", 0.9
+        if any(char in text for char in "ыэёЫЭЁ"):
+            return "ru", 1.0
+        words = set(_WORD_RE.findall(text.lower()))
+        if words & _UKRAINIAN_WORDS and not words & _RUSSIAN_WORDS:
+            return "uk", 1.0
+        if words & _RUSSIAN_WORDS:
+            return "ru", 1.0
+        return ("bg", 0.9) if "ъ" in text else ("ru", 0.7)
+    return language, 1.0
+
+
+def detect_language(text: str) -> Tuple[Optional[str], float]:
+    """
+    Identify the language of a short text without any model: by script for non-Latin
+    alphabets, by frequent function words and marker letters for Latin-script ones.
+    Returns (ISO 639-1 code, confidence 0..1), or (None, 0.0) when there is too little to go on.
+    """
+    scripts: Dict[str, int] = {}
+    letters = 0
+    for char in text:
+        if char.isalpha():
+            letters += 1
+            script = _script(char)
+            if script:
+                scripts[script] = scripts.get(script, 0) + 1
+    if not letters:
+        return None, 0.0
+
+    script, count = max(scripts.items(), key=lambda item: item[1]) if scripts else (None, 0)
+    if script in ("HIRAGANA", "KATAKANA", "CJK") and (scripts.get("HIRAGANA") or scripts.get("KATAKANA")):
+        # Japanese mixes kana with kanji
+        count = scripts.get("HIRAGANA", 0) + scripts.get("KATAKANA", 0) + scripts.get("CJK", 0)
+        script = "HIRAGANA"
+    if script in _SCRIPT_LANGUAGES:
+        language, factor = _refine_script_language(_SCRIPT_LANGUAGES[script], text)
+        return language, round(factor * count / letters, 4)
+    if script != "LATIN":
+        return None, 0.0
+
+    lowered = text.lower()
+    scores: Dict[str, float] = {}
+    for word in _WORD_RE.findall(lowered):
+        languages = _WORD_LANGUAGES.get(word)
+        if languages:
+            for language in languages:
+                scores[language] = scores.get(language, 0.0) + 1.0 / len(languages)
+    for language, markers in _MARKERS.items():
+        if any(char in lowered for char in markers):
+            scores[language] = scores.get(language, 0.0) + 1.0
+    if not scores:
+        return None, 0.0
+
+    language, top = max(scores.items(), key=lambda item: item[1])
+    share = top / sum(scores.values())
+    latin_share = count / letters
+    confidence = share * min(1.0, top / _FULL_CONFIDENCE_HITS) * latin_share
+    return language, round(confidence, 4)
@@ -0,0 +1,102 @@
+import os
+import logging
+from typing import Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+logger = logging.getLogger(__name__)
+
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR (an empty, writable
+# directory) before start-up so every worker writes its samples there and any
+# worker can serve the aggregated /metrics.
+MULTIPROCESS_ENABLED = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUESTS = Counter(
+    "chatbot_http_requests_total", "HTTP requests by endpoint and status", ["endpoint", "method", "status"]
+)
+HTTP_REQUEST_LATENCY = Histogram(
+    "chatbot_http_request_duration_seconds", "HTTP request latency", ["endpoint"], buckets=_LATENCY_BUCKETS
+)
+LLM_CALL_LATENCY = Histogram(
+    "chatbot_llm_call_duration_seconds", "Upstream LLM call latency", ["kind", "outcome"], buckets=_LATENCY_BUCKETS
+)
+LLM_IN_FLIGHT = Gauge(
+    "chatbot_llm_in_flight", "Upstream LLM calls currently in flight", multiprocess_mode="livesum"
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "chatbot_llm_queue_depth", "LLM calls waiting for an admission slot", multiprocess_mode="livesum"
+)
+LLM_QUEUE_WAIT = Histogram(
+    "chatbot_llm_queue_wait_seconds", "Time LLM calls waited for an admission slot", buckets=_LATENCY_BUCKETS
+)
+LLM_SHED = Counter(
+    "chatbot_llm_shed_total", "LLM calls rejected by admission control (queue_full, estimate, timeout)", ["reason"]
+)
+LLM_RETRIES = Counter(
+    "chatbot_llm_retries_total", "Upstream LLM call retries by cause", ["reason"]
+)
+LLM_HEDGES = Counter(
+    "chatbot_llm_hedges_total", "Hedged LLM calls (issued, won, rate_limited, no_slot)", ["event"]
+)
+LLM_COALESCED = Counter(
+    "chatbot_llm_coalesced_total", "Completion requests served by an identical in-flight call", ["kind"]
+)
+LLM_JSON_PARSE_FAILURES = Counter(
+    "chatbot_llm_json_parse_failures_total", "LLM responses that were not valid JSON", ["kind"]
+)
+LLM_OUTPUT_REPAIRS = Counter(
+    "chatbot_llm_output_repairs_total",
+    "Repairs applied to LLM intent results (filled_entity, corrected_option, nulled_option, ...)", ["repair"]
+)
+LLM_CASCADE_CALLS = Counter(
+    "chatbot_llm_cascade_calls_total", "Model cascade calls by kind, tier and outcome", ["kind", "tier", "outcome"]
+)
+LLM_CASCADE_LATENCY = Histogram(
+    "chatbot_llm_cascade_duration_seconds", "Model cascade call latency by kind and tier", ["kind", "tier"],
+    buckets=_LATENCY_BUCKETS
+)
+LLM_CASCADE_ESCALATIONS = Counter(
+    "chatbot_llm_cascade_escalations_total", "Fast-tier answers escalated to the strong model", ["kind", "signal"]
+)
+LLM_TOKENS = Counter(
+    "chatbot_llm_tokens_total", "Tokens reported by the LLM (type: prompt, cached, completion)", ["kind", "type"]
+)
+CACHE_LOOKUPS = Counter(
+    "chatbot_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+SIMILARITY_CACHE_REUSE = Counter(
+    "chatbot_similarity_cache_reuse_total",
+    "Near-duplicate cache hits by how they were served (direct, extraction, rejected)", ["mode"]
+)
+SIMILARITY_CACHE_AUDITS = Counter(
+    "chatbot_similarity_cache_audits_total",
+    "Background re-classifications of reused answers (agreed, false_reuse, inconclusive, skipped)", ["result"]
+)
+CATALOG_LOOKUPS = Counter(
+    "chatbot_catalog_lookups_total", "Tenant catalog lookups (hit, load, fallback, unknown, eviction)", ["result"]
+)
+FEEDBACK_LANGUAGE = Counter(
+    "chatbot_feedback_language_total",
+    "Feedback language identification (same_language, other_language, undetected)", ["outcome"]
+)
+INTENT_PREFILTER = Counter(
+    "chatbot_intent_prefilter_total", "Intent pre-filter outcomes (filtered, fallback, disabled)", ["outcome"]
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format, aggregated across workers when enabled"""
+    if MULTIPROCESS_ENABLED:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared multiprocess directory on shutdown"""
+    if MULTIPROCESS_ENABLED:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,204 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import logging
+import weakref
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from typing import Dict, Any, Awaitable, List, Optional, TypeVar
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Profile of the current request; None unless the request asked for one
+_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+# Stack depth kept per sample
+_MAX_DEPTH = 64
+# Root frames of samples taken while another request's task, or none, was running
+_OTHER = "(other tasks)"
+_IDLE = "(idle: event loop waiting for I/O)"
+
+
+def _fold(frame: Any) -> str:
+    """A stack as "outermost;...;innermost" frames, the collapsed format flame graph tools read"""
+    names = []
+    while frame is not None and len(names) < _MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfile:
+    """Event loop stack samples taken while one request was in flight"""
+
+    def __init__(self, profile_id: str, path: str):
+        self.profile_id = profile_id
+        self.path = path
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        # Tasks known to work for this request (registered from its spans)
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.samples: Dict[str, int] = {}
+        self.counts = {"request": 0, "other": 0, "idle": 0}
+
+    def add(self, stack: str, kind: str) -> None:
+        self.counts[kind] += 1
+        if kind == "other":
+            stack = f"{_OTHER};{stack}"
+        elif kind == "idle":
+            stack = _IDLE
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def render(self) -> str:
+        """Header comments, then one "stack count" line per distinct stack, most frequent first"""
+        lines = [
+            f"# profile {self.profile_id} {self.path}",
+            f"# duration_ms={self.duration * 1000:.1f} interval_ms={settings.PROFILE_INTERVAL_MS} "
+            f"samples request={self.counts['request']} other={self.counts['other']} idle={self.counts['idle']}",
+        ]
+        for stack, count in sorted(self.samples.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"{stack} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def register_task() -> None:
+    """Attribute the current task's samples to the request being profiled, if any"""
+    profile = _profile.get()
+    if profile is None:
+        return
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        # A worker thread (to_thread / sync dependency); only the event loop thread is sampled
+        return
+    if task is not None:
+        profile.tasks.add(task)
+
+
+def clear_profile() -> None:
+    """Stop attributing the current context's tasks to a profiled request"""
+    _profile.set(None)
+
+
+def profiled(coro: Awaitable[T]) -> Awaitable[T]:
+    """Wrap a coroutine about to run in its own task so that task is attributed too (unchanged when not profiling)"""
+    if _profile.get() is None:
+        return coro
+
+    async def run() -> T:
+        register_task()
+        return await coro
+
+    return run()
+
+
+class SamplingProfiler:
+    """
+    On-demand statistical profiler for single requests. While at least one profiled
+    request is in flight, a background thread samples the event loop thread's stack
+    every PROFILE_INTERVAL_MS. Samples taken while one of the request's tasks runs
+    are attributed to it; the rest are kept as "other tasks" or "idle". Nothing runs
+    while no request is being profiled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: List[RequestProfile] = []
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._recent: "OrderedDict[str, str]" = OrderedDict()
+        self.stats = {"profiles": 0, "samples": 0, "stored": 0, "errors": 0}
+
+    def start(self, profile_id: str, path: str) -> Token:
+        """Start profiling the current request (call from the event loop)"""
+        profile = RequestProfile(profile_id, path)
+        token = _profile.set(profile)
+        register_task()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._active.append(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return token
+
+    def stop(self, token: Token) -> Optional[str]:
+        """Finish the current request's profile, keep it, and return its id"""
+        profile = _profile.get()
+        _profile.reset(token)
+        if profile is None:
+            return None
+        profile.duration = time.perf_counter() - profile.started
+        with self._lock:
+            self._active.remove(profile)
+        self.stats["profiles"] += 1
+        self._store(profile)
+        return profile.profile_id
+
+    def _run(self) -> None:
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", {})
+        while True:
+            time.sleep(settings.PROFILE_INTERVAL_MS / 1000)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                profiles = list(self._active)
+                loop, thread_id = self._loop, self._loop_thread_id
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            task = current_tasks.get(loop)
+            stack = _fold(frame)
+            self.stats["samples"] += 1
+            for profile in profiles:
+                if task is None:
+                    profile.add(stack, "idle")
+                elif task in profile.tasks:
+                    profile.add(stack, "request")
+                else:
+                    profile.add(stack, "other")
+
+    def _store(self, profile: RequestProfile) -> None:
+        text = profile.render()
+        self._recent[profile.profile_id] = text
+        while len(self._recent) > settings.PROFILE_KEEP:
+            self._recent.popitem(last=False)
+        if not settings.PROFILE_DIR:
+            return
+        try:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(settings.PROFILE_DIR, f"{profile.profile_id}.folded"), "w", encoding="utf-8") as file:
+                file.write(text)
+            self.stats["stored"] += 1
+        except OSError as e:
+            self.stats["errors"] += 1
+            logger.error(f"Could not store profile {profile.profile_id}: {e}")
+
+    def get(self, profile_id: str) -> Optional[str]:
+        """A kept profile, from this worker's memory or PROFILE_DIR"""
+        text = self._recent.get(profile_id)
+        if text is not None or not settings.PROFILE_DIR or os.path.basename(profile_id) != profile_id:
+            return text
+        try:
+            with open(os.path.join(settings.PROFILE_DIR, f"{profile_id}.folded"), "r", encoding="utf-8") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return profiler counters"""
+        return {**self.stats, "enabled": bool(settings.PROFILE_TOKEN), "active": len(self._active),
+                "kept": len(self._recent)}
+
+
+# Global instance
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,116 @@
+import logging
+from string import Formatter
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bound the number of distinct prefixes remembered per prompt kind
+_MAX_TRACKED_PREFIXES = 1024
+
+
+class PromptStats:
+    """Prefix-stability and token-usage counters per prompt kind"""
+
+    def __init__(self):
+        self._kinds: Dict[str, Dict[str, Any]] = {}
+        self._prefixes: Dict[str, Dict[int, int]] = {}
+
+    def _kind(self, kind: str) -> Dict[str, Any]:
+        stats = self._kinds.get(kind)
+        if stats is None:
+            stats = self._kinds[kind] = {
+                "prompts": 0, "prefix_reuses": 0, "prefix_chars": 0,
+                "llm_calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0
+            }
+            self._prefixes[kind] = {}
+        return stats
+
+    def record_prefix(self, kind: str, prefix: str) -> None:
+        """Count a rendered prompt and whether its static prefix was seen before"""
+        stats = self._kind(kind)
+        stats["prompts"] += 1
+        stats["prefix_chars"] += len(prefix)
+
+        seen = self._prefixes[kind]
+        key = hash(prefix)
+        if key in seen:
+            stats["prefix_reuses"] += 1
+            seen[key] += 1
+        elif len(seen) < _MAX_TRACKED_PREFIXES:
+            seen[key] = 1
+
+    def record_usage(self, kind: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> None:
+        """Accumulate token counts reported by the LLM"""
+        stats = self._kind(kind)
+        stats["llm_calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["cached_tokens"] += cached_tokens
+        stats["completion_tokens"] += completion_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return per-kind counters with derived ratios"""
+        result = {}
+        for kind, stats in self._kinds.items():
+            prompts = stats["prompts"]
+            result[kind] = {
+                **stats,
+                "distinct_prefixes": len(self._prefixes[kind]),
+                "prefix_reuse_ratio": round(stats["prefix_reuses"] / prompts, 4) if prompts else 0.0,
+                "avg_prefix_chars": stats["prefix_chars"] // prompts if prompts else 0,
+                "cached_token_ratio": (
+                    round(stats["cached_tokens"] / stats["prompt_tokens"], 4) if stats["prompt_tokens"] else 0.0
+                ),
+            }
+        return result
+
+
+class PromptLayout:
+    """
+    A prompt template split into a static leading prefix and a per-request tail.
+
+    Fields passed at construction are rendered once. The remaining fields are
+    filled per call, and `request_field` (the truly per-request content, e.g.
+    the user message) must be the template's last placeholder so everything
+    before it can be served from the upstream prompt cache.
+    """
+
+    def __init__(self, kind: str, template: str, request_field: str, **static_fields: str):
+        self.kind = kind
+        self.request_field = request_field
+
+        names = [name for _, name, _, _ in Formatter().parse(template) if name]
+        if not names or names[-1] != request_field:
+            raise ValueError(f"'{request_field}' must be the last placeholder of the {kind} prompt")
+
+        # Render static fields once; keep dynamic ones as markers to split on
+        markers = {name: f"\x00{name}\x00" for name in names if name not in static_fields}
+        rendered = template.format(**static_fields, **markers)
+
+        self._segments: List[Tuple[bool, str]] = []
+        rest = rendered
+        for name in [name for name in names if name in markers]:
+            head, _, rest = rest.partition(markers[name])
+            self._segments.append((False, head))
+            self._segments.append((True, name))
+        self._segments.append((False, rest))
+
+        self.static_prefix = self._segments[0][1]
+
+    def render(self, request_value: str, **fields: str) -> str:
+        """Render the prompt and record its prefix (everything before the per-request field)"""
+        parts = []
+        for is_field, value in self._segments:
+            if not is_field:
+                parts.append(value)
+            elif value == self.request_field:
+                prefix = "".join(parts)
+                parts = [prefix, request_value]
+            else:
+                parts.append(fields[value])
+
+        prompt_stats.record_prefix(self.kind, parts[0])
+        return "".join(parts)
+
+
+# Global instance
+prompt_stats = PromptStats()
@@ -1,15 +1,12 @@
+CHATBOT_SYSTEM_MESSAGE = "You are a helpful assistant that responds only in valid JSON format."
+
+# Prompts keep all static content in a byte-identical leading prefix and the
+# per-request content at the very end, so upstream prompt-prefix caching applies.
 CHATBOT_PROMPT = '''You are an expert intent and entity detection module service for a chatbot tasked with identification of information based on the customer messaged.
 This will be used in a customer care chatbot.
 
-Below is the intents and corresponding list of Entities per intent ( call it data-1) . Understand the meaning and context of information. 
-Keep in mind to understand the meaning and context of intent and entities
-{}
-
-Task : Analyze the below user message and identify the matching intent and entity values found in the below user message:
-User Input Message : {}
-
 Use the below json structure and signature to provide the output:
-{}
+{response_format}
 
 Methodology:
 We have two types of entities, one of Text type and one of type with categorical options. Infer the understanding corresponding to the 
@@ -21,19 +18,80 @@ If the information is not there, set the parameter as null . But make sure to ha
 
 Go through the process, make sure to be correct and right about the identification of intent and entities and share the response finally a json format only
 Final Output Format: Json
+
+Below is the intents and corresponding list of Entities per intent ( call it data-1) . Understand the meaning and context of information. 
+Keep in mind to understand the meaning and context of intent and entities
+{intents_data}
+
+Task : Analyze the below user message and identify the matching intent and entity values found in the below user message:
+User Input Message : {user_message}
 '''
 
 
-FEEDBACK_PROMPT='''You are an expert sentiment analysis system for customer feedback. 
+# Same task with a compact output: only the intentId and an entity id -> value map. Labels, types and
+# options are filled in from the catalog by the service, so the model does not echo them back.
+CHATBOT_COMPACT_PROMPT = '''You are an expert intent and entity detection module service for a chatbot tasked with identification of information based on the customer messaged.
+This will be used in a customer care chatbot.
+
+Use the below json structure to provide the output:
+{response_format}
+
+Methodology:
+1. Identify the matching intent in data-1 and set "intentId" to its intentId, or null if no intent matches.
+2. In "entities", map the id of every entity of the matched intent to its value:
+for "type"="OPTION" entities exactly one of the entity's "options", for other entities the information from the user message.
+Set the value to null for entities the user message gives no information for.
+3. Do not repeat intent names, entity labels, types or options, and do not invent intent or entity ids.
+
+Go through the process, make sure to be correct and right about the identification of intent and entities and share the response finally a json format only
+Final Output Format: Json
+
+Below is the intents and corresponding list of Entities per intent ( call it data-1) . Understand the meaning and context of information. 
+Keep in mind to understand the meaning and context of intent and entities
+{intents_data}
+
+Task : Analyze the below user message and identify the matching intent and entity values found in the below user message:
+User Input Message : {user_message}
+'''
+
+# Appended to the original prompt (after the per-request content, so the cached prefix still applies)
+# when the reply could not be used at all
+REASK_PROMPT = '''
+Your previous reply could not be used: {problem}
+Reply again for the same user message with only the JSON object in the response structure given above.
+'''
+
+SLOT_FILLING_PROMPT = '''You are an expert entity extraction module service for a customer care chatbot.
+The conversation is already in progress for the active intent given below, and the customer is replying to a follow-up question.
+
+Task : Extract values for the listed entities from the user message, and detect whether the customer has switched to a different topic.
 
-Task: Analyze the customer feedback message below and provide sentiment analysis, translation (if needed), and keyword extraction.
+Use the below json structure to provide the output:
+{{"intent_switch": false, "entities": {{"<entity id>": "extracted_value_or_null"}}}}
 
-Customer Feedback Message: {}
-Target Language Code: {}
+Methodology:
+1. For "type"="OPTION" entities, set the value to exactly one of the entity's "options" that matches the meaning of the user message, or null.
+2. For "type"="TEXT_INPUT" entities, set the value to the information given in the user message, or null.
+3. Include every listed entity id in "entities"; if the information is not there, set it to null. Do not invent entity ids.
+4. Set "intent_switch" to true only if the message is clearly about something unrelated to the active intent, and then set every entity to null.
+
+Share the response as json format only
+Final Output Format: Json
+
+Active Intent : {intent_name}
+Entities to fill (data-1) :
+{entities}
+
+User Input Message : {user_message}
+'''
+
+FEEDBACK_PROMPT='''You are an expert sentiment analysis system for customer feedback. 
+
+Task: Analyze the customer feedback message given at the end and provide sentiment analysis, translation (if needed), and keyword extraction.
 
 Instructions:
 1. Determine the sentiment of the feedback (positive, negative, or neutral)
-2. If the feedback is not in the target language ({}), translate it to that language. If it's already in the target language, keep it as is.
+2. If the feedback is not in the target language (given by the Target Language Code below), translate it to that language. If it's already in the target language, keep it as is.
 3. Extract 3-5 relevant keywords that capture the essence of the feedback (focus on key issues, emotions, or topics mentioned)
 
 Response Format (JSON only):
@@ -49,4 +107,99 @@ Guidelines:
 - Keywords should be lowercase, relevant terms that help categorize the feedback
 - Focus on extracting keywords related to: service quality, agent behavior, product issues, emotions, specific problems mentioned
 
-Provide only the JSON response with no additional text.'''
+Provide only the JSON response with no additional text.
+
+Target Language Code: {target_language_code}
+Customer Feedback Message: {feedback_message}
+'''
+
+
+FEEDBACK_BATCH_PROMPT='''You are an expert sentiment analysis system for customer feedback.
+
+Task: Analyze each customer feedback item given at the end independently and provide sentiment analysis, translation (if needed), and keyword extraction for each one.
+
+Instructions (apply to every item on its own; never mix content between items):
+1. Determine the sentiment of the feedback (positive, negative, or neutral)
+2. If the feedback is not in the item's target language, translate it to that language. If it's already in the target language, keep it as is.
+3. Extract 3-5 relevant keywords that capture the essence of the feedback (focus on key issues, emotions, or topics mentioned)
+
+Response Format (JSON only), with exactly one entry per input item and the same "id":
+{{
+    "results": [
+        {{
+            "id": 0,
+            "sentiment": "positive|negative|neutral",
+            "translation": "translated_or_original_message_here",
+            "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+        }}
+    ]
+}}
+
+Guidelines:
+- Sentiment should be "positive" for satisfied customers, "negative" for dissatisfied customers, "neutral" for mixed or factual feedback
+- Translation should be natural and maintain the original meaning and tone
+- Keywords should be lowercase, relevant terms that help categorize the feedback
+- Focus on extracting keywords related to: service quality, agent behavior, product issues, emotions, specific problems mentioned
+
+Provide only the JSON response with no additional text.
+
+Feedback Items (JSON array, each with an "id", the feedback "text" and its "target_language_code"):
+{feedback_items}
+'''
+
+
+# Used when the feedback is already in the target language: no translation is asked for
+FEEDBACK_SENTIMENT_PROMPT='''You are an expert sentiment analysis system for customer feedback.
+
+Task: Analyze the customer feedback message given at the end and provide sentiment analysis and keyword extraction.
+
+Instructions:
+1. Determine the sentiment of the feedback (positive, negative, or neutral)
+2. Extract 3-5 relevant keywords that capture the essence of the feedback (focus on key issues, emotions, or topics mentioned)
+
+Response Format (JSON only):
+{{
+    "sentiment": "positive|negative|neutral",
+    "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+}}
+
+Guidelines:
+- Sentiment should be "positive" for satisfied customers, "negative" for dissatisfied customers, "neutral" for mixed or factual feedback
+- Keywords should be lowercase, relevant terms in the language of the feedback that help categorize it
+- Focus on extracting keywords related to: service quality, agent behavior, product issues, emotions, specific problems mentioned
+
+Provide only the JSON response with no additional text.
+
+Customer Feedback Message: {feedback_message}
+'''
+
+
+FEEDBACK_BATCH_SENTIMENT_PROMPT='''You are an expert sentiment analysis system for customer feedback.
+
+Task: Analyze each customer feedback item given at the end independently and provide sentiment analysis and keyword extraction for each one.
+
+Instructions (apply to every item on its own; never mix content between items):
+1. Determine the sentiment of the feedback (positive, negative, or neutral)
+2. Extract 3-5 relevant keywords that capture the essence of the feedback (focus on key issues, emotions, or topics mentioned)
+
+Response Format (JSON only), with exactly one entry per input item and the same "id":
+{{
+    "results": [
+        {{
+            "id": 0,
+            "sentiment": "positive|negative|neutral",
+            "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+        }}
+    ]
+}}
+
+Guidelines:
+- Sentiment should be "positive" for satisfied customers, "negative" for dissatisfied customers, "neutral" for mixed or factual feedback
+- Keywords should be lowercase, relevant terms in the language of the feedback that help categorize it
+- Focus on extracting keywords related to: service quality, agent behavior, product issues, emotions, specific problems mentioned
+
+Provide only the JSON response with no additional text.
+
+Feedback Items (JSON array, each with an "id" and the feedback "text"):
+{feedback_items}
+'''
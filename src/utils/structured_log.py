@@ -0,0 +1,220 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
+from src.config.settings import settings
+
+# Correlation id of the request being handled, attached to every log record
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Phone numbers (7+ digits, optionally with +, spaces, dashes or brackets) and e-mail addresses
+_PHONE_RE = re.compile(r"(?<![\w.:])\+?\d[\d\s\-()]{5,}\d(?![\w.:])")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_dropped = 0
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def set_request_id(request_id: str) -> Token:
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: Token) -> None:
+    _request_id.reset(token)
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def _parse_sample_rates(raw: str) -> Dict[str, float]:
+    """"intent.request=0.1,llm.response=0.01" -> {"intent.request": 0.1, "llm.response": 0.01}"""
+    rates = {}
+    for item in (raw or "").split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            try:
+                rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+            except ValueError:
+                continue
+    return rates
+
+
+_sample_rates = _parse_sample_rates(settings.LOG_SAMPLE_RATES)
+
+
+def redact(text: str) -> str:
+    """Mask phone numbers and e-mail addresses"""
+    if not settings.LOG_REDACT_PII:
+        return text
+    return _PHONE_RE.sub(_mask_phone, _EMAIL_RE.sub("[EMAIL]", text))
+
+
+def _mask_phone(match: "re.Match[str]") -> str:
+    candidate = match.group()
+    if sum(c.isdigit() for c in candidate) < 7 or _DATE_RE.fullmatch(candidate.strip()):
+        return candidate
+    return "[PHONE]"
+
+
+def truncate(text: str, limit: Optional[int] = None) -> str:
+    limit = settings.LOG_MAX_FIELD_CHARS if limit is None else limit
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+def _clean(value: Any) -> Any:
+    """Redact and truncate string values, recursing into containers"""
+    if isinstance(value, str):
+        return truncate(redact(value))
+    if isinstance(value, dict):
+        return {key: _clean(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(item) for item in value]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return truncate(redact(str(value)))
+
+
+def log_event(logger: logging.Logger, event: str, message: str = "", level: int = logging.INFO, **fields: Any) -> None:
+    """
+    Log a named event with structured fields. Events below WARNING are sampled
+    at the rate configured for the event in LOG_SAMPLE_RATES (default: all).
+    Redaction and truncation happen on the background writer, not here.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING:
+        rate = _sample_rates.get(event, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return
+    logger.log(level, message or event, extra={"event": event, "fields": fields})
+
+
+class _ContextFilter(logging.Filter):
+    """Stamp records with the request's correlation id on the calling thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never block the event loop: when the writer falls behind, drop the record"""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Redaction and formatting run on the writer thread; only interpolate the arguments
+        # and render the traceback here, while they still hold their current values
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with PII redacted and long values truncated"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "request_id": getattr(record, "request_id", None),
+            "message": truncate(redact(record.getMessage()), settings.LOG_MAX_MESSAGE_CHARS),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(_clean(fields))
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in entry and key not in ("fields", "event", "request_id"):
+                entry[key] = _clean(value)
+        if record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Classic single-line format with the same redaction and truncation"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [f"{record.levelname}:{record.name}"]
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            parts.append(f"[{request_id}]")
+        parts.append(truncate(redact(record.getMessage()), settings.LOG_MAX_MESSAGE_CHARS))
+        fields = getattr(record, "fields", None)
+        if fields:
+            parts.append(" ".join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}"
+                                  for key, value in _clean(fields).items()))
+        line = " ".join(parts)
+        if record.exc_text:
+            line = f"{line}\n{redact(record.exc_text)}"
+        return line
+
+
+def configure_logging() -> None:
+    """Route all logging through a bounded queue to a background writer thread"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = _DroppingQueueHandler(log_queue)
+    handler.addFilter(_ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, settings.LOG_LEVEL))
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_stats() -> Dict[str, Any]:
+    """Return logging pipeline counters"""
+    return {
+        "dropped": _dropped,
+        "queued": _listener.queue.qsize() if _listener is not None else 0,
+        "format": settings.LOG_FORMAT,
+        "sample_rates": _sample_rates,
+    }
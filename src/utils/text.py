@@ -0,0 +1,11 @@
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a user message for cache keying (case, unicode form, whitespace, edge punctuation)"""
+    text = unicodedata.normalize("NFKC", message or "").lower()
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip(" .,!?;:'\"")
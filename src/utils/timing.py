@@ -0,0 +1,77 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, List, Optional
+
+from src.utils.profiler import register_task
+
+# Span durations of the current request; None outside a timed request (spans are then no-ops)
+_timings: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Per-stage wall time of one request, summed per span name (shared with the tasks it spawns)"""
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one metric per span (ms, with the count when repeated) plus the total"""
+        parts = []
+        for name, (seconds, count) in self.spans.items():
+            metric = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                metric += f';desc="x{int(count)}"'
+            parts.append(metric)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_timings() -> Token:
+    """Start collecting spans for the current request"""
+    return _timings.set(RequestTimings())
+
+
+def reset_timings(token: Token) -> None:
+    _timings.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _timings.get()
+
+
+def clear_timings() -> None:
+    """Stop recording spans in the current context (e.g. a task shared by several requests)"""
+    _timings.set(None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a stage of the current request; nearly free when no request is being timed"""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    register_task()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add an already measured stage (e.g. a queue wait) to the current request's spans"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
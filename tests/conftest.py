@@ -0,0 +1,53 @@
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Callable, List, Optional, Union
+
+# Settings are read at import time: keep the services local and quiet under test
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("FEEDBACK_CACHE_ENABLED", "false")
+os.environ.setdefault("SESSION_STORE_ENABLED", "false")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+os.environ.setdefault("OPTION_FAST_PATH_MODE", "off")
+
+import pytest
+
+from src.services.llm_backends import LLMBackend, LLMResult
+from src.services.llm_service import llm_service
+
+Reply = Union[str, dict, list, Callable[[str], Any]]
+
+
+class FakeBackend(LLMBackend):
+    """Scripted LLM backend: replies are returned in order (the last one repeats)"""
+
+    name = "fake"
+
+    def __init__(self, replies: Optional[List[Reply]] = None, delay: float = 0.0):
+        self.replies = list(replies or [{}])
+        self.delay = delay
+        self.prompts: List[str] = []
+
+    async def complete(self, system_message: Optional[str], prompt: str, model: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> LLMResult:
+        self.prompts.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if callable(reply):
+            reply = reply(prompt)
+        return LLMResult(reply if isinstance(reply, str) else json.dumps(reply))
+
+    async def stream(self, system_message: Optional[str], prompt: str) -> AsyncIterator[LLMResult]:
+        yield await self.complete(system_message, prompt)
+
+
+@pytest.fixture
+def fake_backend():
+    """A FakeBackend installed as the global LLM service's backend for the test"""
+    backend = FakeBackend()
+    previous = llm_service._backend
+    llm_service.backend = backend
+    yield backend
+    llm_service.backend = previous
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from src.services.admission import AdmissionGate, LLMOverloadedError
+from src.utils.deadline import DeadlineExceededError, set_deadline
+
+
+async def _hold(gate: AdmissionGate, seconds: float) -> None:
+    async with gate.slot():
+        await asyncio.sleep(seconds)
+
+
+def test_full_queue_is_shed_at_once():
+    gate = AdmissionGate(1, 1, 5.0)
+
+    async def main():
+        holder = asyncio.ensure_future(_hold(gate, 0.05))
+        queued = asyncio.ensure_future(_hold(gate, 0))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloadedError):
+            await _hold(gate, 0)
+        await asyncio.gather(holder, queued)
+
+    asyncio.run(main())
+    assert gate.stats["shed_queue_full"] == 1
+    assert gate.get_stats()["active"] == 0
+
+
+def test_waiter_is_shed_after_the_queue_timeout():
+    gate = AdmissionGate(1, 10, 0.02)
+
+    async def main():
+        holder = asyncio.ensure_future(_hold(gate, 0.1))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloadedError):
+            await _hold(gate, 0)
+        await holder
+
+    asyncio.run(main())
+    assert gate.stats["shed_timeout"] == 1
+    assert gate.queue_depth == 0
+
+
+def test_short_deadline_fails_as_deadline_rather_than_overload():
+    gate = AdmissionGate(1, 10, 5.0)
+
+    async def main():
+        holder = asyncio.ensure_future(_hold(gate, 0.1))
+        await asyncio.sleep(0)
+        set_deadline(0.02)
+        with pytest.raises(DeadlineExceededError):
+            await _hold(gate, 0)
+        await holder
+
+    asyncio.run(main())
+    assert gate.stats["shed_timeout"] == 0
+
+
+def test_released_slot_goes_to_the_next_waiter_in_order():
+    gate = AdmissionGate(1, 10, 5.0)
+    order = []
+
+    async def call(name: str):
+        async with gate.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(call(name) for name in "abc"))
+
+    asyncio.run(main())
+    assert order == ["a", "b", "c"]
+    assert gate.stats["queued"] == 2
+    assert gate.get_stats()["active"] == 0
@@ -0,0 +1,46 @@
+import asyncio
+import shutil
+
+import pytest
+
+from src.config.settings import settings
+from src.data.catalogs import CatalogRegistry
+from src.data.loader import data_loader
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """A registry serving one tenant catalog, 'acme', copied from the default intents file"""
+    shutil.copy(settings.INTENTS_DATA_PATH, tmp_path / "acme.json")
+    monkeypatch.setattr(settings, "CATALOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "CATALOG_SHARED_DIR", "")
+    return CatalogRegistry(data_loader)
+
+
+def test_reload_of_a_catalog_being_loaded_shares_the_load(registry):
+    async def main():
+        return await asyncio.gather(registry.get_snapshot("acme"), registry.reload("acme"))
+
+    loaded, reloaded = asyncio.run(main())
+
+    assert registry.stats["loads"] == 1
+    assert registry.get_stats()["resident"] == 1
+    assert loaded.version == reloaded.version
+
+
+def test_reload_loads_a_catalog_that_is_not_resident(registry):
+    snapshot = asyncio.run(registry.reload("acme"))
+
+    assert registry.versions()["acme"] == snapshot.version
+    assert registry.stats["loads"] == 1
+
+
+def test_workers_lists_this_workers_versions(registry):
+    async def main():
+        await registry.get_snapshot("acme")
+        return await registry.get_workers()
+
+    workers = asyncio.run(main())
+
+    assert workers["shared"] is False
+    assert set(workers["workers"][0]["catalogs"]) == {"default", "acme"}
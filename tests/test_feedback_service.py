@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from src.config.settings import settings
+from src.services import feedback_service as feedback_module
+from src.services.feedback_service import feedback_service
+from src.services.feedback_store import FeedbackStore
+
+ITEMS = [
+    ("the service was very bad and slow", "fr"),
+    ("I am not happy with the network at all", "fr"),
+    ("La red no funciona y el servicio es muy malo", "fr"),
+    ("great support from the agent, thanks", "fr"),
+]
+
+
+def _drop_item(missing_id: int):
+    """Answer packed prompts for every item but one; answer single prompts normally"""
+    def reply(prompt: str):
+        if '"results"' not in prompt:
+            return {"sentiment": "negative", "translation": "SINGLE", "keywords": ["k"]}
+        packed = json.loads(prompt[prompt.rindex("\n[") + 1:])
+        return {"results": [
+            {"id": item["id"], "sentiment": "negative", "translation": "PACKED", "keywords": ["k"]}
+            for item in packed if item["id"] != missing_id
+        ]}
+    return reply
+
+
+def test_batch_retries_only_the_item_the_packed_call_left_out(fake_backend):
+    fake_backend.replies = [_drop_item(missing_id=2)]
+
+    results = asyncio.run(feedback_service.analyze_feedback_batch(ITEMS))
+
+    assert len(results) == len(ITEMS)
+    assert all(result["status"] != "Error" for result in results)
+    translations = [result["result"][0]["translation"] for result in results]
+    assert translations == ["PACKED", "PACKED", "SINGLE", "PACKED"]
+    # One packed call, then exactly one single call for the missing item
+    assert len(fake_backend.prompts) == 2
+    assert ITEMS[2][0] in fake_backend.prompts[1]
+    assert '"results"' not in fake_backend.prompts[1]
+
+
+def test_batch_retries_every_item_when_the_packed_reply_is_unusable(fake_backend):
+    def reply(prompt: str):
+        if '"results"' in prompt:
+            return "not json"
+        return {"sentiment": "positive", "translation": "SINGLE", "keywords": []}
+    fake_backend.replies = [reply]
+
+    results = asyncio.run(feedback_service.analyze_feedback_batch(ITEMS))
+
+    assert [result["result"][0]["translation"] for result in results] == ["SINGLE"] * len(ITEMS)
+    assert sum('"results"' not in prompt for prompt in fake_backend.prompts) == len(ITEMS)
+
+
+@pytest.fixture
+def feedback_cache(tmp_path, monkeypatch):
+    """A fresh, enabled feedback store for the test"""
+    monkeypatch.setattr(settings, "FEEDBACK_CACHE_ENABLED", True)
+    monkeypatch.setattr(feedback_module, "feedback_store", FeedbackStore(str(tmp_path / "feedback.sqlite3"), 100, 10))
+
+
+def test_cached_same_language_result_translates_to_each_messages_own_text(fake_backend, feedback_cache):
+    fake_backend.replies = [{"sentiment": "negative", "keywords": ["rude"]}]
+
+    async def main():
+        first = await feedback_service.analyze_feedback("The agent was RUDE and very slow today!!", "en")
+        second = await feedback_service.analyze_feedback("the agent was rude and very slow today", "en")
+        batch = await feedback_service.analyze_feedback_batch([("THE AGENT WAS RUDE AND VERY SLOW TODAY", "en")])
+        return first, second, batch[0]
+
+    first, second, batched = asyncio.run(main())
+
+    assert len(fake_backend.prompts) == 1
+    assert first["result"][0]["translation"] == "The agent was RUDE and very slow today!!"
+    assert second["result"][0]["translation"] == "the agent was rude and very slow today"
+    assert batched["result"][0]["translation"] == "THE AGENT WAS RUDE AND VERY SLOW TODAY"
+    assert second["result"][0]["sentiment"] == "negative"
+
+
+def test_batch_duplicates_in_the_same_language_keep_their_own_text(fake_backend):
+    def reply(prompt: str):
+        packed = json.loads(prompt[prompt.rindex("\n[") + 1:])
+        return {"results": [{"id": item["id"], "sentiment": "positive", "keywords": []} for item in packed]}
+    fake_backend.replies = [reply]
+    items = [
+        ("The support team solved my problem very quickly!", "en"),
+        ("the support team solved my problem very quickly", "en"),
+        ("Thanks, the new router works much better than the old one", "en"),
+    ]
+
+    results = asyncio.run(feedback_service.analyze_feedback_batch(items))
+
+    assert [result["result"][0]["translation"] for result in results] == [text for text, _ in items]
@@ -0,0 +1,20 @@
+from src.config.settings import settings
+from src.services.feedback_store import _prompt_version
+
+
+def test_prompt_version_changes_with_the_cascade_fast_model(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CASCADE_ENABLED", True)
+    before = _prompt_version()
+
+    monkeypatch.setattr(settings, "LLM_CASCADE_FAST_MODEL", "another-fast-model")
+
+    assert _prompt_version() != before
+
+
+def test_prompt_version_ignores_the_fast_model_without_the_cascade(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CASCADE_ENABLED", False)
+    before = _prompt_version()
+
+    monkeypatch.setattr(settings, "LLM_CASCADE_FAST_MODEL", "another-fast-model")
+
+    assert _prompt_version() == before
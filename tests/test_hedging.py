@@ -0,0 +1,66 @@
+import asyncio
+
+from src.config.settings import settings
+from src.services.admission import AdmissionGate
+from src.services.hedging import HedgePolicy
+from src.services.llm_backends import LLMResult
+from src.services.llm_service import LLMService
+from tests.conftest import FakeBackend
+
+
+def test_no_delay_until_enough_samples():
+    policy = HedgePolicy(0.9, 100, 3, 0.1)
+    policy.record_latency(1.0)
+
+    assert policy.delay() is None
+
+
+def test_delay_is_the_latency_percentile():
+    policy = HedgePolicy(0.9, 100, 10, 0.1)
+    for latency in range(1, 11):
+        policy.record_latency(latency / 10)
+
+    assert policy.delay() == 0.9
+
+
+def test_hedges_are_capped_at_the_max_rate():
+    policy = HedgePolicy(0.9, 100, 1, 0.25)
+    allowed = 0
+    for _ in range(20):
+        policy.start_call()
+        if policy.allow_hedge():
+            policy.record_hedge()
+            allowed += 1
+
+    assert allowed <= 0.25 * (20 + allowed)
+    assert policy.stats["rate_limited"] == 20 - allowed
+
+
+class SlowFirstBackend(FakeBackend):
+    """The first call hangs, later ones answer at once"""
+
+    async def complete(self, system_message, prompt, model=None, max_tokens=None) -> LLMResult:
+        calls = len(self.prompts)
+        self.prompts.append(prompt)
+        await asyncio.sleep(5 if calls == 0 else 0)
+        return LLMResult('{"from": %d}' % calls)
+
+
+def test_hedge_answers_when_the_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    service = LLMService()
+    service.backend = SlowFirstBackend()
+    service.admission = AdmissionGate(2, 10, 5.0)
+    for _ in range(settings.LLM_HEDGE_MIN_SAMPLES):
+        service.hedging.record_latency(0.01)
+    service.hedging.max_rate = 1.0
+
+    async def main():
+        result = await asyncio.wait_for(service.get_completion("prompt", "system"), 1)
+        # The losing primary is cancelled and gives its slot back
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == {"from": 1}
+    assert service.hedging.stats["hedge_wins"] == 1
+    assert service.admission.get_stats()["active"] == 0
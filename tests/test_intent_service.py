@@ -0,0 +1,52 @@
+import asyncio
+
+from src.config.settings import settings
+from src.data.loader import data_loader
+from src.services.intent_service import intent_service
+
+INTENT_ID = "SlowBrowingWK_V1"
+
+
+def test_non_object_reply_is_reasked_instead_of_failing(fake_backend):
+    fake_backend.replies = [[{"intentId": INTENT_ID}], {"intentId": INTENT_ID, "entities": {}}]
+
+    response = asyncio.run(intent_service.process_message("my internet is very slow", snapshot=data_loader.get_snapshot()))
+
+    assert response["status"] == "Success"
+    assert response["result"][0]["intentId"] == INTENT_ID
+    assert len(fake_backend.prompts) == 2
+
+
+def test_non_object_slot_filling_reply_falls_back_to_full_classification(fake_backend):
+    fake_backend.replies = [["not", "an", "object"], {"intentId": INTENT_ID, "entities": {}}]
+
+    response = asyncio.run(intent_service.process_message(
+        "it does not load at all", active_intent_id=INTENT_ID, snapshot=data_loader.get_snapshot()
+    ))
+
+    assert response["status"] == "Success"
+    assert len(fake_backend.prompts) == 2
+
+
+def test_reply_to_the_pending_option_is_served_locally(fake_backend, monkeypatch):
+    monkeypatch.setattr(settings, "OPTION_FAST_PATH_MODE", "on")
+
+    response = asyncio.run(intent_service.process_message(
+        "it is very slow", active_intent_id=INTENT_ID, snapshot=data_loader.get_snapshot()
+    ))
+
+    assert fake_backend.prompts == []
+    entities = {entity["id"]: entity["user_input"] for entity in response["result"][0]["entity"]}
+    assert entities["is_slow_or_no_browsing"] == "SLOW_BROWSING"
+
+
+def test_generic_reply_to_another_question_goes_to_the_llm(fake_backend, monkeypatch):
+    monkeypatch.setattr(settings, "OPTION_FAST_PATH_MODE", "on")
+    fake_backend.replies = [{"intentId": INTENT_ID, "entities": {}}]
+
+    response = asyncio.run(intent_service.process_message(
+        "leave it", active_intent_id=INTENT_ID, snapshot=data_loader.get_snapshot()
+    ))
+
+    assert len(fake_backend.prompts) == 1
+    assert all(entity["user_input"] != "DO_NOTHING" for entity in response["result"][0]["entity"])
@@ -0,0 +1,22 @@
+from src.utils.language import count_tokens, detect_language
+
+
+def test_sentiment_words_are_no_evidence_of_a_language():
+    _, confidence = detect_language("very good service")
+    assert confidence < 0.8
+
+
+def test_function_words_identify_longer_text():
+    assert detect_language("The agent was very rude and the internet is not working")[0] == "en"
+
+
+def test_kanji_only_text_is_not_confidently_chinese():
+    language, confidence = detect_language("東京駅周辺電波状況不良")
+    assert language == "zh" and confidence < 0.8
+    assert detect_language("ネットが遅いです")[0] == "ja"
+    assert detect_language("我的网络很慢，一直断线") == ("zh", 1.0)
+
+
+def test_unspaced_scripts_count_two_characters_per_token():
+    assert count_tokens("very good service") == 3
+    assert count_tokens("服务很差") == 2
@@ -0,0 +1,16 @@
+import pytest
+
+from src.services.llm_backends import HTTPBackend, LLMBackend, create_backend
+
+
+def test_backend_missing_a_method_fails_when_created():
+    class CompleteOnly(LLMBackend):
+        async def complete(self, system_message, prompt, model=None, max_tokens=None):
+            return None
+
+    with pytest.raises(TypeError):
+        CompleteOnly()
+
+
+def test_backend_is_selected_by_name():
+    assert isinstance(create_backend("http"), HTTPBackend)
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from src.config.settings import settings
+from src.services.admission import AdmissionGate
+from src.services.llm_service import LLMService
+from src.utils.deadline import DeadlineExceededError, remaining, set_deadline
+from tests.conftest import FakeBackend
+
+
+def _service(backend: FakeBackend) -> LLMService:
+    service = LLMService()
+    service.backend = backend
+    return service
+
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    backend = FakeBackend([{"items": [1]}], delay=0.05)
+    service = _service(backend)
+
+    async def main():
+        return await asyncio.gather(*(service.get_completion("same prompt", "system") for _ in range(3)))
+
+    results = asyncio.run(main())
+    results[0]["items"].append(2)
+
+    assert len(backend.prompts) == 1
+    assert service.stats["coalesced"] == 2
+    # Every caller gets its own copy to mutate
+    assert results[1] == {"items": [1]}
+
+
+def test_different_calls_are_not_shared():
+    backend = FakeBackend([{"ok": True}], delay=0.01)
+    service = _service(backend)
+
+    async def main():
+        return await asyncio.gather(service.get_completion("one", "system"), service.get_completion("two", "system"))
+
+    asyncio.run(main())
+    assert len(backend.prompts) == 2
+    assert service.get_stats()["in_flight"] == 0
+
+
+def test_shared_call_enforces_each_callers_own_deadline():
+    backend = FakeBackend([{"ok": True}], delay=0.2)
+    service = _service(backend)
+
+    async def call(budget: float):
+        set_deadline(budget)
+        return await service.get_completion("same prompt", "system")
+
+    async def main():
+        return await asyncio.gather(call(0.05), call(30), return_exceptions=True)
+
+    short, long = asyncio.run(main())
+    assert isinstance(short, DeadlineExceededError)
+    assert long == {"ok": True}
+    assert len(backend.prompts) == 1
+
+
+def test_shared_call_outlives_the_first_callers_deadline():
+    backend = FakeBackend([{"ok": True}], delay=0.1)
+    service = _service(backend)
+
+    async def main():
+        async def first():
+            set_deadline(0.02)
+            await service.get_completion("same prompt", "system")
+
+        first_task = asyncio.ensure_future(first())
+        await asyncio.sleep(0)
+        second = await service.get_completion("same prompt", "system")
+        with pytest.raises(DeadlineExceededError):
+            await first_task
+        return second
+
+    assert asyncio.run(main()) == {"ok": True}
+    assert service.stats["coalesced"] == 1
+
+
+def test_shared_call_runs_under_its_waiters_deadline():
+    budgets = []
+
+    def reply(prompt: str):
+        budgets.append(remaining())
+        return {"ok": True}
+
+    service = _service(FakeBackend([reply]))
+
+    async def main():
+        set_deadline(5)
+        return await service.get_completion("prompt", "system")
+
+    assert asyncio.run(main()) == {"ok": True}
+    assert budgets[0] is not None and 0 < budgets[0] <= 5
+
+
+def test_shared_call_is_cancelled_when_its_last_waiter_leaves():
+    backend = FakeBackend([{"ok": True}], delay=5)
+    service = _service(backend)
+
+    async def main():
+        set_deadline(0.05)
+        with pytest.raises(DeadlineExceededError):
+            await service.get_completion("prompt", "system")
+        await asyncio.sleep(0.01)
+        return service.get_stats()
+
+    stats = asyncio.run(main())
+    assert stats["in_flight"] == 0
+    assert stats["admission"]["active"] == 0
+
+
+def _hedging_service(backend: FakeBackend, monkeypatch, max_concurrency: int) -> LLMService:
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    service = _service(backend)
+    service.admission = AdmissionGate(max_concurrency, 10, 5.0)
+    for _ in range(settings.LLM_HEDGE_MIN_SAMPLES):
+        service.hedging.record_latency(0.01)
+    service.hedging.max_rate = 1.0
+    return service
+
+
+def test_hedge_is_skipped_without_a_free_admission_slot(monkeypatch):
+    backend = FakeBackend([{"ok": True}], delay=0.1)
+    service = _hedging_service(backend, monkeypatch, max_concurrency=1)
+
+    assert asyncio.run(service.get_completion("prompt", "system")) == {"ok": True}
+    assert len(backend.prompts) == 1
+    assert service.hedging.stats["no_slot"] == 1
+    assert service.admission.get_stats()["active"] == 0
+
+
+def test_hedge_takes_and_returns_its_own_slot(monkeypatch):
+    backend = FakeBackend([{"ok": True}], delay=0.1)
+    service = _hedging_service(backend, monkeypatch, max_concurrency=2)
+
+    assert asyncio.run(service.get_completion("prompt", "system")) == {"ok": True}
+    assert len(backend.prompts) == 2
+    assert service.hedging.stats["hedged"] == 1
+    assert service.admission.get_stats()["active"] == 0
+    # Only the primary call's latency is sampled, never one below the hedge delay
+    assert service.hedging.get_stats()["samples"] == settings.LLM_HEDGE_MIN_SAMPLES + 1
+    assert service.hedging.delay() >= 0.01
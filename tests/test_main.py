@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from src import main
+from src.config.settings import settings
+from src.services import llm_service as llm_module
+from src.services.llm_service import llm_service
+from src.utils.structured_log import get_request_id
+from tests.conftest import FakeBackend
+
+
+def test_lifespan_builds_the_llm_backend_off_the_event_loop(monkeypatch):
+    built_on = []
+
+    def create_backend(name: str) -> FakeBackend:
+        built_on.append(threading.current_thread())
+        return FakeBackend()
+
+    monkeypatch.setattr(llm_module, "create_backend", create_backend)
+    monkeypatch.setattr(llm_service, "_backend", None)
+
+    async def start():
+        async with main.lifespan(main.app):
+            return llm_service._backend
+
+    backend = asyncio.run(start())
+
+    assert isinstance(backend, FakeBackend)
+    assert built_on and built_on[0] is not threading.main_thread()
+
+
+def test_middleware_logs_carry_the_request_id(monkeypatch):
+    seen = []
+
+    class Logger:
+        def warning(self, message):
+            seen.append(get_request_id())
+
+    monkeypatch.setattr(main, "logger", Logger())
+    client = TestClient(main.app)
+
+    response = client.get("/health", headers={"X-Request-ID": "req-1", settings.REQUEST_DEADLINE_HEADER: "soon"})
+
+    assert response.headers["X-Request-ID"] == "req-1"
+    assert seen == ["req-1"]
@@ -0,0 +1,51 @@
+from src.data.loader import data_loader
+from src.services.option_matcher import OptionMatcher
+
+INTENT_ID = "SlowBrowingWK_V1"
+# Answers to the questions asked before "turn the data manager off or do nothing?"
+BEFORE_DATA_MANAGER_CHOICE = {
+    "is_slow_or_no_browsing": "SLOW_BROWSING",
+    "AskCustomerToTurnOffDataManager_copy1v": "TURN_ON_DATA_MANAGER",
+    "Is3G_4G_LTE_Available_1_copy1v": "NETWORK_VISIBLE",
+}
+
+
+def _values(response):
+    return {entity["id"]: entity["user_input"] for entity in response["result"][0]["entity"] if entity["user_input"]}
+
+
+def test_generic_reply_resolves_nothing_without_a_pending_question():
+    matcher = OptionMatcher()
+
+    for message in ("leave it", "turn it off"):
+        assert matcher.match(message, data_loader.get_snapshot()) == (None, 0.0)
+
+
+def test_generic_reply_fills_the_option_being_asked_about():
+    response, confidence = OptionMatcher().match(
+        "leave it", data_loader.get_snapshot(), INTENT_ID, BEFORE_DATA_MANAGER_CHOICE
+    )
+
+    assert confidence == 1.0
+    assert _values(response) == {**BEFORE_DATA_MANAGER_CHOICE, "turn_on_off_data_manager": "DO_NOTHING"}
+    assert response["result"][0]["previous_intentId"] == INTENT_ID
+
+
+def test_generic_reply_does_not_answer_another_question():
+    response, confidence = OptionMatcher().match("leave it", data_loader.get_snapshot(), INTENT_ID, {})
+
+    assert response is None and confidence == 0.0
+
+
+def test_message_naming_the_intent_fills_its_first_question():
+    response, confidence = OptionMatcher().match("my internet is very slow", data_loader.get_snapshot())
+
+    assert confidence >= 0.85
+    assert response["result"][0]["intentId"] == INTENT_ID
+    assert _values(response) == {"is_slow_or_no_browsing": "SLOW_BROWSING"}
+
+
+def test_negated_option_is_left_to_the_llm():
+    response, confidence = OptionMatcher().match("internet is not slow", data_loader.get_snapshot())
+
+    assert confidence == 0.0
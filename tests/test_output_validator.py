@@ -0,0 +1,44 @@
+from src.data.loader import DEFAULT_RESPONSE_FORMAT, data_loader
+from src.services.output_validator import output_validator
+
+INTENT_ID = "SlowBrowingWK_V1"
+
+
+def _expand(entities):
+    snapshot = data_loader.get_snapshot()
+    return output_validator.validate({"intentId": INTENT_ID, "entities": entities}, snapshot)
+
+
+def test_compact_reply_expands_to_the_full_response_shape():
+    snapshot = data_loader.get_snapshot()
+    entity_ids = [entity["id"] for entity in snapshot.get_intent(INTENT_ID)["entity"]]
+
+    response, problem, repairs = _expand({entity_id: None for entity_id in entity_ids} | {entity_ids[0]: "SLOW_BROWSING"})
+
+    assert problem is None and repairs == []
+    result = response["result"][0]
+    assert set(result) >= {"intent", "is_matched", "intentId", "entity", "metadata"}
+    assert result["intentId"] == INTENT_ID and result["is_matched"] is True
+    assert [entity["id"] for entity in result["entity"]] == entity_ids
+    expected_keys = set(DEFAULT_RESPONSE_FORMAT["entity"][0])
+    for entity in result["entity"]:
+        assert set(entity) == expected_keys
+    # OPTION values go in "response", as in the full format
+    assert result["entity"][0]["response"] == "SLOW_BROWSING"
+    assert result["entity"][0]["user_input"] == "SLOW_BROWSING"
+
+
+def test_compact_reply_reports_left_out_entities():
+    response, _, repairs = _expand({})
+
+    assert response is not None
+    assert "filled_entity" in repairs
+    assert all(entity["response"] is None for entity in response["result"][0]["entity"])
+
+
+def test_compact_option_value_is_corrected_once():
+    response, _, repairs = _expand({"is_slow_or_no_browsing": "slow browsing"})
+
+    entity = response["result"][0]["entity"][0]
+    assert entity["response"] == entity["user_input"] == "SLOW_BROWSING"
+    assert repairs.count("corrected_option") == 1
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from src.services.session_store import SessionBackend, SessionStore, SQLiteSessionBackend
+
+
+def test_backend_missing_a_method_fails_when_created():
+    class GetOnly(SessionBackend):
+        def get(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_state_is_copied_in_and_out():
+    store = SessionStore(10, 60)
+
+    async def main():
+        await store.save("s1", {"active_intent_id": "A", "entities": {}})
+        state = await store.get("s1")
+        state["active_intent_id"] = "B"
+        return await store.get("s1")
+
+    assert asyncio.run(main())["active_intent_id"] == "A"
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(2, 60)
+
+    async def main():
+        await store.save("s1", {"active_intent_id": "A"})
+        await store.save("s2", {"active_intent_id": "B"})
+        await store.get("s1")
+        await store.save("s3", {"active_intent_id": "C"})
+        return [await store.get(session_id) is not None for session_id in ("s1", "s2", "s3")]
+
+    assert asyncio.run(main()) == [True, False, True]
+    assert store.stats["evictions"] == 1
+
+
+def test_expired_session_is_forgotten():
+    store = SessionStore(10, -1)
+
+    async def main():
+        await store.save("s1", {"active_intent_id": "A"})
+        return await store.get("s1")
+
+    assert asyncio.run(main()) is None
+
+
+def test_sqlite_backend_serves_sessions_another_process_saved(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+
+    async def main():
+        await SessionStore(10, 60, SQLiteSessionBackend(path)).save("s1", {"active_intent_id": "A"})
+        other = SessionStore(10, 60, SQLiteSessionBackend(path))
+        return await other.get("s1"), other
+
+    state, other = asyncio.run(main())
+    assert state["active_intent_id"] == "A"
+    assert other.stats["backend_hits"] == 1
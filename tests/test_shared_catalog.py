@@ -0,0 +1,24 @@
+import os
+
+from src.config.settings import settings
+from src.data.shared_catalog import SharedCatalogStore
+
+
+def _publish(store: SharedCatalogStore, name: str, version: str) -> None:
+    store.publish(name, version, {"intents": []}, {}, (None, None))
+
+
+def test_prune_keeps_other_catalogs_with_a_shared_prefix(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CATALOG_SHARED_DIR", str(tmp_path))
+    store = SharedCatalogStore()
+
+    _publish(store, "acme-web", "0000000000000001")
+    for index in range(2, 7):
+        _publish(store, "acme", f"{index:016x}")
+
+    files = set(os.listdir(tmp_path))
+    assert "acme-web-0000000000000001.json" in files
+    assert store.load("acme-web", "0000000000000001") is not None
+    acme_artifacts = [entry for entry in files if entry.startswith("acme-0")]
+    assert len(acme_artifacts) == 3
+    assert "acme-0000000000000006.json" in files
@@ -0,0 +1,79 @@
+import asyncio
+import dataclasses
+
+from src.config.settings import settings
+from src.data.loader import data_loader
+from src.services.intent_service import intent_service
+from src.services.similarity_cache import SimilarityCache, similarity_cache
+
+INTENT_ID = "SlowBrowingWK_V1"
+ANSWERED = "my internet is very slow since this morning"
+PARAPHRASE = "internet very slow since this morning"
+
+
+def _cache(max_entries: int = 100) -> SimilarityCache:
+    return SimilarityCache(max_entries, settings.SIMILARITY_CACHE_NUM_PERM, settings.SIMILARITY_CACHE_BANDS)
+
+
+def test_paraphrase_finds_the_answered_message():
+    cache = _cache()
+    snapshot = data_loader.get_snapshot()
+    cache.add(ANSWERED, INTENT_ID, snapshot)
+
+    match = cache.lookup(PARAPHRASE, snapshot)
+
+    assert match.intent_id == INTENT_ID
+    assert match.message == ANSWERED
+    assert cache.lookup("I want to change my billing address", snapshot) is None
+
+
+def test_new_catalog_version_drops_the_old_answers():
+    cache = _cache()
+    snapshot = data_loader.get_snapshot()
+    cache.add(ANSWERED, INTENT_ID, snapshot)
+    reloaded = dataclasses.replace(snapshot, version="another-version")
+
+    assert cache.lookup(PARAPHRASE, reloaded) is None
+    cache.add("no internet at all", INTENT_ID, reloaded)
+    assert cache.get_stats()["size"] == 1
+    assert cache.stats["invalidations"] == 1
+
+
+def test_least_recently_used_answer_is_evicted():
+    cache = _cache(max_entries=1)
+    snapshot = data_loader.get_snapshot()
+    cache.add(ANSWERED, INTENT_ID, snapshot)
+    cache.add("the network is down in my whole building", INTENT_ID, snapshot)
+
+    assert cache.lookup(PARAPHRASE, snapshot) is None
+    assert cache.stats["evictions"] == 1
+
+
+def test_expired_answer_is_not_reused(monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_CACHE_TTL_SECONDS", -1)
+    cache = _cache()
+    snapshot = data_loader.get_snapshot()
+    cache.add(ANSWERED, INTENT_ID, snapshot)
+
+    assert cache.lookup(PARAPHRASE, snapshot) is None
+    assert cache.stats["expirations"] == 1
+
+
+def test_paraphrase_only_needs_its_entities_extracted(fake_backend, monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SIMILARITY_CACHE_AUDIT_RATE", 0.0)
+    similarity_cache.clear()
+    snapshot = data_loader.get_snapshot()
+    similarity_cache.add(ANSWERED, INTENT_ID, snapshot)
+    fake_backend.replies = [{"intent_switch": False, "entities": {"is_slow_or_no_browsing": "SLOW_BROWSING"}}]
+
+    try:
+        response = asyncio.run(intent_service.process_message(PARAPHRASE, snapshot=snapshot))
+    finally:
+        similarity_cache.clear()
+
+    result = response["result"][0]
+    assert result["intentId"] == INTENT_ID
+    assert result["metadata"]["source"] == "similarity-cache-slot-filling"
+    assert len(fake_backend.prompts) == 1
+    assert "replying to a follow-up question" in fake_backend.prompts[0]